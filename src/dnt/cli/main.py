@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import sys
 from turtle import pd
@@ -7,7 +8,7 @@ import yaml
 
 from dnt import __version__
 from dnt.core.config import Config
-from dnt.core.runner import Runner
+from dnt.core.runner import AsyncRunner, Runner
 
 __author__ = "xg1990"
 __copyright__ = "xg1990"
@@ -59,17 +60,22 @@ def validate(ctx) -> None:
 
 @main.command()
 @click.pass_context
+@click.option("--concurrent", is_flag=True, help="Run the jobs concurrently on an event loop.")
 @click.argument("jobs", nargs=-1)
-def run(ctx, jobs) -> None:
+def run(ctx, concurrent, jobs) -> None:
     """
     Run jobs.
     """
     config: Config = ctx.obj["config"]
-    runner: Runner = Runner(config)
     click.echo("Running jobs...")
 
     job_ls = None if len(jobs) == 0 else list(jobs)
-    runner.run_all(job_ls)
+    if concurrent:
+        with AsyncRunner(config) as runner:
+            asyncio.run(runner.run_all_async(job_ls))
+    else:
+        with Runner(config) as runner:
+            runner.run_all(job_ls)
 
 
 if __name__ == "__main__":
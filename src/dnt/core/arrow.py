@@ -0,0 +1,230 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from dnt.core.base import MessageBatch
+from dnt.core.utils import NOTSET, lvl_to_num, lvl_to_num_array
+
+
+def _concat_tables(tables: List[pa.Table]) -> pa.Table:
+    """
+    Concatenate tables, the columns missing (or all null) in some of them are filled with nulls.
+
+    Args:
+        tables (list): A list of Arrow tables
+
+    Returns:
+        An Arrow table
+    """
+    try:
+        return pa.concat_tables(tables, promote_options="permissive")
+    except TypeError:
+        # pyarrow < 14, the columns typed differently are already cast to strings
+        return pa.concat_tables(tables, promote=True)
+
+
+class ArrowRow(Mapping):
+    """
+    A read-only view of one message of an ArrowMessageBatch, the values are only converted to 
+    Python objects column by column, when accessed.
+    """
+    def __init__(self, batch: "ArrowMessageBatch", i: int) -> None:
+        """
+        Initialize the view with a batch and a position.
+
+        Args:
+            batch (ArrowMessageBatch): The batch of the message
+            i (int): The position of the message in the batch
+
+        Returns:
+            None
+        """
+        self._batch = batch
+        self._i = i
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._batch.table.column_names:
+            raise KeyError(key)
+        return self._batch.py_column(key)[self._i]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._batch.table.column_names)
+
+    def __len__(self) -> int:
+        return self._batch.table.num_columns
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class ArrowMessageBatch(MessageBatch):
+    """
+    A columnar batch of messages backed by an Arrow table. Nothing is converted to Python 
+    objects upfront: the levels are mapped once per distinct value, the other columns only
+    when a filterer or formatter reads them.
+    (The columns mixing types Arrow can't hold in one array are stored as text in the table, 
+    and kept as Python objects alongside.)
+    """
+    def __init__(
+        self, 
+        table: pa.Table, 
+        lvl_no: Optional[np.ndarray]=None, 
+        objects: Optional[Dict[str, List]]=None
+    ):
+        """
+        Initialize the batch with an Arrow table (one row per message).
+
+        Args:
+            table (pa.Table): The content of the messages
+            lvl_no (np.ndarray, optional): The notification levels as numbers, will be
+                computed from the 'level' column if None
+            objects (dict, optional): The original values of the columns stored as text
+
+        Returns:
+            None
+        """
+        self.table = table
+        self.objects: Dict[str, List] = objects or {}
+        if lvl_no is None:
+            if "level" in self.objects:
+                lvl_no = lvl_to_num_array(self.objects["level"])
+            else:
+                lvl_no = self._level_numbers(table)
+        self.lvl_no = lvl_no
+        self._df: Optional[pd.DataFrame] = None
+        self._py_columns: Dict[str, List] = dict(self.objects)
+
+    @staticmethod
+    def _level_numbers(table: pa.Table) -> np.ndarray:
+        """
+        Convert the 'level' column to numbers, once per distinct level.
+
+        Args:
+            table (pa.Table): The content of the messages
+
+        Returns:
+            The notification levels as a numpy array
+        """
+        if "level" not in table.column_names:
+            return np.full(table.num_rows, NOTSET, dtype=np.int8)
+        col = table.column("level").combine_chunks()
+        if col.null_count > 0:
+            raise ValueError("Unknown level: None")
+        encoded = col.dictionary_encode()
+        lvl_nos = np.array([lvl_to_num(lvl) for lvl in encoded.dictionary.to_pylist()], dtype=float)
+        if np.all(np.mod(lvl_nos, 1) == 0) and np.all(np.abs(lvl_nos) <= np.iinfo(np.int8).max):
+            lvl_nos = lvl_nos.astype(np.int8)
+        return lvl_nos[encoded.indices.to_numpy(zero_copy_only=False)]
+
+    @staticmethod
+    def concat(batches: Sequence["ArrowMessageBatch"]) -> "ArrowMessageBatch":
+        """
+        Concatenate several batches into one.
+
+        Args:
+            batches (list): A list of ArrowMessageBatch objects
+
+        Returns:
+            An ArrowMessageBatch object
+        """
+        if len(batches) == 1:
+            return batches[0]
+        names = set(name for b in batches for name in b.objects)
+        types: Dict[str, set] = {}
+        for b in batches:
+            for field in b.table.schema:
+                if not pa.types.is_null(field.type):
+                    types.setdefault(field.name, set()).add(field.type)
+        # the columns typed differently across batches are kept as Python objects too
+        names.update(name for name, ts in types.items() if len(ts) > 1)
+        tables = []
+        for b in batches:
+            table = b.table
+            for name in names.intersection(table.column_names):
+                i = table.column_names.index(name)
+                table = table.set_column(i, name, table.column(name).cast(pa.string()))
+            tables.append(table)
+        return ArrowMessageBatch(
+            _concat_tables(tables),
+            np.concatenate([b.lvl_no for b in batches]),
+            {name: [v for b in batches for v in b.py_column(name)] for name in names}
+        )
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """
+        The messages as a DataFrame, only built when first accessed.
+        """
+        if self._df is None:
+            self._df = self.table.to_pandas()
+            for name, values in self.objects.items():
+                self._df[name] = pd.Series(values, dtype=object)
+        return self._df
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The memory used by the batch in bytes.
+        """
+        return self.table.nbytes + self.lvl_no.nbytes
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    @property
+    def records(self) -> List[ArrowRow]:
+        """
+        The messages as a list of lazy views.
+        """
+        return [ArrowRow(self, i) for i in range(self.table.num_rows)]
+
+    def py_column(self, name: str) -> List:
+        """
+        Get a column as Python objects, converted once when first accessed.
+
+        Args:
+            name (str): The name of the column
+
+        Returns:
+            The values of the column
+        """
+        if name not in self._py_columns:
+            self._py_columns[name] = self.table.column(name).to_pylist()
+        return self._py_columns[name]
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Get a column of the messages.
+
+        Args:
+            name (str): The name of the column
+
+        Returns:
+            The values of the column
+        """
+        if name in self.objects:
+            return np.array(self.objects[name], dtype=object)
+        return self.table.column(name).to_numpy(zero_copy_only=False)
+
+    def select(self, mask: Union[np.ndarray, Sequence[bool], Sequence[int]]) -> "ArrowMessageBatch":
+        """
+        Select messages with a boolean mask or positional indices.
+
+        Args:
+            mask (np.ndarray): A boolean mask or an array of positions
+
+        Returns:
+            An ArrowMessageBatch object with the selected messages
+        """
+        mask = np.asarray(mask)
+        if mask.dtype == bool:
+            if mask.all():
+                return self
+            mask = np.flatnonzero(mask)
+        mask = mask.astype(np.intp)
+        return ArrowMessageBatch(
+            self.table.take(pa.array(mask)), 
+            self.lvl_no[mask],
+            {name: [values[i] for i in mask] for name, values in self.objects.items()}
+        )
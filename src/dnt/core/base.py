@@ -1,7 +1,17 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import Any, Iterable, Iterator, List, Dict, Optional, Sequence, Union
 import numpy as np
-from dnt.core.utils import lvl_to_num, NOTSET
+import pandas as pd
+from dnt.core.ratelimit import RateLimiter
+from dnt.core.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from dnt.core.utils import lvl_to_num, lvl_to_num_array, NOTSET
+
+_logger: logging.Logger = logging.getLogger(__name__)
 
 
 class Message:
@@ -28,11 +38,354 @@ class Message:
     def items(self):
         return self.message.items()
 
+
+class LevelIndex:
+    """
+    An index of message positions sorted (bucketed) by notification level, so selecting the 
+    messages at or above a threshold is a slice instead of a scan over all the messages.
+    """
+    def __init__(self, lvl_no: np.ndarray) -> None:
+        """
+        Initialize the index with the notification levels of the messages.
+
+        Args:
+            lvl_no (np.ndarray): The notification levels as numbers
+
+        Returns:
+            None
+        """
+        self.order = np.argsort(lvl_no, kind="stable")
+        self.levels = np.asarray(lvl_no)[self.order]
+        self._positions: Dict[Union[float, int], np.ndarray] = {}
+
+    def buckets(self) -> Dict[Union[float, int], int]:
+        """
+        Count the messages of each notification level.
+
+        Args:
+            None
+
+        Returns:
+            A dict of message counts keyed on the level number
+        """
+        levels, counts = np.unique(self.levels, return_counts=True)
+        return dict(zip(levels.tolist(), counts.tolist()))
+
+    def at_level(self, level: Union[float, int, str]) -> np.ndarray:
+        """
+        Get the positions of the messages at or above a notification level (in their 
+        original order, computed once per threshold).
+
+        Args:
+            level (float/int/str): The notification level threshold
+
+        Returns:
+            The sorted positions of the messages
+        """
+        level = lvl_to_num(level)
+        pos = self._positions.get(level)
+        if pos is None:
+            start = np.searchsorted(self.levels, level, side="left")
+            pos = np.sort(self.order[start:])
+            self._positions[level] = pos
+        return pos
+
+
+class MessageBatch:
+    """
+    A columnar batch of messages backed by a DataFrame, with the notification levels kept 
+    in a numeric column. Message objects are only created when a message is accessed.
+    """
+    def __init__(self, df: pd.DataFrame, lvl_no: Optional[np.ndarray]=None):
+        """
+        Initialize the batch with a DataFrame (one row per message).
+
+        Args:
+            df (pd.DataFrame): The content of the messages
+            lvl_no (np.ndarray, optional): The notification levels as numbers, will be
+                computed from the 'level' column if None
+
+        Returns:
+            None
+        """
+        self.df = df.reset_index(drop=True)
+        if lvl_no is None:
+            if "level" in df.columns:
+                lvl_no = lvl_to_num_array(df["level"])
+            else:
+                lvl_no = np.full(len(df), NOTSET, dtype=np.int8)
+        self.lvl_no = lvl_no
+        self._records: Optional[List[Dict]] = None
+
+    @classmethod
+    def from_messages(cls, msg_ls: Sequence[Message]) -> "MessageBatch":
+        """
+        Build a batch from a list of Message objects.
+
+        Args:
+            msg_ls (list): A list of Message objects
+
+        Returns:
+            A MessageBatch object
+        """
+        df = pd.DataFrame([msg.message for msg in msg_ls])
+        return cls(df, lvl_to_num_array([msg.lvl_no for msg in msg_ls]))
+
+    @staticmethod
+    def concat(batches: Sequence["MessageBatch"]) -> "MessageBatch":
+        """
+        Concatenate several batches into one.
+
+        Args:
+            batches (list): A list of MessageBatch objects
+
+        Returns:
+            A MessageBatch object
+        """
+        if len(batches) == 1:
+            return batches[0]
+        df = pd.concat([b.df for b in batches], ignore_index=True)
+        return batches[0].__class__(df, np.concatenate([b.lvl_no for b in batches]))
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def __getitem__(self, i: int) -> Message:
+        return Message(self.records[i])
+
+    def __iter__(self) -> Iterator[Message]:
+        for rec in self.records:
+            yield Message(rec)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The (estimated) memory used by the batch in bytes.
+        """
+        return int(self.df.memory_usage(index=False, deep=True).sum()) + self.lvl_no.nbytes
+
+    @property
+    def records(self) -> List[Dict]:
+        """
+        The messages as a list of dicts, only built when first accessed.
+        """
+        if self._records is None:
+            self._records = self.df.to_dict("records")
+        return self._records
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Get a column of the messages.
+
+        Args:
+            name (str): The name of the column
+
+        Returns:
+            The values of the column
+        """
+        return self.df[name].to_numpy()
+
+    def select(self, mask: Union[np.ndarray, Sequence[bool], Sequence[int]]) -> "MessageBatch":
+        """
+        Select messages with a boolean mask or positional indices.
+
+        Args:
+            mask (np.ndarray): A boolean mask or an array of positions
+
+        Returns:
+            A MessageBatch object with the selected messages
+        """
+        mask = np.asarray(mask)
+        if mask.dtype == bool and mask.all():
+            return self
+        if mask.dtype != bool:
+            mask = mask.astype(np.intp)
+        return self.__class__(self.df.iloc[mask], self.lvl_no[mask])
+
+    def at_level(self, level: Union[float, int, str]) -> "MessageBatch":
+        """
+        Select messages at or above a notification level.
+
+        Args:
+            level (float/int/str): The notification level threshold
+
+        Returns:
+            A MessageBatch object with the selected messages
+        """
+        pos = self.level_index.at_level(level)
+        return self if len(pos) == len(self) else self.select(pos)
+
+    @property
+    def level_index(self) -> LevelIndex:
+        """
+        The index of the messages by notification level, built when first accessed.
+        """
+        index = self.__dict__.get("_level_index")
+        if index is None:
+            index = self.__dict__.setdefault("_level_index", LevelIndex(self.lvl_no))
+        return index
+
+
+# A source may return all of its messages at once, or lazily as an iterable of batches
+Messages = Union[List[Message], MessageBatch, Iterable[Union[List[Message], MessageBatch]]]
+
+
+def iter_batches(msgs: Messages) -> Iterator[Union[List, MessageBatch]]:
+    """
+    Iterate over the messages batch by batch, a plain list (or a MessageBatch) is treated 
+    as a single batch.
+
+    Args:
+        msgs (list/iterable): A list of messages, or an iterable of message batches
+
+    Returns:
+        A generator of message batches
+    """
+    if isinstance(msgs, (list, MessageBatch)):
+        yield msgs
+    else:
+        for batch in msgs:
+            yield batch
+
+
+def concat_messages(parts: Sequence[Union[List, MessageBatch]]) -> Union[List, MessageBatch]:
+    """
+    Concatenate batches of messages, batches are kept columnar if all of them are MessageBatch.
+
+    Args:
+        parts (list): A list of message batches
+
+    Returns:
+        A list of messages, or a MessageBatch object
+    """
+    if len(parts) == 1:
+        return parts[0]
+    if len(parts) > 0 and all(isinstance(p, MessageBatch) for p in parts):
+        same_type = all(type(p) is type(parts[0]) for p in parts)
+        return (type(parts[0]) if same_type else MessageBatch).concat(parts)
+    res_ls = []
+    for p in parts:
+        res_ls.extend(p)
+    return res_ls
+
+
+def _has_batch_filter(filterer: "BaseFilterer") -> bool:
+    # whether the filterer implements its own (vectorized) `filter_batch`
+    return getattr(type(filterer), "filter_batch", None) is not BaseFilterer.filter_batch
+
+def filter_mask(
+    msg_ls: Union[Sequence[Message], MessageBatch], 
+    filterers: List["BaseFilterer"], 
+    adaptive: bool=True
+) -> np.ndarray:
+    """
+    Combine the filterers into a single boolean mask over the messages (an AND that short-circuits:
+    each filterer only sees the messages kept by the previous ones).
+    (The legacy filterers are called on each Message object of a list, as it is, whatever the 
+    order of the filterers. A MessageBatch is only built from a list for the filterers 
+    implementing `filter_batch`.)
+
+    Args:
+        msg_ls (list): A list of Message objects, or a MessageBatch
+        filterers (list): A list of filterers
+        adaptive (bool): Whether to run the cheapest & most selective filterers first (according
+            to their stats so far), True by default
+
+    Returns:
+        A boolean mask of the messages to keep
+    """
+    n_msg = len(msg_ls)
+    mask = np.ones(n_msg, dtype=bool)
+    if n_msg == 0:
+        return mask
+    if adaptive:
+        filterers = sorted(filterers, key=lambda f: f.stats.rank)
+    is_list = not isinstance(msg_ls, MessageBatch)
+    batch = None if is_list else msg_ls
+    for f in filterers:
+        pos = np.flatnonzero(mask)
+        if len(pos) == 0:
+            break
+        if is_list and not _has_batch_filter(f):
+            start = time.perf_counter()
+            keep = np.fromiter((bool(f.filter(msg_ls[i])) for i in pos), dtype=bool, count=len(pos))
+        else:
+            if batch is None:
+                batch = MessageBatch.from_messages(msg_ls)
+            sub = batch if len(pos) == n_msg else batch.select(pos)
+            start = time.perf_counter()
+            keep = np.asarray(f.filter_batch(sub), dtype=bool)
+        f.stats.record(len(pos), int(keep.sum()), time.perf_counter() - start)
+        mask[pos] = keep
+    return mask
+
+def filter_batch(batch: MessageBatch, filterers: Optional[List["BaseFilterer"]], level: Any) -> MessageBatch:
+    """
+    Filter a MessageBatch by notification level (as a vectorized mask) and filterer(s).
+
+    Args:
+        batch (MessageBatch): The batch to be filtered
+        filterers (list, optional): A list of filterers
+        level (float/int/str): The notification level threshold
+
+    Returns:
+        The filtered MessageBatch
+    """
+    batch = batch.at_level(level)
+    if filterers:
+        batch = batch.select(filter_mask(batch, filterers))
+    return batch
+
+def format_messages(formatter: Any, msg_ls: Union[List, MessageBatch]) -> List:
+    """
+    Render messages with a formatter, a MessageBatch is rendered at once if the formatter 
+    supports it (the items other than Message objects are kept as they are).
+
+    Args:
+        formatter (BaseFormatter): The formatter
+        msg_ls (list): A list of messages, or a MessageBatch
+
+    Returns:
+        The formatted list of messages
+    """
+    if isinstance(msg_ls, MessageBatch):
+        if hasattr(formatter, "format_batch"):
+            return list(formatter.format_batch(msg_ls))
+        return [formatter.format(msg) for msg in msg_ls]
+    return [formatter.format(msg) if isinstance(msg, Message) else msg for msg in msg_ls]
+
+
+def message_records(msg_ls: Union[List, MessageBatch]) -> List[Dict]:
+    """
+    Get the messages as dicts, the items other than Message objects (e.g. formatted) are 
+    kept as text.
+
+    Args:
+        msg_ls (list): A list of messages, or a MessageBatch
+
+    Returns:
+        A list of dicts
+    """
+    if isinstance(msg_ls, MessageBatch):
+        return list(msg_ls.records)
+    return [msg.message if isinstance(msg, Message) else {"message": str(msg)} for msg in msg_ls]
+
 class BaseSource(ABC):
     """
     A base class of the source. The data to trigger the notification(s) will be 
     extracted from the source.
     """
+    # Whether `get_messages` accepts a `min_level` to drop lower level messages at the source
+    supports_level_pushdown = False
+    # Whether the results of `get_messages` can be cached (i.e. don't depend on the progress)
+    cacheable = True
+    # Whether `get_messages` accepts a `progress` (Progress) to record its checkpoints in, 
+    # committed by the Runner once the messages of the job run are deliverred
+    tracks_progress = False
+
     def __init__(self, name: str) -> None:
         """
         Initialize the source with a name.
@@ -45,19 +398,74 @@ class BaseSource(ABC):
         """
         self.name = name
 
+    def attach(self, config: Any) -> None:
+        """
+        Hook called by the Config once all services are loaded, so the source can pick up 
+        shared resources (e.g. the engine registry). Do nothing by default.
+
+        Args:
+            config (Config): The config the source is loaded by
+
+        Returns:
+            None
+        """
+        pass
+
+    def commit(self) -> None:
+        """
+        Hook called by the Runner once the messages are deliverred, so the source can persist
+        its progress (e.g. watermarks). Do nothing by default.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        pass
+
+    def rollback(self) -> None:
+        """
+        Hook called by the Runner if the delivery fails, so the source can discard its 
+        progress. Do nothing by default.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        pass
+
     @abstractmethod
-    def get_messages(self, **kwargs) -> List[Message]:
+    def get_messages(self, **kwargs) -> Messages:
         """
         Extract messages from the source and wrap into a list of Message objects.
+        (A source may also return an iterable of Message batches to stream large results.)
         
         Args:
             None
 
         Returns:
-            A list of Message objects
+            A list of Message objects, or an iterable of lists of Message objects
         """
         raise NotImplementedError()
 
+    async def get_messages_async(self, **kwargs) -> Messages:
+        """
+        Extract messages from the source without blocking the event loop.
+        (By default, `get_messages` is run in the default executor, sources with a native
+        async client can override this.)
+
+        Args:
+            None
+
+        Returns:
+            A list of Message objects, or an iterable of lists of Message objects
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.get_messages, **kwargs))
+
 
 class BaseDestination(ABC):
     """
@@ -69,14 +477,63 @@ class BaseDestination(ABC):
 
         Args:
             name (str): The name of the destination
+            kwargs: The other settings, e.g. level, filterer, formatter, max_concurrency (the 
+                maximum number of concurrent emits, 1 by default), emit_timeout (the time, in 
+                seconds, a job waits for the emits to the destination, no limit by default), 
+                digest_window & digest_size (see `emit`, no digest by default), retries, 
+                retry_backoff, retry_max_backoff & retry_jitter (see RetryPolicy, never retried 
+                by default), breaker_threshold & breaker_reset (see CircuitBreaker, no breaker 
+                by default), rate_limit (the settings of a RateLimiter, e.g. 
+                {"messages_per_sec": 10, "burst": 20}, no limit by default)
 
         Returns:
             None
         """
         self.name = name
+        self.max_concurrency = kwargs.get("max_concurrency", 1)
+        self.emit_timeout = kwargs.get("emit_timeout")
+        self.retry = RetryPolicy(
+            retries=kwargs.get("retries", 0),
+            backoff=kwargs.get("retry_backoff", 0.5),
+            max_backoff=kwargs.get("retry_max_backoff", 30),
+            jitter=kwargs.get("retry_jitter", True)
+        )
+        self.breaker: Optional[CircuitBreaker] = None
+        if kwargs.get("breaker_threshold") is not None:
+            self.breaker = CircuitBreaker(kwargs["breaker_threshold"], kwargs.get("breaker_reset", 60))
+        self.n_retries = 0
+        self.rate_limiter: Optional[RateLimiter] = None
+        if kwargs.get("rate_limit") is not None:
+            self.rate_limiter = RateLimiter(**kwargs["rate_limit"])
+        self.digest_window = kwargs.get("digest_window") # in seconds
+        self.digest_size = kwargs.get("digest_size") # in messages
+        self._digests: Dict[tuple, Dict] = {}
+        self._digest_lock = threading.Lock()
         self.level = kwargs.get("level", "NOTSET")
         self.filterer = kwargs.get("filterer") # 1 filterer or a list of filterers
         self.formatter = kwargs.get("formatter") # 1 formatter
+        # if set, the filtered messages are also passed to `send_messages` as dicts (records)
+        self.keeps_records = False
+        if isinstance(self.formatter, type):
+            # instantiated once, not on every emit
+            self.formatter = self.formatter()
+
+    def attach(self, config: Any) -> None:
+        """
+        Resolve the formatter & filterer(s) named in the settings of the destination, called 
+        once when the config is loaded.
+
+        Args:
+            config (Config): The config loading the destination
+
+        Returns:
+            None
+        """
+        if isinstance(self.formatter, str):
+            self.formatter = config.formatters[self.formatter]
+        if self.filterer is not None:
+            filterer_ls = self.filterer if isinstance(self.filterer, list) else [self.filterer]
+            self.filterer = [config.filterers[f] if isinstance(f, str) else f for f in filterer_ls]
 
     def _filter_msg(self, msg_ls: List[Message]) -> List:
         """
@@ -84,23 +541,26 @@ class BaseDestination(ABC):
         (This will be overwhelmed by the level & filtering settings in message_groups.)
 
         Args:
-            msg_ls (list): A list of Message objects
+            msg_ls (list): A list of Message objects, or a MessageBatch
 
         Returns:
             res_ls (list): The filtered list of Message objects
         """
+        if isinstance(msg_ls, MessageBatch):
+            filterer_ls = self.filterer
+            if filterer_ls is not None and not isinstance(filterer_ls, list):
+                filterer_ls = [filterer_ls]
+            return filter_batch(msg_ls, filterer_ls, self.level)
+
         if self.filterer is not None:
             filterer_ls = self.filterer if isinstance(self.filterer, list) else [self.filterer]
             
-            keep_flag_ls = []
-            for msg in msg_ls:
-                if isinstance(msg, Message):
-                    keep_flag_ls.append(
-                        np.prod([f.filter(msg) for f in filterer_ls])
-                    )
-                else:
-                    keep_flag_ls.append(1)
-            msg_ls = [msg for n, msg in enumerate(msg_ls) if keep_flag_ls[n] > 0]
+            # only Message objects are filtered, the others (e.g. formatted) are kept
+            pos_ls = [n for n, msg in enumerate(msg_ls) if isinstance(msg, Message)]
+            keep_flag_ls = np.ones(len(msg_ls), dtype=bool)
+            if pos_ls:
+                keep_flag_ls[pos_ls] = filter_mask([msg_ls[n] for n in pos_ls], filterer_ls)
+            msg_ls = [msg for n, msg in enumerate(msg_ls) if keep_flag_ls[n]]
 
         level = lvl_to_num(self.level)
         res_ls = []
@@ -123,8 +583,8 @@ class BaseDestination(ABC):
         Returns:
             res_ls (list): The formatted list of messages
         """
-        formatter = BaseFormatter() if self.formatter is None else self.formatter()
-        res_ls = [formatter.format(msg) if isinstance(msg, Message) else msg for msg in msg_ls]
+        formatter = _DEFAULT_FORMATTER if self.formatter is None else self.formatter
+        res_ls = format_messages(formatter, msg_ls)
 
         return res_ls
 
@@ -142,21 +602,402 @@ class BaseDestination(ABC):
         """
         raise NotImplementedError()
 
-    def emit(self, msg_ls: List[Message], subject: Optional[str]=None, **kwargs) -> None:
+    async def send_messages_async(self, msg_ls: List, subject: Optional[str]=None, **kwargs) -> None:
         """
-        The process to filter, format and send the messages.
+        Send the messages without blocking the event loop.
+        (By default, `send_messages` is run in the default executor, destinations with a native
+        async client can override this.)
 
         Args:
             msg_ls (list): A list of messages to be sent
             subject (str, optional): The subject of the message, None by default
+
+        Returns:
+            None
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, functools.partial(self.send_messages, msg_ls=msg_ls, subject=subject, **kwargs)
+        )
+
+    def _prepare(self, msg_ls: Messages, subject: Optional[str]=None, **kwargs) -> Dict:
+        """
+        Filter & format the messages into the parameters of `send_messages`.
+        (Batches are filtered & formatted one at a time, so only the rendered messages are kept,
+        and their records if `keeps_records` is set.)
+
+        Args:
+            msg_ls (list/iterable): A list of messages, or an iterable of message batches to be sent
+            subject (str, optional): The subject of the message, None by default
+
+        Returns:
+            The parameters of `send_messages`
+        """
+        res_ls, records = [], []
+        for batch in iter_batches(msg_ls):
+            filtered_ls = self._filter_msg(batch)
+            res_ls.extend(self._format_msg(filtered_ls))
+            if self.keeps_records:
+                records.extend(message_records(filtered_ls))
+        if self.keeps_records:
+            kwargs["records"] = records
+        return {"msg_ls": res_ls, "subject": subject, **kwargs}
+
+    def is_transient(self, error: Exception) -> bool:
+        """
+        Check whether an error of `send_messages` is transient, i.e. worth a retry. (All the 
+        errors by default, destinations can override this, e.g. to skip rejected addresses.)
+
+        Args:
+            error (Exception): The error
+
+        Returns:
+            True if the error is transient
+        """
+        return True
+
+    def _before_send(self) -> None:
+        # fast-fail while the circuit is open
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpenError(self.name, self.breaker.retry_in())
+
+    def _before_wait(self) -> None:
+        # don't wait for a turn of the rate limit while the circuit is open (without taking 
+        # the probe of a half-open circuit, taken once the turn comes)
+        if self.breaker is not None and self.breaker.retry_in() > 0:
+            raise CircuitOpenError(self.name, self.breaker.retry_in())
+
+    @staticmethod
+    def _payload_size(params: Dict) -> int:
+        """
+        Estimate the size of the messages of a send (rendered as text), for the rate limit.
+
+        Args:
+            params (dict): The parameters of `send_messages`
+
+        Returns:
+            The estimated size in bytes
+        """
+        return sum(len(str(msg).encode()) for msg in params["msg_ls"])
+
+    def _after_error(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Record a failed attempt, and get the time to wait before retrying it.
+
+        Args:
+            error (Exception): The error of the attempt
+            attempt (int): The number of the attempt (starting from 1)
+
+        Returns:
+            The time (in seconds) to wait, None if it should not be retried
+        """
+        transient = self.is_transient(error)
+        if self.breaker is not None:
+            # the destination answered if the error is not transient
+            if transient:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+        if not transient or attempt > self.retry.retries:
+            return None
+        if self.breaker is not None and self.breaker.state != CircuitBreaker.CLOSED:
+            return None
+        self.n_retries += 1
+        return self.retry.delay(attempt)
+
+    def deliver(self, params: Dict) -> None:
+        """
+        Send the filtered & formatted messages, the transient errors are retried with an 
+        exponential backoff (up to `retries` times) and counted by the circuit breaker if any.
+        (With a rate limit, each attempt waits for its turn in the queue of the destination.)
+
+        Args:
+            params (dict): The parameters of `send_messages`
+
+        Returns:
+            None
+        """
+        n_bytes = 0 if self.rate_limiter is None else self._payload_size(params)
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.rate_limiter is not None:
+                self._before_wait()
+                self.rate_limiter.acquire(n_bytes)
+            self._before_send()
+            try:
+                self.send_messages(**params)
+            except Exception as e:
+                delay = self._after_error(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+            except BaseException:
+                # e.g. interrupted, another call can probe the circuit
+                if self.breaker is not None:
+                    self.breaker.release()
+                raise
+            else:
+                if self.breaker is not None:
+                    self.breaker.record_success()
+                return
+
+    async def deliver_async(self, params: Dict) -> None:
+        """
+        Send the filtered & formatted messages without blocking the event loop (see `deliver`).
+
+        Args:
+            params (dict): The parameters of `send_messages`
+
+        Returns:
+            None
+        """
+        n_bytes = 0 if self.rate_limiter is None else self._payload_size(params)
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.rate_limiter is not None:
+                self._before_wait()
+                await self.rate_limiter.acquire_async(n_bytes)
+            self._before_send()
+            try:
+                await self.send_messages_async(**params)
+            except Exception as e:
+                delay = self._after_error(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+            except BaseException:
+                # e.g. cancelled (by a timeout), another call can probe the circuit
+                if self.breaker is not None:
+                    self.breaker.release()
+                raise
+            else:
+                if self.breaker is not None:
+                    self.breaker.record_success()
+                return
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Get the state of the destination, to monitor it.
+
+        Args:
+            None
+
+        Returns:
+            A dict of the retries, the state of the circuit breaker (closed if none) & the 
+            counters of the rate limiter (None if no limit)
+        """
+        if self.breaker is None:
+            state = {"state": CircuitBreaker.CLOSED, "failures": 0, "trips": 0, "retry_in": None}
+        else:
+            state = self.breaker.as_dict()
+        rate_limit = None if self.rate_limiter is None else self.rate_limiter.stats()
+        return {"retries": self.n_retries, **state, "rate_limit": rate_limit}
+
+    @property
+    def digest(self) -> bool:
+        """
+        Whether the emits are buffered into digests.
+        """
+        return self.digest_window is not None or self.digest_size is not None
+
+    @staticmethod
+    def _merge_digest(parts: List[Dict]) -> Dict:
+        """
+        Merge the buffered parameters of `send_messages` into a single send. If the subjects 
+        differ, each message is prefixed with its subject.
+
+        Args:
+            parts (list): The parameters of the buffered emits
+
+        Returns:
+            The parameters of `send_messages`
+        """
+        params = dict(parts[0])
+        if "records" in params:
+            params["records"] = [rec for part in parts for rec in part.get("records", [])]
+        subjects = list(dict.fromkeys(part["subject"] for part in parts))
+        if len(subjects) == 1:
+            params["msg_ls"] = [msg for part in parts for msg in part["msg_ls"]]
+            return params
+        params["msg_ls"] = [f"[{part['subject']}] {msg}" for part in parts for msg in part["msg_ls"]]
+        listed = ", ".join(str(subject) for subject in subjects[:3])
+        if len(subjects) > 3:
+            listed += f" and {len(subjects) - 3} more"
+        params["subject"] = f"Digest of {len(parts)} notifications: {listed}"
+        return params
+
+    def _add_to_digest(self, params: Dict) -> Optional[Dict]:
+        """
+        Buffer the parameters of `send_messages` in the digest of their receivers. The digest 
+        is sent once `digest_window` seconds passed since its first emit (by a timer), or right 
+        away once it holds `digest_size` messages.
+
+        Args:
+            params (dict): The parameters of `send_messages`
+
+        Returns:
+            The parameters of the whole digest if it's full, None otherwise
+        """
+        if not params["msg_ls"]:
+            return None
+        key = tuple(params.get("receivers") or ())
+        with self._digest_lock:
+            entry = self._digests.get(key)
+            if entry is None:
+                entry = self._digests[key] = {"parts": [], "n_msg": 0, "timer": None}
+                if self.digest_window is not None:
+                    entry["timer"] = threading.Timer(self.digest_window, self._flush_digest, args=(key, entry))
+                    entry["timer"].daemon = True
+                    entry["timer"].start()
+            entry["parts"].append(params)
+            entry["n_msg"] += len(params["msg_ls"])
+            if self.digest_size is None or entry["n_msg"] < self.digest_size:
+                return None
+            del self._digests[key]
+            if entry["timer"] is not None:
+                entry["timer"].cancel()
+        return self._merge_digest(entry["parts"])
+
+    def _flush_digest(self, key: tuple, entry: Dict) -> None:
+        """
+        Send a digest once its window is over (called by its timer), the errors are logged.
+
+        Args:
+            key (tuple): The receivers of the digest
+            entry (dict): The digest
+
+        Returns:
+            None
+        """
+        with self._digest_lock:
+            if self._digests.get(key) is not entry:
+                return # sent already
+            del self._digests[key]
+        try:
+            self.deliver(self._merge_digest(entry["parts"]))
+        except Exception:
+            _logger.exception(f"Failed to send the digest of {self.name} to {list(key)}")
+
+    def _take_digests(self) -> List[Dict]:
+        """
+        Take all the buffered digests out, cancelling their timers.
+
+        Args:
+            None
+
+        Returns:
+            The parameters of `send_messages` of each digest
+        """
+        with self._digest_lock:
+            entries, self._digests = list(self._digests.values()), {}
+        for entry in entries:
+            if entry["timer"] is not None:
+                entry["timer"].cancel()
+        return [self._merge_digest(entry["parts"]) for entry in entries]
+
+    def flush(self) -> None:
+        """
+        Send all the buffered digests now, the first error is raised once all are sent.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        errors = []
+        for params in self._take_digests():
+            try:
+                self.deliver(params)
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+    async def flush_async(self) -> None:
+        """
+        Send all the buffered digests now without blocking the event loop, the first error is 
+        raised once all are sent.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        results = await asyncio.gather(
+            *(self.deliver_async(params) for params in self._take_digests()), 
+            return_exceptions=True
+        )
+        for res in results:
+            if isinstance(res, BaseException):
+                raise res
+
+    def emit(self, msg_ls: Messages, subject: Optional[str]=None, **kwargs) -> None:
+        """
+        The process to filter, format and send the messages.
+        (In digest mode, i.e. `digest_window` and/or `digest_size` set, the messages are 
+        buffered per receivers and sent as one digest, see `_add_to_digest`; empty emits are 
+        dropped. The transient errors are retried, see `deliver`.)
+
+        Args:
+            msg_ls (list/iterable): A list of messages, or an iterable of message batches to be sent
+            subject (str, optional): The subject of the message, None by default
+        
+        Returns:
+            None
+        """
+        self.emit_prepared(self._prepare(msg_ls, subject, **kwargs))
+
+    def emit_prepared(self, params: Dict) -> None:
+        """
+        Send the messages already filtered & formatted by `_prepare` (e.g. batch by batch), 
+        buffered into a digest in digest mode.
+
+        Args:
+            params (dict): The parameters of `send_messages`
+
+        Returns:
+            None
+        """
+        if self.digest:
+            params = self._add_to_digest(params)
+            if params is None:
+                return
+        self.deliver(params)
+
+    async def emit_async(self, msg_ls: Messages, subject: Optional[str]=None, **kwargs) -> None:
+        """
+        The process to filter, format and send the messages without blocking the event loop.
+        (See `emit` for the digest mode.)
+
+        Args:
+            msg_ls (list/iterable): A list of messages, or an iterable of message batches to be sent
+            subject (str, optional): The subject of the message, None by default
         
         Returns:
             None
         """
-        msg_ls = self._filter_msg(msg_ls)
-        res_ls = self._format_msg(msg_ls)
-        params = {"msg_ls": res_ls, "subject": subject, **kwargs}
-        self.send_messages(**params)
+        await self.emit_prepared_async(self._prepare(msg_ls, subject, **kwargs))
+
+    async def emit_prepared_async(self, params: Dict) -> None:
+        """
+        Send the messages already filtered & formatted by `_prepare` without blocking the event 
+        loop (see `emit_prepared`).
+
+        Args:
+            params (dict): The parameters of `send_messages`
+
+        Returns:
+            None
+        """
+        if self.digest:
+            params = self._add_to_digest(params)
+            if params is None:
+                return
+        await self.deliver_async(params)
 
 
 class BaseFormatter(ABC):
@@ -175,11 +1016,135 @@ class BaseFormatter(ABC):
         """
         return str(msg.message)
 
+    def format_batch(self, batch: MessageBatch) -> List[str]:
+        """
+        Render a whole batch of messages at once, override it with column operations to avoid 
+        calling `format` on each message.
+
+        Args:
+            batch (MessageBatch): A MessageBatch object to be renderred
+
+        Return:
+            The list of stringified messages
+        """
+        return [self.format(msg) for msg in batch]
+
+    def setup(self) -> None:
+        """
+        Prepare the expensive state of the formatter (e.g. compiled templates, locale data), 
+        called once when the config is loaded.
+
+        Args:
+            None
+
+        Return:
+            None
+        """
+        pass
+
+
+# The formatter of the destinations without one
+_DEFAULT_FORMATTER = BaseFormatter()
+
+
+class FilterStats:
+    """
+    The runtime stats of a filterer (messages seen & passed, time spent), used to order the 
+    filterers of a receiver.
+    """
+    def __init__(self) -> None:
+        """
+        Initialize the counters.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.calls = 0
+        self.seen = 0
+        self.passed = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seen: int, passed: int, seconds: float) -> None:
+        """
+        Record one evaluation of the filterer.
+
+        Args:
+            seen (int): The number of messages evaluated
+            passed (int): The number of messages kept
+            seconds (float): The time spent
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.calls += 1
+            self.seen += seen
+            self.passed += passed
+            self.seconds += seconds
+
+    @property
+    def pass_rate(self) -> float:
+        """
+        The share of messages kept by the filterer (1 if it has not seen any message yet).
+        """
+        return self.passed / self.seen if self.seen else 1.0
+
+    @property
+    def cost(self) -> float:
+        """
+        The average time spent per message (in seconds).
+        """
+        return self.seconds / self.seen if self.seen else 0.0
+
+    @property
+    def rank(self) -> float:
+        """
+        The order of the filterer in a chain, the cost per message dropped (lowest first).
+        (The filterers not evaluated yet come first, those never dropping anything come last.)
+        """
+        if self.seen == 0:
+            return 0.0
+        dropped = 1.0 - self.pass_rate
+        return self.cost / dropped if dropped > 0 else float("inf")
+
+    def as_dict(self) -> Dict[str, Union[int, float]]:
+        """
+        Get the stats as a dict.
+
+        Args:
+            None
+
+        Returns:
+            A dict of calls, seen, passed, seconds, pass_rate & cost (per message)
+        """
+        return {
+            "calls": self.calls,
+            "seen": self.seen,
+            "passed": self.passed,
+            "seconds": self.seconds,
+            "pass_rate": self.pass_rate,
+            "cost": self.cost,
+        }
+
 
 class BaseFilterer(ABC):
     """
     A base class of filterer to check whether to filter a message or not, work on each single message.
     """
+    @property
+    def stats(self) -> FilterStats:
+        """
+        The runtime stats of the filterer, created when first accessed.
+        """
+        stats = self.__dict__.get("_stats")
+        if stats is None:
+            stats = self.__dict__.setdefault("_stats", FilterStats())
+        return stats
+
     @abstractmethod
     def filter(self, msg: Message) -> bool:
         """
@@ -192,3 +1157,16 @@ class BaseFilterer(ABC):
             Whether a message should be sent
         """
         raise NotImplementedError()
+
+    def filter_batch(self, batch: MessageBatch) -> np.ndarray:
+        """
+        Classify a whole batch of messages at once, override it with column operations 
+        (e.g. `batch.column("db") == "sqlserver"`) to avoid calling `filter` on each message.
+
+        Args:
+            batch (MessageBatch): A MessageBatch object to be filtered
+
+        Returns:
+            A boolean mask of the messages to be sent
+        """
+        return np.fromiter((bool(self.filter(msg)) for msg in batch), dtype=bool, count=len(batch))
@@ -0,0 +1,217 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+from dnt.core.base import BaseSource, MessageBatch, Messages
+from dnt.core.utils import NOTSET, lvl_to_num
+
+
+def _estimate_size(result: Any) -> int:
+    """
+    Estimate the memory used by a result (in bytes).
+
+    Args:
+        result (list/MessageBatch): The result of a source
+
+    Returns:
+        The estimated size in bytes
+    """
+    if isinstance(result, MessageBatch):
+        return result.nbytes
+    size = sys.getsizeof(result)
+    for msg in result:
+        size += sys.getsizeof(msg.message)
+        size += sum(sys.getsizeof(v) for v in msg.message.values())
+    return size
+
+
+class ResultCache:
+    """
+    A TTL cache of source results with a memory-bounded LRU eviction policy, so identical
+    queries across jobs only hit the source once. 
+    (The level pushed down to a source is not part of the key, a result fetched with a level 
+    serves the jobs with the same or a higher level, their messages are filtered anyway. 
+    Concurrent misses of the same key wait for the first fetch instead of running the query 
+    again.)
+    """
+    def __init__(self, ttl: float=60, max_bytes: int=64 * 1024 * 1024) -> None:
+        """
+        Initialize the cache with a TTL and a memory limit.
+
+        Args:
+            ttl (float): The time (in seconds) a result stays valid, 60 by default
+            max_bytes (int): The maximum (estimated) memory used by the cached results, 64MB
+                by default
+
+        Returns:
+            None
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.size = 0
+        self._in_flight: Dict[Tuple, Tuple[Future, float]] = {}
+        self._entries: "OrderedDict[Tuple, Tuple[float, int, Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(source_name: str, params: Dict) -> Tuple:
+        """
+        Generate the key of a result from the source name, the normalized query and parameters
+        (except the level pushed down).
+
+        Args:
+            source_name (str): The name of the source
+            params (dict): The parameters of `get_messages`
+
+        Returns:
+            A hashable key
+        """
+        items = []
+        for k, v in sorted(params.items()):
+            if k == "min_level":
+                continue
+            if k == "query" and isinstance(v, str):
+                v = " ".join(v.split()).rstrip(";")
+            items.append((k, repr(v)))
+        return (source_name, tuple(items))
+
+    @staticmethod
+    def _copy(result: Any) -> Any:
+        # lists are copied so callers can't alter the cached result
+        return list(result) if isinstance(result, list) else result
+
+    def _evict(self) -> None:
+        """
+        Drop the expired results, then the least recently used ones until under the memory limit.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        now = time.monotonic()
+        for key in [k for k, entry in self._entries.items() if entry[0] <= now]:
+            self.size -= self._entries.pop(key)[1]
+        while self.size > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.size -= entry[1]
+            self.evictions += 1
+
+    def get_or_fetch(self, source: BaseSource, params: Dict, fetch: Callable[[], Messages]) -> Messages:
+        """
+        Get a result from the cache, or fetch it from the source on a miss.
+        (Streamed results are passed through without being cached.)
+
+        Args:
+            source (BaseSource): The source of the result
+            params (dict): The parameters of `get_messages`
+            fetch (callable): The function to fetch the result
+
+        Returns:
+            The messages
+        """
+        key = self.make_key(source.name, params)
+        level = lvl_to_num(params.get("min_level") or NOTSET)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic() and entry[3] <= level:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._copy(entry[2])
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None and in_flight[1] <= level:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                in_flight = None
+                future: Future = Future()
+                self._in_flight[key] = (future, level)
+
+        if in_flight is not None:
+            # wait for the fetch of the same key (its error is raised too), a streamed result 
+            # can't be shared so it's fetched again
+            result = in_flight[0].result()
+            return fetch() if result is None else self._copy(result)
+
+        try:
+            result = fetch()
+        except BaseException as e:
+            self._settle(key, future, exception=e)
+            raise
+        if not isinstance(result, (list, MessageBatch)):
+            self._settle(key, future, result=None)
+            return result
+
+        size = _estimate_size(result)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            if size <= self.max_bytes:
+                self._entries[key] = (time.monotonic() + self.ttl, size, result, level)
+                self.size += size
+            self._evict()
+        self._settle(key, future, result=result)
+        return self._copy(result)
+
+    def _settle(self, key: Tuple, future: Future, result: Any=None, exception: Optional[BaseException]=None) -> None:
+        """
+        Hand the result (or the error) of a fetch to the callers waiting for the same key.
+
+        Args:
+            key (tuple): The key of the result
+            future (Future): The future of the fetch
+            result (list/MessageBatch, optional): The result, None if it can't be shared
+            exception (Exception, optional): The error of the fetch
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if self._in_flight.get(key, (None,))[0] is future:
+                del self._in_flight[key]
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def clear(self) -> None:
+        """
+        Drop all the cached results.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the counters of the cache.
+
+        Args:
+            None
+
+        Returns:
+            A dict of hits, misses, coalesced (misses waiting for the same fetch), evictions, 
+            entries & size (in bytes)
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size": self.size,
+            }
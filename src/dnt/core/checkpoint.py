@@ -0,0 +1,204 @@
+import datetime
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Tuple
+import pandas as pd
+
+
+def _encode(value: Any) -> str:
+    """
+    Serialize a checkpoint value, keeping track of its type.
+
+    Args:
+        value (any): The value to serialize (int, float, str or datetime)
+
+    Returns:
+        The serialized value
+    """
+    if isinstance(value, (datetime.datetime, pd.Timestamp)):
+        return json.dumps({"type": "datetime", "value": value.isoformat()})
+    if hasattr(value, "item"):
+        # numpy scalars
+        value = value.item()
+    return json.dumps({"type": "raw", "value": value})
+
+def _decode(raw: str) -> Any:
+    """
+    Deserialize a checkpoint value.
+
+    Args:
+        raw (str): The serialized value
+
+    Returns:
+        The value
+    """
+    data = json.loads(raw)
+    if data["type"] == "datetime":
+        return datetime.datetime.fromisoformat(data["value"])
+    return data["value"]
+
+
+class CheckpointStore:
+    """
+    A key-value store persisting checkpoints (e.g. watermarks) in a local SQLite database.
+    """
+    def __init__(self, path: str=":memory:") -> None:
+        """
+        Initialize the store with the path of the SQLite database.
+
+        Args:
+            path (str): The path of the SQLite database, in memory (not persisted) by default
+
+        Returns:
+            None
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at TEXT NOT NULL)"
+            )
+
+    def get(self, key: str, default: Any=None) -> Any:
+        """
+        Get the value of a checkpoint.
+
+        Args:
+            key (str): The key of the checkpoint
+            default (any): The value to return if the checkpoint does not exist
+
+        Returns:
+            The value of the checkpoint
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM checkpoints WHERE key = ?", (key,)
+            ).fetchone()
+        return default if row is None else _decode(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Set the value of a checkpoint.
+
+        Args:
+            key (str): The key of the checkpoint
+            value (any): The value of the checkpoint
+
+        Returns:
+            None
+        """
+        now = datetime.datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO checkpoints (key, value, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                (key, _encode(value), now)
+            )
+
+    def delete(self, key: str) -> None:
+        """
+        Delete a checkpoint.
+
+        Args:
+            key (str): The key of the checkpoint
+
+        Returns:
+            None
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoints WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        """
+        Close the SQLite database.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._conn.close()
+
+
+class Progress:
+    """
+    The checkpoints (e.g. watermarks) advanced by one run of a job, only persisted to their 
+    stores once the messages of the run are deliverred. Each run has its own progress, so 
+    concurrent jobs sharing a source don't commit or discard each other's checkpoints.
+    """
+    def __init__(self, job: Optional[str]=None) -> None:
+        """
+        Initialize the progress of a job run.
+
+        Args:
+            job (str, optional): The name of the job, the checkpoint keys are scoped to it
+
+        Returns:
+            None
+        """
+        self.job = job
+        self._pending: Dict[Tuple[int, str], Tuple[CheckpointStore, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, store: CheckpointStore, key: str, default: Any=None) -> Any:
+        """
+        Get the pending value of a checkpoint.
+
+        Args:
+            store (CheckpointStore): The store of the checkpoint
+            key (str): The key of the checkpoint
+            default (any): The value to return if the checkpoint has not advanced
+
+        Returns:
+            The pending value of the checkpoint
+        """
+        with self._lock:
+            pending = self._pending.get((id(store), key))
+        return default if pending is None else pending[1]
+
+    def set(self, store: CheckpointStore, key: str, value: Any) -> None:
+        """
+        Advance a checkpoint, persisted on commit.
+
+        Args:
+            store (CheckpointStore): The store of the checkpoint
+            key (str): The key of the checkpoint
+            value (any): The value of the checkpoint
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._pending[(id(store), key)] = (store, value)
+
+    def commit(self) -> None:
+        """
+        Persist the checkpoints advanced since the last commit.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for (_, key), (store, value) in pending.items():
+            store.set(key, value)
+
+    def rollback(self) -> None:
+        """
+        Discard the checkpoints advanced since the last commit.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._pending = {}
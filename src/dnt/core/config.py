@@ -1,13 +1,19 @@
 import os
 import sys
 from envyaml import EnvYAML
-from typing import Any, Dict, List, Tuple, Type
+from typing import Any, Dict, List, Optional, Tuple, Type
 from dnt.core.base import (
     BaseSource, 
     BaseDestination, 
     BaseFormatter,
     BaseFilterer
 )
+from dnt.core.cache import ResultCache
+from dnt.core.checkpoint import CheckpointStore
+from dnt.core.outbox import Outbox
+from dnt.core.engines import EngineRegistry
+from dnt.core.expressions import ExpressionFilterer, fuse_expressions
+from dnt.core.messages import MsgGrp
 from dnt.core.utils import dict_drop_key, get_components
 import pydoc
 
@@ -50,7 +56,7 @@ def build_service(service_config: Dict, service_name: str, service_type: str):
     if service_type in ("source", "destination"):
         return _cls(name=service_name, **dict_drop_key(service_config, "class_name"))
     else:
-        return _cls()
+        return _cls(**dict_drop_key(service_config, "class_name"))
 
 class Config:
     """
@@ -72,14 +78,72 @@ class Config:
         self.destinations: Dict[str, BaseDestination] = {}
         self.formatters: Dict[str, BaseFormatter] = {}
         self.filterers: Dict[str, BaseFilterer] = {}
+        self.groups: Dict[str, MsgGrp] = {}
+        self.engines = EngineRegistry(**self._config.get("engine_pool", {}))
+        self.checkpoints = self._load_checkpoints()
+        self.outbox = self._load_outbox()
+        self.result_cache: Optional[ResultCache] = None
+        if "result_cache" in self._config:
+            self.result_cache = ResultCache(**self._config["result_cache"])
 
         self.message_groups: Dict[str, Dict] = self._config["message_groups"]
         self.jobs: Dict[str, Dict] = self._config["jobs"]
         self._set_up_services()
 
+    def _state_path(self, path: str) -> str:
+        """
+        Resolve the path of a state file (e.g. the checkpoint store) relative to the config 
+        file, creating its directory if needed.
+
+        Args:
+            path (str): The path of the state file
+
+        Returns:
+            The absolute path of the state file
+        """
+        path = os.path.abspath(os.path.join(os.path.dirname(self._filename), path))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def _load_checkpoints(self) -> CheckpointStore:
+        """
+        Load the checkpoint store, the path is relative to the config file.
+        (Checkpoints are kept in memory only if no path is defined.)
+
+        Args:
+            None
+
+        Returns:
+            The checkpoint store
+        """
+        path = self._config.get("checkpoints", {}).get("path")
+        if path is None:
+            return CheckpointStore()
+        return CheckpointStore(self._state_path(path))
+
+    def _load_outbox(self) -> Optional[Outbox]:
+        """
+        Load the outbox spooling the emits, the path is relative to the config file.
+        (Disabled if no `outbox` section is defined, kept in memory only if no path is defined.)
+
+        Args:
+            None
+
+        Returns:
+            The outbox, None if disabled
+        """
+        if "outbox" not in self._config:
+            return None
+        settings = dict(self._config["outbox"] or {})
+        path = settings.pop("path", None)
+        if path is not None:
+            path = self._state_path(path)
+        return Outbox(path or ":memory:", **settings)
+
     def _set_up_services(self) -> None:
         """
         Load services (including sources, destinations, formatters & filterers) according to the config file.
+        (The filter expressions are compiled into filterers keyed on the expression.)
 
         Args:
             None
@@ -100,6 +164,7 @@ class Config:
         # Load sources & destinations
         for source_name, source_config in self._config["sources"].items():
             self.sources[source_name] = build_service(source_config, source_name, service_type="source")
+            self.sources[source_name].attach(self)
 
         for dest_name, dest_config in self._config["destinations"].items():
             self.destinations[dest_name] = build_service(dest_config, dest_name, service_type="destination")
@@ -108,13 +173,77 @@ class Config:
         raw_cfg = self._config.export()
         fmt_ls = get_components(raw_cfg, "formatter")
         
+        # The formatters with settings (e.g. templates) are defined in the `formatters` section
+        fmt_configs = self._config.get("formatters", {})
         for fmt in fmt_ls:
-            self.formatters[fmt] = build_service({}, fmt, "formatter")
+            self.formatters[fmt] = build_service(fmt_configs.get(fmt, {}), fmt, "formatter")
+            # prepare the expensive state (e.g. compiled templates) once
+            setup = getattr(self.formatters[fmt], "setup", None)
+            if callable(setup):
+                setup()
 
         flt_ls = get_components(raw_cfg, "filterer")
         for flt in flt_ls:
             self.filterers[flt] = build_service({}, flt, "filterer")
 
+        # Compile the filter expressions of the message groups (validated here, once)
+        for rcv_ls in self.message_groups.values():
+            for rcv_cfg in rcv_ls:
+                if rcv_cfg.get("filter") is not None:
+                    expression = fuse_expressions(rcv_cfg["filter"])
+                    if expression not in self.filterers:
+                        self.filterers[expression] = ExpressionFilterer(expression)
+
+        # Resolve the formatters & filterers of the destinations and message groups once
+        for dest in self.destinations.values():
+            dest.attach(self)
+        for grp_name, grp_config in self.message_groups.items():
+            self.groups[grp_name] = MsgGrp(grp_name, grp_config, self.formatters, self.filterers)
+        self.validate_outbox()
+
+    def validate_outbox(self) -> None:
+        """
+        Check the destinations can be used with the outbox: the spooled emits are sent one 
+        by one by the drainer, they are never buffered into digests.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if self.outbox is None:
+            return
+        digests = [name for name, dest in self.destinations.items() if dest.digest]
+        if digests:
+            raise ValueError(f"The destinations in digest mode can't be used with an outbox: {', '.join(digests)}")
+
+    def filter_stats(self) -> Dict[str, Dict]:
+        """
+        Get the runtime stats of all the filterers (to tune the filter chains).
+
+        Args:
+            None
+
+        Returns:
+            A dict of filterer stats (calls, seen, passed, seconds, pass_rate & cost per 
+            message) keyed on the filterer name
+        """
+        return {name: flt.stats.as_dict() for name, flt in self.filterers.items()}
+
+    def destination_health(self) -> Dict[str, Dict]:
+        """
+        Get the state of all the destinations (retries & circuit breakers).
+
+        Args:
+            None
+
+        Returns:
+            A dict of destination states (retries, state, failures, trips, retry_in & 
+            rate_limit) keyed on the destination name
+        """
+        return {name: dest.health() for name, dest in self.destinations.items()}
+
     def validate(self) -> bool:
         """
         Validate the config file (if mandatory keys exist).
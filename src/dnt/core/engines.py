@@ -0,0 +1,159 @@
+import threading
+from typing import Any, Dict, Tuple
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+
+# The pool settings applied to every engine (unless overridden by the source)
+DEFAULT_POOL_CONFIG = {
+    "pool_size": 5,
+    "max_overflow": 5,
+    "pool_timeout": 30,
+    "pool_recycle": 1800,
+    "pool_pre_ping": True,
+}
+
+# The pool settings only supported by queue-based pools
+_QUEUE_POOL_KEYS = ("pool_size", "max_overflow", "pool_timeout")
+
+
+class EngineRegistry:
+    """
+    A registry of SQLAlchemy engines, so sources pointing at the same database share one
+    connection pool.
+    """
+    def __init__(self, **pool_config: Any) -> None:
+        """
+        Initialize the registry with pool settings.
+
+        Args:
+            pool_config: The pool settings (e.g. pool_size, max_overflow, pool_timeout,
+                pool_recycle, pool_pre_ping) applied to every engine
+
+        Returns:
+            None
+        """
+        self.pool_config = {**DEFAULT_POOL_CONFIG, **pool_config}
+        self.engines: Dict[Tuple, Engine] = {}
+        self._counters: Dict[Tuple, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_key(url: str, options: Dict) -> Tuple:
+        """
+        Generate the key of an engine from the normalized URL and options.
+
+        Args:
+            url (str): The database URL
+            options (dict): The other arguments of `create_engine`
+
+        Returns:
+            A hashable key
+        """
+        url_str = make_url(url).render_as_string(hide_password=False)
+        return (url_str, tuple(sorted((k, repr(v)) for k, v in options.items())))
+
+    def _pool_options(self, url: str, options: Dict) -> Dict:
+        """
+        Merge the pool settings with the options of an engine, dropping the settings the
+        dialect's pool does not support (e.g. SQLite in memory).
+
+        Args:
+            url (str): The database URL
+            options (dict): The other arguments of `create_engine`
+
+        Returns:
+            The arguments of `create_engine`
+        """
+        pool_config = dict(self.pool_config)
+        _url = make_url(url)
+        pool_cls = options.get("poolclass") or _url.get_dialect().get_pool_class(_url)
+        if not issubclass(pool_cls, QueuePool):
+            pool_config = {k: v for k, v in pool_config.items() if k not in _QUEUE_POOL_KEYS}
+        return {**pool_config, **options}
+
+    def _track(self, key: Tuple, engine: Engine) -> None:
+        """
+        Count the connections opened & checked out of an engine's pool.
+
+        Args:
+            key (tuple): The key of the engine
+            engine (Engine): The engine to track
+
+        Returns:
+            None
+        """
+        counters = {"connects": 0, "checkouts": 0}
+        self._counters[key] = counters
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(*args):
+            counters["connects"] += 1
+
+        @event.listens_for(engine, "checkout")
+        def _on_checkout(*args):
+            counters["checkouts"] += 1
+
+    def get_engine(self, url: str, **options: Any) -> Engine:
+        """
+        Get the shared engine of a database, create it if needed.
+
+        Args:
+            url (str): The database URL
+            options: The other arguments of `create_engine`
+
+        Returns:
+            The engine
+        """
+        key = self._make_key(url, options)
+        with self._lock:
+            if key not in self.engines:
+                engine = create_engine(url, **self._pool_options(url, options))
+                self._track(key, engine)
+                self.engines[key] = engine
+            return self.engines[key]
+
+    def metrics(self) -> Dict[str, Dict]:
+        """
+        Get the pool metrics of all the engines.
+
+        Args:
+            None
+
+        Returns:
+            A dict of pool metrics keyed on the database URL (without password), followed
+            by the options of the engine if any
+        """
+        res = {}
+        for key, engine in self.engines.items():
+            name = engine.url.render_as_string(hide_password=True)
+            if key[1]:
+                name += " " + ", ".join(f"{k}={v}" for k, v in key[1])
+            pool = engine.pool
+            stats = {"status": pool.status(), **self._counters[key]}
+            if isinstance(pool, QueuePool):
+                stats.update({
+                    "size": pool.size(),
+                    "checked_in": pool.checkedin(),
+                    "checked_out": pool.checkedout(),
+                    "overflow": pool.overflow(),
+                })
+            res[name] = stats
+        return res
+
+    def dispose(self) -> None:
+        """
+        Close all the connections of all the engines.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for engine in self.engines.values():
+                engine.dispose()
+            self.engines.clear()
+            self._counters.clear()
@@ -0,0 +1,433 @@
+import ast
+import functools
+import operator
+from typing import Any, Callable, Dict, List, Optional, Union
+import numpy as np
+import pandas as pd
+from dnt.core.base import BaseFilterer, Message, MessageBatch
+
+
+# The syntax allowed in a filter expression
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.Is, ast.IsNot, ast.Name, ast.Load, ast.Constant, ast.List, ast.Tuple,
+)
+
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+# A predicate over a MessageBatch, returning a boolean mask (or Series)
+Predicate = Callable[[MessageBatch], Any]
+
+
+def fuse_expressions(expressions: Union[str, List[str]]) -> str:
+    """
+    Fuse one or several filter expressions into a single one (all of them should be true).
+
+    Args:
+        expressions (str/list): A filter expression or a list of filter expressions
+
+    Returns:
+        The fused filter expression
+    """
+    if isinstance(expressions, str):
+        return expressions
+    if len(expressions) == 1:
+        return expressions[0]
+    return " and ".join(f"({expr})" for expr in expressions)
+
+def parse_expression(expression: str) -> ast.Expression:
+    """
+    Parse and validate a filter expression, e.g. "db == 'sqlserver' and 'dev' in table_name".
+    (Only comparisons, `and`/`or`/`not`, message fields and literals are allowed, and None 
+    is only compared with `is` / `is not`.)
+
+    Args:
+        expression (str): The filter expression
+
+    Returns:
+        The syntax tree of the expression
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid filter expression {expression!r}: {e.msg}")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax in filter expression {expression!r}: {type(node).__name__}")
+        if isinstance(node, ast.Name) and node.id.startswith("__"):
+            raise ValueError(f"Unsupported field in filter expression {expression!r}: {node.id}")
+    _check_node(tree, expression)
+    return tree
+
+def _literal(node: ast.AST) -> Any:
+    """
+    Get the value of a literal node (e.g. a number, a string or a list of them).
+
+    Args:
+        node (ast.AST): The node of the literal
+
+    Returns:
+        The value of the literal, raise ValueError if the node is not a literal
+    """
+    return ast.literal_eval(node)
+
+def _is_missing(value: Any) -> bool:
+    """
+    Check whether a value is missing, i.e. None or NaN (e.g. NaN, NaT, pd.NA).
+
+    Args:
+        value (any): The value
+
+    Returns:
+        True if the value is missing
+    """
+    if value is None:
+        return True
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        # e.g. a list
+        return False
+
+def _missing_mask(values: Any, n_msg: int) -> np.ndarray:
+    """
+    Get the mask of the missing values of a column (or a literal).
+
+    Args:
+        values (any): The values of a column, or a literal
+        n_msg (int): The number of messages
+
+    Returns:
+        A boolean mask of the missing values
+    """
+    if isinstance(values, np.ndarray):
+        return np.asarray(pd.isna(values), dtype=bool)
+    return np.full(n_msg, _is_missing(values), dtype=bool)
+
+def _check_node(node: ast.AST, expression: str) -> None:
+    """
+    Check the comparisons of an expression can be evaluated with the same results on single 
+    messages & whole columns: None is only compared with `is` / `is not`, `is` only with None, 
+    and the operands are message fields or literals.
+
+    Args:
+        node (ast.AST): The root node of the expression
+        expression (str): The filter expression
+
+    Returns:
+        None
+    """
+    for sub in ast.walk(node):
+        if not isinstance(sub, ast.Compare):
+            continue
+        operands = [sub.left, *sub.comparators]
+        for op, left, right in zip(sub.ops, operands, operands[1:]):
+            if isinstance(op, (ast.Is, ast.IsNot)):
+                if not (isinstance(left, ast.Name) and isinstance(right, ast.Constant) and right.value is None):
+                    raise ValueError(f"Only `field is None` is supported in filter expression {expression!r}")
+                continue
+            for operand in (left, right):
+                if isinstance(operand, ast.Name):
+                    continue
+                try:
+                    value = _literal(operand)
+                except ValueError:
+                    raise ValueError(
+                        f"Unsupported operand in filter expression {expression!r}: {ast.dump(operand)}"
+                    )
+                if value is None or (isinstance(value, (list, tuple)) and None in value):
+                    raise ValueError(f"Use `field is None` to check missing values in filter expression {expression!r}")
+
+def _compare(op: ast.cmpop, left: Any, right: Any) -> bool:
+    """
+    Compare two values of a message, any comparison with a missing value is false (and 
+    `!=` & `not in` are their negation).
+
+    Args:
+        op (ast.cmpop): The comparison operator
+        left (any): The left value
+        right (any): The right value
+
+    Returns:
+        The result of the comparison
+    """
+    if isinstance(op, ast.Is):
+        return _is_missing(left)
+    if isinstance(op, ast.IsNot):
+        return not _is_missing(left)
+    if isinstance(op, ast.NotEq):
+        return not _compare(ast.Eq(), left, right)
+    if isinstance(op, ast.NotIn):
+        return not _compare(ast.In(), left, right)
+    if _is_missing(left) or _is_missing(right):
+        return False
+    if isinstance(op, ast.In):
+        if isinstance(left, str) and not isinstance(right, (list, tuple)):
+            # a substring of a text field, false for the other types
+            return isinstance(right, str) and left in right
+        return left in right
+    return bool(_COMPARE_OPS[type(op)](left, right))
+
+def compile_row_predicate(node: ast.AST) -> Callable[[Dict], bool]:
+    """
+    Compile (a node of) a checked filter expression into a function of the fields of a single 
+    message, with the same semantics as the vectorized predicate (see `_compare`).
+
+    Args:
+        node (ast.AST): The node to compile
+
+    Returns:
+        A function of a dict of fields
+    """
+    if isinstance(node, ast.Expression):
+        return compile_row_predicate(node.body)
+    if isinstance(node, ast.BoolOp):
+        parts = [compile_row_predicate(v) for v in node.values]
+        if isinstance(node.op, ast.And):
+            return lambda fields: all(p(fields) for p in parts)
+        return lambda fields: any(p(fields) for p in parts)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        inner = compile_row_predicate(node.operand)
+        return lambda fields: not inner(fields)
+    if isinstance(node, ast.Compare):
+        operands = [_compile_row_operand(v) for v in [node.left, *node.comparators]]
+        ops = node.ops
+
+        def _chain(fields: Dict) -> bool:
+            values = [operand(fields) for operand in operands]
+            return all(_compare(op, values[n], values[n + 1]) for n, op in enumerate(ops))
+        return _chain
+    operand = _compile_row_operand(node)
+    # a field or a literal on its own is true if set (and not empty)
+    return lambda fields: not _is_missing(operand(fields)) and bool(operand(fields))
+
+def _compile_row_operand(node: ast.AST) -> Callable[[Dict], Any]:
+    """
+    Compile an operand into a function of the fields of a single message.
+
+    Args:
+        node (ast.AST): The node of the operand
+
+    Returns:
+        A function returning the field (None if missing) or the literal
+    """
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda fields: fields.get(name)
+    value = _literal(node)
+    return lambda fields: value
+
+def _column(batch: MessageBatch, name: str) -> np.ndarray:
+    """
+    Get a column of a batch, all missing if the batch has no such column.
+
+    Args:
+        batch (MessageBatch): The batch
+        name (str): The name of the column
+
+    Returns:
+        The values of the column
+    """
+    try:
+        return batch.column(name)
+    except KeyError:
+        return np.full(len(batch), None, dtype=object)
+
+def _compile_operand(node: ast.AST) -> Optional[Predicate]:
+    """
+    Compile an operand of a comparison into a function of a batch.
+
+    Args:
+        node (ast.AST): The node of the operand
+
+    Returns:
+        A function returning the column or the literal, None if not supported
+    """
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda batch: _column(batch, name)
+    try:
+        value = _literal(node)
+    except ValueError:
+        return None
+    return lambda batch: value
+
+def _valid_values(values: Any, valid: np.ndarray) -> Any:
+    # the values of a column at the valid positions (as a Series), or a literal
+    return pd.Series(values[valid]) if isinstance(values, np.ndarray) else values
+
+def _compile_comparison(left: ast.AST, op: ast.cmpop, right: ast.AST) -> Optional[Predicate]:
+    """
+    Compile a single comparison into a vectorized predicate, only the non-missing values are
+    compared (see `_compare`).
+
+    Args:
+        left (ast.AST): The left operand
+        op (ast.cmpop): The comparison operator
+        right (ast.AST): The right operand
+
+    Returns:
+        The predicate, None if the comparison can't be vectorized
+    """
+    if isinstance(op, (ast.Is, ast.IsNot)):
+        # only `field is None` & `field is not None` (checked when parsed)
+        name = left.id
+        if isinstance(op, ast.Is):
+            return lambda batch: _missing_mask(_column(batch, name), len(batch))
+        return lambda batch: ~_missing_mask(_column(batch, name), len(batch))
+
+    negate = isinstance(op, (ast.NotEq, ast.NotIn))
+    if isinstance(op, (ast.In, ast.NotIn)):
+        if isinstance(right, ast.Name) and isinstance(left, ast.Constant) and isinstance(left.value, str):
+            # 'dev' in table_name, false for the values other than text
+            name, sub = right.id, left.value
+
+            def pred(batch: MessageBatch) -> np.ndarray:
+                values = _column(batch, name)
+                valid = np.fromiter((isinstance(v, str) for v in values), dtype=bool, count=len(values))
+                res = np.zeros(len(batch), dtype=bool)
+                if valid.any():
+                    res[valid] = pd.Series(values[valid]).str.contains(sub, regex=False).to_numpy(dtype=bool)
+                return res
+        elif isinstance(left, ast.Name) and isinstance(right, (ast.List, ast.Tuple)):
+            # db in ['mysql', 'sqlserver']
+            values_in, name = list(_literal(right)), left.id
+
+            def pred(batch: MessageBatch) -> np.ndarray:
+                values = _column(batch, name)
+                valid = ~_missing_mask(values, len(batch))
+                res = np.zeros(len(batch), dtype=bool)
+                if valid.any():
+                    res[valid] = pd.Series(values[valid]).isin(values_in).to_numpy(dtype=bool)
+                return res
+        else:
+            return None
+    else:
+        left_fn, right_fn = _compile_operand(left), _compile_operand(right)
+        if left_fn is None or right_fn is None:
+            return None
+        cmp = _COMPARE_OPS[ast.Eq if negate else type(op)]
+
+        def pred(batch: MessageBatch) -> np.ndarray:
+            left_values, right_values = left_fn(batch), right_fn(batch)
+            n_msg = len(batch)
+            valid = ~(_missing_mask(left_values, n_msg) | _missing_mask(right_values, n_msg))
+            res = np.zeros(n_msg, dtype=bool)
+            if valid.any():
+                res[valid] = np.asarray(
+                    cmp(_valid_values(left_values, valid), _valid_values(right_values, valid)), dtype=bool
+                )
+            return res
+    return (lambda batch: ~pred(batch)) if negate else pred
+
+def compile_predicate(node: ast.AST) -> Optional[Predicate]:
+    """
+    Compile (a node of) a filter expression into a vectorized predicate over a batch.
+
+    Args:
+        node (ast.AST): The node to compile
+
+    Returns:
+        The predicate, None if (part of) the expression can't be vectorized
+    """
+    if isinstance(node, ast.Expression):
+        return compile_predicate(node.body)
+    if isinstance(node, ast.BoolOp):
+        parts = [compile_predicate(v) for v in node.values]
+        if any(p is None for p in parts):
+            return None
+        op = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+        return lambda batch: functools.reduce(op, (np.asarray(p(batch), dtype=bool) for p in parts))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        inner = compile_predicate(node.operand)
+        return None if inner is None else (lambda batch: ~np.asarray(inner(batch), dtype=bool))
+    if isinstance(node, ast.Compare):
+        parts = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            part = _compile_comparison(left, op, right)
+            if part is None:
+                return None
+            parts.append(part)
+            left = right
+        return lambda batch: functools.reduce(
+            operator.and_, (np.asarray(p(batch), dtype=bool) for p in parts)
+        )
+    if isinstance(node, ast.Constant) and isinstance(node.value, bool):
+        value = node.value
+        return lambda batch: np.full(len(batch), value, dtype=bool)
+    return None
+
+
+class ExpressionFilterer(BaseFilterer):
+    """
+    A filterer defined by an expression over the fields of the messages, compiled once into
+    a vectorized column predicate (if possible) and a Python closure for single messages.
+    Both give the same results: a field is missing if it's not set, None or NaN, `field is 
+    None` is true for the missing values, any other comparison with a missing value is false 
+    (and `!=` & `not in` are their negation), and `'text' in field` is false if the field 
+    is not a string.
+    """
+    def __init__(self, expression: str) -> None:
+        """
+        Initialize the filterer with an expression, e.g. "db == 'sqlserver' and 'dev' in table_name".
+
+        Args:
+            expression (str): The filter expression
+
+        Returns:
+            None
+        """
+        self.expression = expression
+        tree = parse_expression(expression)
+        self._row_predicate = compile_row_predicate(tree)
+        self._predicate = compile_predicate(tree)
+
+    @property
+    def vectorized(self) -> bool:
+        """
+        Whether the expression is evaluated on whole columns.
+        """
+        return self._predicate is not None
+
+    def filter(self, msg: Message) -> bool:
+        """
+        Classify whether a message should be sent according to the expression.
+
+        Args:
+            msg (Message): A Message object to be filtered
+
+        Returns:
+            Whether a message should be sent
+        """
+        return self._row_predicate(msg.message)
+
+    def filter_batch(self, batch: MessageBatch) -> np.ndarray:
+        """
+        Classify a whole batch of messages according to the expression.
+        (Fall back to the messages one by one if the columns can't be compared as a whole,
+        e.g. mixed types, so the errors are the ones of single messages.)
+
+        Args:
+            batch (MessageBatch): A MessageBatch object to be filtered
+
+        Returns:
+            A boolean mask of the messages to be sent
+        """
+        if self._predicate is not None:
+            try:
+                return np.asarray(self._predicate(batch), dtype=bool)
+            except (TypeError, ValueError, AttributeError):
+                pass
+        return super().filter_batch(batch)
+
+    def __repr__(self) -> str:
+        return f"ExpressionFilterer({self.expression!r})"
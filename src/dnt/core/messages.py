@@ -1,4 +1,4 @@
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 import numpy as np
 from dnt.core.utils import (
     NOTSET,
@@ -7,8 +7,133 @@ from dnt.core.utils import (
 from dnt.core.base import (
     BaseFormatter,
     BaseFilterer,
-    Message
+    LevelIndex,
+    Message,
+    MessageBatch,
+    Messages,
+    concat_messages,
+    filter_batch,
+    filter_mask,
+    format_messages,
+    iter_batches
 )
+from dnt.core.expressions import ExpressionFilterer, fuse_expressions
+
+
+class MessageMemo:
+    """
+    A memo of the filterer & formatter results over one batch of messages, shared by all the 
+    receivers of a job, so each filterer & formatter runs at most once per message.
+    (The results are keyed on the filterer/formatter instance & the message position.)
+    """
+    def __init__(self, msg_ls: Union[List[Message], MessageBatch]) -> None:
+        """
+        Initialize the memo with a batch of messages.
+
+        Args:
+            msg_ls (list): A list of Message objects, or a MessageBatch
+
+        Returns:
+            None
+        """
+        self.msg_ls = msg_ls
+        self._lvl_no: Optional[np.ndarray] = None
+        self._level_index: Optional[LevelIndex] = None
+        self._masks: Dict[int, Tuple[BaseFilterer, np.ndarray, np.ndarray]] = {}
+        self._formatted: Dict[int, Tuple[BaseFormatter, np.ndarray, List]] = {}
+
+    @property
+    def lvl_no(self) -> np.ndarray:
+        """
+        The notification levels of the messages as numbers.
+        """
+        if self._lvl_no is None:
+            if isinstance(self.msg_ls, MessageBatch):
+                self._lvl_no = self.msg_ls.lvl_no
+            else:
+                self._lvl_no = np.array([msg.lvl_no for msg in self.msg_ls], dtype=float)
+        return self._lvl_no
+
+    def at_level(self, level: Union[float, int, str]) -> np.ndarray:
+        """
+        Get the positions of the messages at or above a notification level, from an index
+        built once for all the receivers.
+
+        Args:
+            level (float/int/str): The notification level threshold
+
+        Returns:
+            The sorted positions of the messages
+        """
+        if self._level_index is None:
+            if isinstance(self.msg_ls, MessageBatch):
+                self._level_index = self.msg_ls.level_index
+            else:
+                self._level_index = LevelIndex(self.lvl_no)
+        return self._level_index.at_level(level)
+
+    def select(self, pos: np.ndarray) -> Union[List[Message], MessageBatch]:
+        """
+        Select messages by position.
+
+        Args:
+            pos (np.ndarray): The positions of the messages
+
+        Returns:
+            A list of Message objects, or a MessageBatch
+        """
+        if isinstance(self.msg_ls, MessageBatch):
+            return self.msg_ls.select(pos)
+        return [self.msg_ls[i] for i in pos]
+
+    def mask(self, filterer: BaseFilterer, pos: np.ndarray) -> np.ndarray:
+        """
+        Get whether the filterer keeps the messages at some positions, only the messages not 
+        evaluated yet are passed to the filterer.
+
+        Args:
+            filterer (BaseFilterer): The filterer
+            pos (np.ndarray): The positions of the messages
+
+        Returns:
+            A boolean mask over the positions
+        """
+        entry = self._masks.get(id(filterer))
+        if entry is None:
+            n_msg = len(self.msg_ls)
+            entry = (filterer, np.zeros(n_msg, dtype=bool), np.zeros(n_msg, dtype=bool))
+            self._masks[id(filterer)] = entry
+        _, done, keep = entry
+        missing = pos[~done[pos]]
+        if len(missing) > 0:
+            keep[missing] = filter_mask(self.select(missing), [filterer])
+            done[missing] = True
+        return keep[pos]
+
+    def format(self, formatter: BaseFormatter, pos: np.ndarray) -> List:
+        """
+        Get the messages at some positions rendered by the formatter, only the messages not 
+        rendered yet are passed to the formatter.
+
+        Args:
+            formatter (BaseFormatter): The formatter
+            pos (np.ndarray): The positions of the messages
+
+        Returns:
+            The list of formatted messages
+        """
+        entry = self._formatted.get(id(formatter))
+        if entry is None:
+            n_msg = len(self.msg_ls)
+            entry = (formatter, np.zeros(n_msg, dtype=bool), [None] * n_msg)
+            self._formatted[id(formatter)] = entry
+        _, done, res_ls = entry
+        missing = pos[~done[pos]]
+        if len(missing) > 0:
+            for i, res in zip(missing, format_messages(formatter, self.select(missing))):
+                res_ls[i] = res
+            done[missing] = True
+        return [res_ls[i] for i in pos]
 
 
 class MsgRcv:
@@ -37,7 +162,8 @@ class MsgRcv:
     def _load_styler(self) -> Tuple[BaseFormatter, List[BaseFilterer]]:
         """
         Load formatter and filterer according to related settings.
-        (There can only be 1 formatter, but multiple filterers)
+        (There can only be 1 formatter, but multiple filterers, the filter expressions are 
+        fused into one more filterer)
 
         Args:
             None
@@ -57,6 +183,13 @@ class MsgRcv:
         if filterer_name is not None:
             filterer = [self.filterer_dic.get(fn) for fn in filterer_name]
 
+        filter_expr = self.config.get("filter") # 1 expression or a list of expressions
+        if filter_expr is not None:
+            expression = fuse_expressions(filter_expr)
+            # compiled when loading the config, or on the fly otherwise
+            expr_filterer = self.filterer_dic.get(expression) or ExpressionFilterer(expression)
+            filterer = (filterer or []) + [expr_filterer]
+
         return formatter, filterer
 
     def _filter_msg(self, msg_ls: List[Message]) -> List:
@@ -64,20 +197,19 @@ class MsgRcv:
         Filter messages according to notification level and specific rules defined by filterer(s). 
 
         Args:
-            msg_ls (list): A list of Message objects
+            msg_ls (list): A list of Message objects, or a MessageBatch
 
         Returns:
-            res_ls (list): The filtered list of Message objects
+            res_ls (list): The filtered list of Message objects (or the filtered MessageBatch)
         """
+        if isinstance(msg_ls, MessageBatch):
+            return filter_batch(msg_ls, self.filterer, self.level)
+
         if self.filterer is not None:
             filterer_ls = self.filterer if isinstance(self.filterer, list) else [self.filterer]
             
-            keep_flag_ls = []
-            for msg in msg_ls:
-                keep_flag_ls.append(
-                    np.prod([f.filter(msg) for f in filterer_ls])
-                )
-            msg_ls = [msg for n, msg in enumerate(msg_ls) if keep_flag_ls[n] > 0]
+            keep_flag_ls = filter_mask(msg_ls, filterer_ls)
+            msg_ls = [msg for n, msg in enumerate(msg_ls) if keep_flag_ls[n]]
 
         level = lvl_to_num(self.level)
         res_ls = [msg for msg in msg_ls if msg.lvl_no >= level]
@@ -94,24 +226,48 @@ class MsgRcv:
             The formatted list of messages, or list of raw messages (if no formatter assigned)
         """
         if self.formatter is not None:
-            res_ls = [self.formatter.format(msg) for msg in msg_ls]
+            res_ls = format_messages(self.formatter, msg_ls)
             return res_ls
         else:
             return msg_ls
     
-    def deliver_msg(self, msg_ls: List[Message], subject: Optional[str]=None):      
+    def collect_msg(self, msg_ls: List[Message], memo: Optional[MessageMemo]=None) -> List:
         """
-        Deliver messages to a Destination in a dict manner.
-        
+        Filter & format one batch of messages for this receiver.
+
+        Args:
+            msg_ls (list): A list of Message objects
+            memo (MessageMemo, optional): The memo of the batch shared with other receivers, 
+                to reuse the results of the same filterers & formatter
+
+        Returns:
+            The filtered & formatted list of messages
+        """
+        if memo is None:
+            return self._format_msg(self._filter_msg(msg_ls))
+
+        pos = memo.at_level(self.level)
+        if self.filterer is not None:
+            filterer_ls = self.filterer if isinstance(self.filterer, list) else [self.filterer]
+            for f in sorted(filterer_ls, key=lambda f: f.stats.rank):
+                if len(pos) == 0:
+                    break
+                pos = pos[memo.mask(f, pos)]
+        if self.formatter is not None:
+            return memo.format(self.formatter, pos)
+        return memo.select(pos)
+
+    def pack_msg(self, res_ls: List, subject: Optional[str]=None):
+        """
+        Pack the collected messages into a dict for the destination.
+
         Args:
-            msg_ls (list): A list of messages to be sent
+            res_ls (list): A list of filtered & formatted messages
             subject (str, optional): The subject of the message, None by default
 
         Returns:
-            A dict to be deliverred to the destination
+            A tuple of the destination name and a dict to be deliverred to the destination
         """
-        msg_ls = self._filter_msg(msg_ls)
-        res_ls = self._format_msg(msg_ls)
         kwargs = {
             "subject": subject, 
             "msg_ls": res_ls
@@ -122,6 +278,20 @@ class MsgRcv:
             kwargs
         )
 
+    def deliver_msg(self, msg_ls: Messages, subject: Optional[str]=None):      
+        """
+        Deliver messages to a Destination in a dict manner.
+        
+        Args:
+            msg_ls (list/iterable): A list of messages, or an iterable of message batches to be sent
+            subject (str, optional): The subject of the message, None by default
+
+        Returns:
+            A dict to be deliverred to the destination
+        """
+        parts = [self.collect_msg(batch) for batch in iter_batches(msg_ls)]
+        return self.pack_msg(concat_messages(parts), subject)
+
 class MsgGrp:
     """
     A message group class to dispatch messages to the destinations assigned in the group.
@@ -143,20 +313,28 @@ class MsgGrp:
         self.config = config
         self.formatter_dic = formatter_dic
         self.filterer_dic = filterer_dic
+        # the receivers (with their formatter & filterers) are resolved once
+        self.receivers = [MsgRcv(cfg, self.formatter_dic, self.filterer_dic) for cfg in self.config]
         
-    def deliver_msg(self, msg_ls: List[Message], subject: Optional[str]=None):
+    def deliver_msg(self, msg_ls: Messages, subject: Optional[str]=None, memo: Optional[MessageMemo]=None):
         """
         Generate the messages to be deliverred to all the destinations in the group.
+        (The batches are only iterated once, each batch is dispatched to every receiver, which 
+        share the filterer & formatter results through a memo.)
 
         Args:
-            msg_ls (list): A list of messages to be sent
+            msg_ls (list/iterable): A list of messages, or an iterable of message batches to be sent
             subject (str, optional): The subject of the message, None by default
+            memo (MessageMemo, optional): The memo of the batch shared with other groups, a new 
+                one is used for each batch if None (or for another batch)
 
         Returns:
             A list of dict (with destination, subject and messages) to be deliverred
         """
-        res_ls = []
-        for cfg in self.config:
-            rcv = MsgRcv(cfg, self.formatter_dic, self.filterer_dic)
-            res_ls.append(rcv.deliver_msg(msg_ls, subject))
-        return res_ls
+        rcv_ls = self.receivers
+        collected = [[] for _ in rcv_ls]
+        for batch in iter_batches(msg_ls):
+            batch_memo = memo if memo is not None and memo.msg_ls is batch else MessageMemo(batch)
+            for n, rcv in enumerate(rcv_ls):
+                collected[n].append(rcv.collect_msg(batch, batch_memo))
+        return [rcv.pack_msg(concat_messages(collected[n]), subject) for n, rcv in enumerate(rcv_ls)]
@@ -0,0 +1,397 @@
+import datetime
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from dnt.core.base import BaseDestination
+from dnt.core.resilience import CircuitOpenError
+
+_logger: logging.Logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """
+    A durable spool of the emits in a local SQLite database (in WAL mode), so the messages
+    survive failures & restarts until they are sent (at least once).
+    """
+    def __init__(
+        self,
+        path: str=":memory:",
+        synchronous: str="FULL",
+        max_attempts: int=5,
+        retry_interval: float=30,
+        poll_interval: float=1,
+        drain_timeout: float=30
+    ) -> None:
+        """
+        Initialize the outbox with the path of the SQLite database.
+
+        Args:
+            path (str): The path of the SQLite database, in memory (not persisted) by default
+            synchronous (str): The SQLite synchronous mode, 'FULL' (by default, each write is
+                synced to disk) or 'NORMAL' (synced at WAL checkpoints, survives crashes of the
+                process but not of the OS)
+            max_attempts (int): The maximum number of attempts to send an emit, 5 by default,
+                then it's kept as a dead letter
+            retry_interval (float): The time (in seconds) before the first retry, doubled on
+                each further attempt, 30 by default
+            poll_interval (float): The time (in seconds) the drainer waits between checks for
+                due emits, 1 by default
+            drain_timeout (float): The time (in seconds) a run waits for the outbox to be
+                drained when flushed, 30 by default
+
+        Returns:
+            None
+        """
+        if synchronous.upper() not in ("FULL", "NORMAL"):
+            raise ValueError(f"Unknown synchronous mode: {synchronous}")
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_interval = retry_interval
+        self.poll_interval = poll_interval
+        self.drain_timeout = drain_timeout
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous.upper()}")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, dest TEXT NOT NULL, params TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, next_attempt REAL NOT NULL, "
+                "dead INTEGER NOT NULL DEFAULT 0, last_error TEXT, created_at TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS outbox_due ON outbox (dest, dead, next_attempt)"
+            )
+
+    def put_many(self, items: Iterable[Tuple[str, Dict]]) -> List[int]:
+        """
+        Append emits to the outbox in a single transaction, i.e. a single sync to disk for
+        all the emits of a job.
+
+        Args:
+            items (iterable): A list of (destination name, parameters of `send_messages`)
+
+        Returns:
+            The ids of the emits
+        """
+        now = time.time()
+        created_at = datetime.datetime.now().isoformat()
+        ids = []
+        with self._lock, self._conn:
+            for dest_name, params in items:
+                cursor = self._conn.execute(
+                    "INSERT INTO outbox (dest, params, next_attempt, created_at) VALUES (?, ?, ?, ?)",
+                    (dest_name, json.dumps(params, default=str), now, created_at)
+                )
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def due(self, dest_name: str, limit: int=100) -> List[Tuple[int, Dict]]:
+        """
+        Get the emits of a destination due to be sent, oldest first.
+
+        Args:
+            dest_name (str): The name of the destination
+            limit (int): The maximum number of emits, 100 by default
+
+        Returns:
+            A list of (id, parameters of `send_messages`)
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, params FROM outbox WHERE dest = ? AND dead = 0 AND next_attempt <= ? "
+                "ORDER BY id LIMIT ?",
+                (dest_name, time.time(), limit)
+            ).fetchall()
+        return [(entry_id, json.loads(params)) for entry_id, params in rows]
+
+    def ack(self, entry_id: int) -> None:
+        """
+        Remove an emit once sent.
+
+        Args:
+            entry_id (int): The id of the emit
+
+        Returns:
+            None
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+
+    def fail(self, entry_id: int, error: str, transient: bool=True) -> bool:
+        """
+        Record a failed attempt to send an emit, and schedule its retry (with an exponential
+        backoff) or keep it as a dead letter after `max_attempts` (or right away if the error 
+        is not transient).
+
+        Args:
+            entry_id (int): The id of the emit
+            error (str): The error of the attempt
+            transient (bool): Whether the error is worth a retry, True by default
+
+        Returns:
+            Whether the emit will be retried
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT attempts FROM outbox WHERE id = ?", (entry_id,)).fetchone()
+            if row is None:
+                return False
+            attempts = row[0] + 1
+            retry = transient and attempts < self.max_attempts
+            self._conn.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt = ?, dead = ?, last_error = ? WHERE id = ?",
+                (
+                    attempts,
+                    time.time() + self.retry_interval * 2 ** (attempts - 1),
+                    int(not retry),
+                    error,
+                    entry_id
+                )
+            )
+        return retry
+
+    def bury(self, dest_name: str, error: str) -> int:
+        """
+        Keep all the emits of a destination waiting to be sent as dead letters (e.g. the 
+        destination is no longer configured).
+
+        Args:
+            dest_name (str): The name of the destination
+            error (str): The reason
+
+        Returns:
+            The number of emits buried
+        """
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE outbox SET dead = 1, last_error = ? WHERE dest = ? AND dead = 0", (error, dest_name)
+            ).rowcount
+
+    def requeue(self, dest_name: Optional[str]=None, dead: bool=False) -> int:
+        """
+        Make the emits waiting for a retry due now (e.g. once a destination is fixed).
+
+        Args:
+            dest_name (str, optional): The name of the destination, all by default
+            dead (bool): Whether to requeue the dead letters too (with their attempts reset),
+                False by default
+
+        Returns:
+            The number of emits requeued
+        """
+        query = (
+            "UPDATE outbox SET next_attempt = ?, attempts = CASE WHEN dead = 1 THEN 0 ELSE attempts END, "
+            "dead = 0 WHERE (dead = 0 OR ?)"
+        )
+        params: list = [time.time(), int(dead)]
+        if dest_name is not None:
+            query += " AND dest = ?"
+            params.append(dest_name)
+        with self._lock, self._conn:
+            return self._conn.execute(query, params).rowcount
+
+    def destinations(self) -> Set[str]:
+        """
+        Get the names of the destinations with emits to be sent.
+
+        Args:
+            None
+
+        Returns:
+            A set of destination names
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT dest FROM outbox WHERE dead = 0").fetchall()
+        return {row[0] for row in rows}
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the counters of the outbox.
+
+        Args:
+            None
+
+        Returns:
+            A dict of pending (to be sent or retried), due (to be sent now) & dead emits
+        """
+        with self._lock:
+            pending, due, dead = self._conn.execute(
+                "SELECT COALESCE(SUM(dead = 0), 0), COALESCE(SUM(dead = 0 AND next_attempt <= ?), 0), "
+                "COALESCE(SUM(dead), 0) FROM outbox",
+                (time.time(),)
+            ).fetchone()
+        return {"pending": pending, "due": due, "dead": dead}
+
+    def close(self) -> None:
+        """
+        Close the SQLite database.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._conn.close()
+
+
+class OutboxDrainer:
+    """
+    A background sender of the emits in an outbox, with one thread per destination so a slow
+    or failing destination doesn't hold back the others.
+    """
+    def __init__(self, outbox: Outbox, destinations: Dict[str, BaseDestination], batch_size: int=100) -> None:
+        """
+        Initialize the drainer with an outbox and the destinations.
+
+        Args:
+            outbox (Outbox): The outbox to drain
+            destinations (dict): The destinations keyed on their names
+            batch_size (int): The maximum number of emits read from the outbox at once, 100 by
+                default
+
+        Returns:
+            None
+        """
+        self.outbox = outbox
+        self.destinations = destinations
+        self.batch_size = batch_size
+        self._lanes: Dict[str, Tuple[threading.Thread, threading.Event]] = {}
+        self._lanes_lock = threading.Lock()
+        self._stop = threading.Event()
+        # signalled by the threads on each change, for `wait_idle`
+        self._progress = threading.Condition()
+
+    def start(self) -> None:
+        """
+        Start sending the emits left in the outbox (e.g. by a previous run).
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.notify(self.outbox.destinations())
+
+    def notify(self, dest_names: Iterable[str]) -> None:
+        """
+        Wake up (or start) the threads of destinations with new emits. The emits of the 
+        destinations not configured (any more) are kept as dead letters, they would never be sent.
+
+        Args:
+            dest_names (iterable): The names of the destinations
+
+        Returns:
+            None
+        """
+        with self._lanes_lock:
+            for dest_name in dest_names:
+                if self._stop.is_set():
+                    continue
+                if dest_name not in self.destinations:
+                    n_buried = self.outbox.bury(dest_name, "Unknown destination")
+                    _logger.error(f"Gave up sending {n_buried} emit(s) to the unknown destination {dest_name}")
+                    continue
+                if dest_name not in self._lanes:
+                    wake = threading.Event()
+                    thread = threading.Thread(
+                        target=self._drain, args=(dest_name, wake), name=f"dnt-outbox-{dest_name}", daemon=True
+                    )
+                    self._lanes[dest_name] = (thread, wake)
+                    thread.start()
+                self._lanes[dest_name][1].set()
+
+    def _signal(self) -> None:
+        """
+        Wake up the callers of `wait_idle` to check the outbox again.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self._progress:
+            self._progress.notify_all()
+
+    def _drain(self, dest_name: str, wake: threading.Event) -> None:
+        """
+        Send the emits of a destination until stopped, the failed ones are retried later.
+
+        Args:
+            dest_name (str): The name of the destination
+            wake (threading.Event): The event set on new emits
+
+        Returns:
+            None
+        """
+        dest = self.destinations[dest_name]
+        while not self._stop.is_set():
+            wake.clear()
+            entries = self.outbox.due(dest_name, self.batch_size)
+            if not entries:
+                # the emits waiting for a retry may be due on the next check
+                self._signal()
+                wake.wait(self.outbox.poll_interval)
+                continue
+            for entry_id, params in entries:
+                if self._stop.is_set():
+                    return
+                try:
+                    dest.deliver(params)
+                except CircuitOpenError as e:
+                    # not counted as an attempt, sent once the destination is probed again
+                    self._signal()
+                    wake.wait(max(e.retry_in, self.outbox.poll_interval))
+                    break
+                except Exception as e:
+                    if not self.outbox.fail(entry_id, repr(e), dest.is_transient(e)):
+                        _logger.error(f"Gave up sending emit {entry_id} to {dest_name}: {e!r}")
+                else:
+                    self.outbox.ack(entry_id)
+                self._signal()
+
+    def wait_idle(self, timeout: Optional[float]=None) -> bool:
+        """
+        Wait until no emit is due, i.e. all sent or waiting for a retry. (The outbox is checked 
+        again each time a thread makes progress.)
+
+        Args:
+            timeout (float, optional): The maximum time (in seconds) to wait, no limit by default
+
+        Returns:
+            Whether the outbox is idle
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._progress:
+            while self.outbox.stats()["due"] > 0:
+                if self._stop.is_set():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._progress.wait(remaining)
+        return True
+
+    def stop(self, timeout: Optional[float]=None) -> None:
+        """
+        Stop the threads after their current send (the emits left are kept in the outbox).
+
+        Args:
+            timeout (float, optional): The maximum time (in seconds) to wait for each thread
+
+        Returns:
+            None
+        """
+        self._stop.set()
+        self._signal()
+        with self._lanes_lock:
+            lanes, self._lanes = list(self._lanes.values()), {}
+        for thread, wake in lanes:
+            wake.set()
+            thread.join(timeout)
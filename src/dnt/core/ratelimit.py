@@ -0,0 +1,220 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Union
+
+
+class RateLimitExceeded(RuntimeError):
+    """
+    An error raised when an emit can't be queued because the queue of a rate limiter is full.
+    """
+    def __init__(self, max_queue: int) -> None:
+        """
+        Initialize the error with the size of the queue.
+
+        Args:
+            max_queue (int): The maximum number of queued emits
+
+        Returns:
+            None
+        """
+        self.max_queue = max_queue
+        super().__init__(f"The rate limit queue is full ({max_queue} emits waiting)")
+
+
+class TokenBucket:
+    """
+    A token bucket refilled at a constant rate up to a burst. The tokens can be reserved in
+    advance (the balance going negative), so the callers are served in order.
+    """
+    def __init__(self, rate: float, burst: float) -> None:
+        """
+        Initialize the bucket, full.
+
+        Args:
+            rate (float): The number of tokens added per second
+            burst (float): The maximum number of tokens
+
+        Returns:
+            None
+        """
+        if rate <= 0 or burst <= 0:
+            raise ValueError(f"The rate & burst should be > 0: {rate}, {burst}")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        Take tokens from the bucket (not thread-safe).
+
+        Args:
+            amount (float): The number of tokens
+            now (float): The current time (from `time.monotonic`)
+
+        Returns:
+            The time (in seconds) to wait until the tokens are available
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, amount: float) -> None:
+        """
+        Give back reserved tokens (not thread-safe).
+
+        Args:
+            amount (float): The number of tokens
+
+        Returns:
+            None
+        """
+        self.tokens = min(self.burst, self.tokens + amount)
+
+
+class RateLimiter:
+    """
+    A rate limiter of a destination in sends (e.g. emails) & bytes per second. The sends over
+    the limit wait in a bounded queue (in order) instead of failing.
+    """
+    def __init__(
+        self,
+        messages_per_sec: Optional[float]=None,
+        bytes_per_sec: Optional[float]=None,
+        burst: Optional[float]=None,
+        burst_bytes: Optional[float]=None,
+        max_queue: int=100
+    ) -> None:
+        """
+        Initialize the rate limiter, at least one of the rates should be set.
+
+        Args:
+            messages_per_sec (float, optional): The maximum number of sends per second, a send
+                (e.g. an email) counts as one message
+            bytes_per_sec (float, optional): The maximum size of the sent messages per second
+            burst (float, optional): The number of sends allowed at once, `messages_per_sec`
+                (i.e. 1 second) by default
+            burst_bytes (float, optional): The size allowed at once, `bytes_per_sec` (i.e.
+                1 second) by default
+            max_queue (int): The maximum number of sends waiting, 100 by default (then
+                RateLimitExceeded is raised, 0 to never wait)
+
+        Returns:
+            None
+        """
+        if messages_per_sec is None and bytes_per_sec is None:
+            raise ValueError("The rate limit should define messages_per_sec and/or bytes_per_sec")
+        self.max_queue = max_queue
+        self.msg_bucket: Optional[TokenBucket] = None
+        self.byte_bucket: Optional[TokenBucket] = None
+        if messages_per_sec is not None:
+            self.msg_bucket = TokenBucket(messages_per_sec, burst or messages_per_sec)
+        if bytes_per_sec is not None:
+            self.byte_bucket = TokenBucket(bytes_per_sec, burst_bytes or bytes_per_sec)
+        self.queued = 0
+        self.max_queued = 0
+        self.acquired = 0
+        self.rejected = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, n_bytes: int) -> float:
+        """
+        Reserve a send, queued if it has to wait (rejected if it has to wait and the queue 
+        is full).
+
+        Args:
+            n_bytes (int): The size of the send
+
+        Returns:
+            The time (in seconds) to wait
+        """
+        now = time.monotonic()
+        with self._lock:
+            delay = 0.0
+            if self.msg_bucket is not None:
+                delay = self.msg_bucket.reserve(1, now)
+            if self.byte_bucket is not None:
+                delay = max(delay, self.byte_bucket.reserve(n_bytes, now))
+            if delay > 0 and self.queued >= self.max_queue:
+                if self.msg_bucket is not None:
+                    self.msg_bucket.refund(1)
+                if self.byte_bucket is not None:
+                    self.byte_bucket.refund(n_bytes)
+                self.rejected += 1
+                raise RateLimitExceeded(self.max_queue)
+            self.acquired += 1
+            if delay > 0:
+                self.queued += 1
+                self.max_queued = max(self.max_queued, self.queued)
+                self.waits += 1
+                self.wait_seconds += delay
+                self.max_wait = max(self.max_wait, delay)
+        return delay
+
+    def _release(self) -> None:
+        with self._lock:
+            self.queued -= 1
+
+    def acquire(self, n_bytes: int=0) -> float:
+        """
+        Wait for a send to be allowed.
+
+        Args:
+            n_bytes (int): The size of the send, 0 by default
+
+        Returns:
+            The time (in seconds) waited
+        """
+        delay = self._reserve(n_bytes)
+        if delay > 0:
+            try:
+                time.sleep(delay)
+            finally:
+                self._release()
+        return delay
+
+    async def acquire_async(self, n_bytes: int=0) -> float:
+        """
+        Wait for a send to be allowed without blocking the event loop.
+
+        Args:
+            n_bytes (int): The size of the send, 0 by default
+
+        Returns:
+            The time (in seconds) waited
+        """
+        delay = self._reserve(n_bytes)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._release()
+        return delay
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Get the counters of the rate limiter.
+
+        Args:
+            None
+
+        Returns:
+            A dict of the current & maximum queue depth, the sends acquired, rejected (queue
+            full) & waiting, and the total, average & maximum wait time (in seconds)
+        """
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "max_queued": self.max_queued,
+                "acquired": self.acquired,
+                "rejected": self.rejected,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "avg_wait": self.wait_seconds / self.waits if self.waits else 0.0,
+                "max_wait": self.max_wait,
+            }
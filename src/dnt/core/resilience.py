@@ -0,0 +1,213 @@
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    An error raised when a destination is not called because its circuit is open.
+    """
+    def __init__(self, name: str, retry_in: float) -> None:
+        """
+        Initialize the error with the destination name and the time before the next probe.
+
+        Args:
+            name (str): The name of the destination
+            retry_in (float): The time (in seconds) before the destination is probed again
+
+        Returns:
+            None
+        """
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"The circuit of {name} is open, probed again in {retry_in:.1f}s")
+
+
+class RetryPolicy:
+    """
+    A retry policy with an exponential backoff and (full) jitter, so the retries of concurrent
+    jobs are spread out.
+    """
+    def __init__(self, retries: int=0, backoff: float=0.5, max_backoff: float=30, jitter: bool=True) -> None:
+        """
+        Initialize the policy.
+
+        Args:
+            retries (int): The maximum number of retries, 0 by default (never retried)
+            backoff (float): The time (in seconds) before the first retry, doubled on each
+                further retry, 0.5 by default
+            max_backoff (float): The maximum time (in seconds) between retries, 30 by default
+            jitter (bool): Whether to wait a random time up to the backoff, True by default
+
+        Returns:
+            None
+        """
+        if retries < 0:
+            raise ValueError(f"The number of retries should be >= 0: {retries}")
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+    def delay(self, attempt: int) -> float:
+        """
+        Get the time to wait before a retry.
+
+        Args:
+            attempt (int): The number of the failed attempt (starting from 1)
+
+        Returns:
+            The time to wait (in seconds)
+        """
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker, opened after consecutive failures so a destination which is down is
+    fast-failed instead of being called on every emit, then half-opened after a while to let
+    a single call probe it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int=5, reset_timeout: float=60) -> None:
+        """
+        Initialize the breaker, closed.
+
+        Args:
+            threshold (int): The number of consecutive failures opening the circuit, 5 by default
+            reset_timeout (float): The time (in seconds) the circuit stays open before a probe,
+                60 by default
+
+        Returns:
+            None
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.trips = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _current_state(self) -> str:
+        # an open circuit is half-opened once the reset timeout is over
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    @property
+    def state(self) -> str:
+        """
+        The state of the circuit ('closed', 'open' or 'half_open').
+        """
+        with self._lock:
+            return self._current_state()
+
+    def retry_in(self) -> float:
+        """
+        Get the time before an open circuit is probed.
+
+        Args:
+            None
+
+        Returns:
+            The time (in seconds), 0 if not open
+        """
+        with self._lock:
+            if self._current_state() != self.OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """
+        Check whether a call can go through, i.e. the circuit is closed, or half-open and no
+        other call is probing it.
+
+        Args:
+            None
+
+        Returns:
+            True if the call can go through
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """
+        Give up a call let through without a result (e.g. cancelled), so another call can 
+        probe a half-open circuit.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        """
+        Record a successful call, closing the circuit.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """
+        Record a failed call, opening the circuit after `threshold` consecutive failures (or
+        a failed probe).
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.failures += 1
+            if self._current_state() == self.HALF_OPEN or self.failures >= self.threshold:
+                if self._state != self.OPEN:
+                    self.trips += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def as_dict(self) -> Dict[str, Optional[float]]:
+        """
+        Get the state of the breaker.
+
+        Args:
+            None
+
+        Returns:
+            A dict of the state, the consecutive failures, the number of times the circuit was
+            opened & the time before the next probe
+        """
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+            return {"state": state, "failures": self.failures, "trips": self.trips, "retry_in": retry_in}
@@ -1,91 +1,1050 @@
-from typing import List, Optional
-from dnt.core.utils import dict_drop_key
-from dnt.core.base import BaseSource, BaseDestination, Message
-from dnt.core.messages import MsgGrp
+import asyncio
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from dnt.core.utils import NOTSET, dict_drop_key, lvl_to_num
+from dnt.core.base import BaseSource, BaseDestination, Message, MessageBatch, Messages, iter_batches
+from dnt.core.messages import MessageMemo, MsgGrp
+from dnt.core.checkpoint import Progress
 from dnt.core.config import Config
+from dnt.core.outbox import OutboxDrainer
+
+_logger: logging.Logger = logging.getLogger(__name__)
+
+class FetchError(RuntimeError):
+    """
+    An error raised when one or more sources of a job fail to get messages.
+    """
+    def __init__(self, errors: List[Tuple[str, Exception]]) -> None:
+        """
+        Initialize the error with the errors of all failed sources.
+
+        Args:
+            errors (list): A list of (source name, exception)
+
+        Returns:
+            None
+        """
+        self.errors = errors
+        details = "; ".join(f"{name}: {exc!r}" for name, exc in errors)
+        super().__init__(f"{len(errors)} source(s) failed to get messages: {details}")
+
+
+class DeliveryError(RuntimeError):
+    """
+    An error raised when the messages of a job fail to be sent to one or more destinations.
+    """
+    def __init__(self, errors: List[Tuple[str, Exception]]) -> None:
+        """
+        Initialize the error with the errors of all failed destinations.
+
+        Args:
+            errors (list): A list of (destination name, exception)
+
+        Returns:
+            None
+        """
+        self.errors = errors
+        details = "; ".join(f"{name}: {exc!r}" for name, exc in errors)
+        super().__init__(f"{len(errors)} destination(s) failed to send messages: {details}")
+
+
+class EmitTimeoutError(TimeoutError):
+    """
+    An error raised when a job stops waiting for the emits to a destination after its 
+    `emit_timeout`. The emits are not stopped, so they may still be deliverred.
+    """
+    def __init__(self, timeout: float) -> None:
+        """
+        Initialize the error with the timeout of the destination.
+
+        Args:
+            timeout (float): The time (in seconds) the job waited
+
+        Returns:
+            None
+        """
+        self.timeout = timeout
+        super().__init__(f"Timed out after {timeout}s, the emits may still be deliverred")
+
+
+def _maybe_deliverred(error: Exception) -> bool:
+    """
+    Check whether a job failed only because it stopped waiting for emits still in flight.
+
+    Args:
+        error (Exception): The error of the job
+
+    Returns:
+        True if all the failed emits timed out
+    """
+    if isinstance(error, DeliveryError):
+        return all(isinstance(exc, EmitTimeoutError) for _, exc in error.errors)
+    return isinstance(error, EmitTimeoutError)
+
+
+def _log_late_error(dest_name: str, future: Union[Future, "asyncio.Future"]) -> None:
+    """
+    Log the failure of emits which finished after the job stopped waiting for them.
+
+    Args:
+        dest_name (str): The name of the destination
+        future (Future): The future of the emits
+
+    Returns:
+        None
+    """
+    if not future.cancelled() and future.exception() is not None:
+        _logger.error(f"An emit to {dest_name} failed after its timeout: {future.exception()!r}")
+
+
+class _SlotIterator:
+    """
+    An iterator over the batches of a streaming source holding a fetch slot from its first 
+    batch until it is exhausted or closed, as the rows are only fetched while it's iterated.
+    """
+    def __init__(self, batches: Iterable, slots: threading.BoundedSemaphore) -> None:
+        """
+        Initialize the iterator with the batches and the fetch slots.
+
+        Args:
+            batches (iterable): The batches of the source
+            slots (threading.BoundedSemaphore): The fetch slots of the runner
+
+        Returns:
+            None
+        """
+        self._batches = batches
+        self._slots = slots
+        self._iterator: Optional[Iterator] = None
+        self._held = False
+        self._closed = False
+
+    def __iter__(self) -> "_SlotIterator":
+        return self
+
+    def __next__(self) -> Union[List, MessageBatch]:
+        if self._closed:
+            raise StopIteration
+        try:
+            if self._iterator is None:
+                self._slots.acquire()
+                self._held = True
+                self._iterator = iter(self._batches)
+            return next(self._iterator)
+        except BaseException:
+            # exhausted or failed
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """
+        Stop iterating the batches and release the fetch slot.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._closed = True
+        if self._iterator is not None and hasattr(self._iterator, "close"):
+            self._iterator.close()
+        if self._held:
+            self._held = False
+            self._slots.release()
+
+    def __del__(self) -> None:
+        self.close()
+
 
 class Runner:
     """
     A runner class to orchestrate the whole process.
     """
-    def __init__(self, config: Config) -> None:
+    def __init__(
+        self, 
+        config: Config, 
+        max_fetch_workers: int=8, 
+        job_fetch_workers: int=4,
+        max_emit_workers: int=8
+    ) -> None:
         """
         Initialize the runner with a config object.
 
         Args:
             config (Config): The config of the runner
+            max_fetch_workers (int): The maximum number of concurrent source fetches across 
+                all jobs, 8 by default
+            job_fetch_workers (int): The default maximum number of concurrent source fetches 
+                within a job (can be overridden by `max_workers` in the job config), 4 by default
+            max_emit_workers (int): The maximum number of concurrent emits across all 
+                destinations, 8 by default (each destination is also limited by its own
+                `max_concurrency`, the destinations with a rate limit or retries run their 
+                emits on their own `max_concurrency` threads instead)
 
         Returns:
             None
         """
         self.config: Config = config
+        self.job_fetch_workers = job_fetch_workers
+        self._fetch_slots = threading.BoundedSemaphore(max_fetch_workers)
+        self._emit_executor = ThreadPoolExecutor(max_workers=max_emit_workers, thread_name_prefix="dnt-emit")
+        self._dest_slots: Dict[int, threading.BoundedSemaphore] = {}
+        self._dest_executors: Dict[int, ThreadPoolExecutor] = {}
+        self._dest_slots_lock = threading.Lock()
+        # with an outbox, the emits are spooled & sent in the background
+        self.drainer: Optional[OutboxDrainer] = None
+        if config.outbox is not None:
+            config.validate_outbox()
+            self.drainer = OutboxDrainer(config.outbox, config.destinations)
+            self.drainer.start()
 
-    def run_single_job(self, job_name: str) -> None:
+    def _get_destination(self, dest_name: str) -> BaseDestination:
         """
-        Run a specific job according to the given name.
+        Get a destination service by name.
 
         Args:
-            job_name (str): The name of the job to be run
+            dest_name (str): The name of the destination
+
+        Returns:
+            The destination service
+        """
+        if dest_name not in self.config.destinations:
+            raise ValueError(f"The destination `{dest_name}` is not found")
+        return self.config.destinations[dest_name]
+
+    def _get_targets(self, job_config: Dict) -> List[Union[MsgGrp, BaseDestination]]:
+        """
+        Load the message groups and single destinations a job sends messages to.
+
+        Args:
+            job_config (dict): The config of the job
+
+        Returns:
+            A list of message groups and/or destinations
+        """
+        targets = []
+        for msg_grp_nm in job_config["send_messages"]:
+            if msg_grp_nm in self.config.message_groups:
+                # send to a group
+                msg_grp_cfg = self.config.message_groups[msg_grp_nm]
+                for rcv_cfg in msg_grp_cfg:
+                    self._get_destination(rcv_cfg.get("dest"))
+                targets.append(self.config.groups[msg_grp_nm])
+            elif msg_grp_nm in self.config.destinations:
+                # send to a single destination
+                targets.append(self.config.destinations[msg_grp_nm])
+            else:
+                raise ValueError(f"The destination `{msg_grp_nm}` is not found, should either be a destination or a message group")
+        return targets
+
+    def _target_destinations(self, targets: List[Union[MsgGrp, BaseDestination]]) -> List[BaseDestination]:
+        """
+        Get the destinations of the receivers & single destinations of a job.
+
+        Args:
+            targets (list): A list of message groups and/or destinations
+
+        Returns:
+            A list of destinations
+        """
+        destinations = []
+        for target in targets:
+            if isinstance(target, MsgGrp):
+                destinations.extend(self._get_destination(rcv_cfg["dest"]) for rcv_cfg in target.config)
+            else:
+                destinations.append(target)
+        return destinations
+
+    def _min_level(self, targets: List[Union[MsgGrp, BaseDestination]]) -> Union[float, int]:
+        """
+        Get the minimum effective level across all the receivers & destinations of a job, 
+        any message below it would be dropped anyway.
+        (The messages rendered by the formatter of a receiver are not filtered by the level of 
+        its destination, so only the receiver level applies.)
+
+        Args:
+            targets (list): A list of message groups and/or destinations
+
+        Returns:
+            The minimum notification level
+        """
+        levels = []
+        for target in targets:
+            if isinstance(target, MsgGrp):
+                for rcv in target.receivers:
+                    rcv_level = lvl_to_num(rcv.level)
+                    if rcv.formatter is None:
+                        rcv_level = max(rcv_level, lvl_to_num(self._get_destination(rcv.dest).level))
+                    levels.append(rcv_level)
+            else:
+                levels.append(lvl_to_num(target.level))
+        return min(levels, default=NOTSET)
+
+    def _source_calls(
+        self, 
+        job_config: Dict, 
+        min_level: Union[float, int], 
+        progress: Optional[Progress]=None
+    ) -> List[Tuple[BaseSource, Dict]]:
+        """
+        Get the sources of a job with the parameters of `get_messages`.
+
+        Args:
+            job_config (dict): The config of the job
+            min_level (float/int): The minimum level to push down to the sources supporting it
+            progress (Progress, optional): The progress of the job run, passed to the sources 
+                whose results depend on their checkpoints
+
+        Returns:
+            A list of (source, parameters)
+        """
+        calls = []
+        for cfg in job_config["get_messages"]:
+            source = self.config.sources[cfg["service"]]
+            params = dict_drop_key(cfg, "service")
+            if source.supports_level_pushdown and min_level > NOTSET and "min_level" not in params:
+                params["min_level"] = min_level
+            if progress is not None and source.tracks_progress and not self._cacheable(source, params):
+                params["progress"] = progress
+            calls.append((source, params))
+        return calls
+
+    @staticmethod
+    def _cacheable(source: BaseSource, params: Dict) -> bool:
+        """
+        Check whether the result of a source can be cached.
+
+        Args:
+            source (BaseSource): The source to get messages from
+            params (dict): The parameters of `get_messages`
+
+        Returns:
+            True if the result can be cached
+        """
+        return source.cacheable and params.get("watermark") is None
+
+    def _fetch(self, source: BaseSource, params: Dict) -> Messages:
+        """
+        Get the messages from a source, through the result cache if enabled.
+        (Watermark queries & tailing sources are never cached as their results depend on 
+        the checkpoints.)
+
+        Args:
+            source (BaseSource): The source to get messages from
+            params (dict): The parameters of `get_messages`
+
+        Returns:
+            The messages
+        """
+        cache = self.config.result_cache
+        if cache is None or not self._cacheable(source, params):
+            return source.get_messages(**params)
+        return cache.get_or_fetch(source, params, lambda: source.get_messages(**params))
+
+    def _fetch_limited(self, source: BaseSource, params: Dict) -> Messages:
+        """
+        Get the messages from a source, within the global concurrency limit.
+        (The batches of a streaming source hold a slot again while they are iterated.)
+
+        Args:
+            source (BaseSource): The source to get messages from
+            params (dict): The parameters of `get_messages`
+
+        Returns:
+            The messages
+        """
+        with self._fetch_slots:
+            result = self._fetch(source, params)
+        return self._hold_slot(result)
+
+    def _hold_slot(self, result: Messages) -> Messages:
+        """
+        Make the batches of a streaming source hold a fetch slot while they are iterated.
+
+        Args:
+            result (list/iterable): The messages of a source
+
+        Returns:
+            The messages
+        """
+        if isinstance(result, (list, MessageBatch)):
+            return result
+        return _SlotIterator(result, self._fetch_slots)
+
+    def _fetch_all(
+        self, 
+        job_config: Dict, 
+        min_level: Union[float, int]=NOTSET, 
+        progress: Optional[Progress]=None
+    ) -> List[Messages]:
+        """
+        Get the messages from all the sources of a job, concurrently on a thread pool if the 
+        job has several sources. The results keep the order of the sources in the config.
+        (Streaming sources only start their query here, the rows are fetched when iterated.)
+
+        Args:
+            job_config (dict): The config of the job
+            min_level (float/int): The minimum level to push down to the sources supporting it
+            progress (Progress, optional): The progress of the job run
+
+        Returns:
+            A list of messages, one per source
+        """
+        calls = self._source_calls(job_config, min_level, progress)
+        max_workers = min(len(calls), job_config.get("max_workers", self.job_fetch_workers))
+        if max_workers <= 1:
+            return [self._fetch_limited(source, params) for (source, params) in calls]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._fetch_limited, source, params) for (source, params) in calls]
+
+        results, errors = [], []
+        for (source, _), future in zip(calls, futures):
+            exc = future.exception()
+            if exc is None:
+                results.append(future.result())
+            else:
+                errors.append((source.name, exc))
+        if errors:
+            raise FetchError(errors) from errors[0][1]
+        return results
+
+    @staticmethod
+    def _get_messages(results: List[Messages]) -> Iterator[List[Message]]:
+        """
+        Chain the messages of a job from all its sources, batch by batch.
+
+        Args:
+            results (list): A list of messages, one per source
+
+        Returns:
+            A generator of message batches
+        """
+        for _result in results:
+            for batch in iter_batches(_result):
+                yield batch
+
+    def _collect_delivery(
+        self,
+        targets: List[Union[MsgGrp, BaseDestination]],
+        batch: List[Message],
+        subject: str
+    ) -> List[Tuple[BaseDestination, Dict]]:
+        """
+        Dispatch one batch of messages to all the targets of a job, filtered & formatted 
+        by the receivers and the destinations.
+
+        Args:
+            targets (list): A list of message groups and/or destinations
+            batch (list): A batch of messages
+            subject (str): The subject of the message
+
+        Returns:
+            A list of (destination, parameters of `send_messages`) to be emitted
+        """
+        delivery = []
+        # the filterer & formatter results are shared by all the message groups
+        memo = MessageMemo(batch)
+        for target in targets:
+            if isinstance(target, MsgGrp):
+                for (dest_name, kwargs) in target.deliver_msg(batch, subject, memo):
+                    dest = self._get_destination(dest_name)
+                    delivery.append((dest, dest._prepare(**kwargs)))
+            else:
+                delivery.append((target, target._prepare(batch, subject)))
+        return delivery
+
+    def _get_delivery(
+        self, 
+        subject: str, 
+        targets: List[Union[MsgGrp, BaseDestination]],
+        results: List[Messages]
+    ) -> List[Tuple[BaseDestination, Dict]]:
+        """
+        Dispatch the messages of a job to the targets. Each batch is filtered & formatted as 
+        soon as it is fetched, so only the rendered messages are kept until the emits (and 
+        the records of the filtered messages for the destinations attaching them).
+
+        Args:
+            subject (str): The subject of the message
+            targets (list): A list of message groups and/or destinations
+            results (list): A list of messages, one per source
+
+        Returns:
+            A list of (destination, parameters of `send_messages`) to be emitted
+        """
+        delivery: Optional[List[Tuple[BaseDestination, Dict]]] = None
+        for batch in self._get_messages(results):
+            _delivery = self._collect_delivery(targets, batch, subject)
+            if delivery is None:
+                delivery = _delivery
+                continue
+            for (_, params), (_, _params) in zip(delivery, _delivery):
+                params["msg_ls"].extend(_params["msg_ls"])
+                if "records" in params:
+                    params["records"].extend(_params["records"])
+        if delivery is None:
+            delivery = self._collect_delivery(targets, [], subject)
+        return delivery
+
+    def _dest_slot(self, dest: BaseDestination) -> threading.BoundedSemaphore:
+        """
+        Get the semaphore limiting the concurrent emits to a destination (across jobs).
+
+        Args:
+            dest (BaseDestination): The destination
+
+        Returns:
+            The semaphore of the destination
+        """
+        with self._dest_slots_lock:
+            if id(dest) not in self._dest_slots:
+                self._dest_slots[id(dest)] = threading.BoundedSemaphore(max(1, dest.max_concurrency))
+            return self._dest_slots[id(dest)]
+
+    def _lane_executor(self, dest: BaseDestination) -> ThreadPoolExecutor:
+        """
+        Get the executor running the emits to a destination. The destinations which may wait 
+        (for a turn of their rate limit, or before a retry) have their own threads, so the 
+        waiting emits don't hold the threads shared by the other destinations.
+
+        Args:
+            dest (BaseDestination): The destination
+
+        Returns:
+            The executor of the destination
+        """
+        if dest.rate_limiter is None and dest.retry.retries == 0:
+            return self._emit_executor
+        with self._dest_slots_lock:
+            if id(dest) not in self._dest_executors:
+                self._dest_executors[id(dest)] = ThreadPoolExecutor(
+                    max_workers=max(1, dest.max_concurrency), thread_name_prefix=f"dnt-emit-{dest.name}"
+                )
+            return self._dest_executors[id(dest)]
+
+    def _emit_all(self, delivery: List[Tuple[BaseDestination, Dict]]) -> None:
+        """
+        Send the messages to all destinations concurrently, so the job takes about as long as 
+        the slowest destination. The emits to a destination start in order, up to its 
+        `max_concurrency` at a time, and the job stops waiting for them after its `emit_timeout`
+        (they go on in the background, see EmitTimeoutError).
+
+        Args:
+            delivery (list): A list of (destination, parameters of `send_messages`) to be emitted
 
         Returns:
             None
         """
+        by_dest: Dict[int, Tuple[BaseDestination, deque]] = {}
+        for (_dest_service, params) in delivery:
+            by_dest.setdefault(id(_dest_service), (_dest_service, deque()))[1].append(params)
+
+        def _emit_lane(dest: BaseDestination, queue: deque) -> None:
+            slot = self._dest_slot(dest)
+            while True:
+                try:
+                    params = queue.popleft()
+                except IndexError:
+                    return
+                with slot:
+                    dest.emit_prepared(params)
+
+        start = time.monotonic()
+        futures: List[Tuple[BaseDestination, List[Future]]] = []
+        for (dest, queue) in by_dest.values():
+            n_lanes = min(max(1, dest.max_concurrency), len(queue))
+            executor = self._lane_executor(dest)
+            futures.append((dest, [executor.submit(_emit_lane, dest, queue) for _ in range(n_lanes)]))
+
+        # the destinations with the earliest deadlines are waited for first
+        errors = []
+        deadline_order = sorted(
+            range(len(futures)), 
+            key=lambda n: float("inf") if futures[n][0].emit_timeout is None else futures[n][0].emit_timeout
+        )
+        for n in deadline_order:
+            dest, lanes = futures[n]
+            timeout = None
+            if dest.emit_timeout is not None:
+                timeout = max(0, start + dest.emit_timeout - time.monotonic())
+            done, not_done = wait(lanes, timeout=timeout)
+            errors.extend((n, f.exception()) for f in lanes if f in done and f.exception() is not None)
+            if not_done:
+                errors.append((n, EmitTimeoutError(dest.emit_timeout)))
+                for f in not_done:
+                    f.add_done_callback(functools.partial(_log_late_error, dest.name))
+        errors = [(futures[n][0].name, exc) for n, exc in sorted(errors, key=lambda item: item[0])]
+
+        if len(by_dest) == 1 and len(errors) == 1:
+            raise errors[0][1]
+        if errors:
+            raise DeliveryError(errors) from errors[0][1]
+
+    def _spool(self, delivery: List[Tuple[BaseDestination, Dict]]) -> None:
+        """
+        Write the emits of a job to the outbox (in one transaction), they are sent by the 
+        drainer in the background.
+
+        Args:
+            delivery (list): A list of (destination, parameters of `send_messages`) to be emitted
+
+        Returns:
+            None
+        """
+        items = [(_dest_service.name, params) for (_dest_service, params) in delivery]
+        self.config.outbox.put_many(items)
+        self.drainer.notify({dest_name for dest_name, _ in items})
+
+    def _load_job(self, job_name: str) -> Tuple[Dict, List[Union[MsgGrp, BaseDestination]], List[BaseSource]]:
+        """
+        Load a job and check its sources & destinations exist.
+
+        Args:
+            job_name (str): The name of the job
+
+        Returns:
+            The config, the targets and the sources of the job
+        """
         if job_name not in self.config.jobs:
             raise ValueError(f"The job `{job_name}` is not found")
         job_config = self.config.jobs[job_name]
-        
-        # Get messages
-        results: List[Message] = []
+
         for _src_config in job_config["get_messages"]:
             source_name = _src_config["service"]
             if source_name not in self.config.sources:
                 raise ValueError(f"The source `{source_name}` is not found")
-            _data_service: BaseSource = self.config.sources[source_name]
-            _result: List[Message] = _data_service.get_messages(
-                **dict_drop_key(_src_config, "service")
-            )
-            results.extend(_result)
+        targets = self._get_targets(job_config)
+        sources = [self.config.sources[cfg["service"]] for cfg in job_config["get_messages"]]
 
-        # Send messages
-        subject = job_name
-        for msg_grp_nm in job_config["send_messages"]:
-            if msg_grp_nm in self.config.message_groups:
-                # send to a group
-                msg_grp_cfg = self.config.message_groups[msg_grp_nm]
-                msg_grp = MsgGrp(msg_grp_nm, msg_grp_cfg, self.config.formatters, self.config.filterers)
-                delivery: List = msg_grp.deliver_msg(results, subject)
-                
-                for (dest_name, kwargs) in delivery:
-                    if dest_name not in self.config.destinations:
-                        raise ValueError(f"The destination `{dest_name}` is not found")
-                    _dest_service: BaseDestination = self.config.destinations[dest_name]
-                    _dest_service.emit(**kwargs)
-                        
-            elif msg_grp_nm in self.config.destinations:
-                # send to a single destination
-                if msg_grp_nm not in self.config.destinations:
-                    raise ValueError(f"The destination `{msg_grp_nm}` is not found")
-                kwargs = {"msg_ls": results, "subject": subject}
-                _dest_service: BaseDestination = self.config.destinations[msg_grp_nm]
-                _dest_service.emit(**kwargs)
+        # a digest is sent after the run, its messages would be lost if it failed once the 
+        # progress of the sources was committed
+        digests = [dest.name for dest in self._target_destinations(targets) if dest.digest]
+        if digests:
+            checkpointed = [
+                source.name for (source, params) in self._source_calls(job_config, NOTSET)
+                if source.tracks_progress and not self._cacheable(source, params)
+            ]
+            if checkpointed:
+                raise ValueError(
+                    f"The job `{job_name}` can't send digests ({', '.join(digests)}) as its sources "
+                    f"keep checkpoints ({', '.join(checkpointed)})"
+                )
+        return job_config, targets, sources
+
+    def run_single_job(self, job_name: str) -> None:
+        """
+        Run a specific job according to the given name.
+        (Messages are consumed batch by batch, so streaming sources are never fully loaded.)
+
+        Args:
+            job_name (str): The name of the job to be run
+
+        Returns:
+            None
+        """
+        job_config, targets, sources = self._load_job(job_name)
+
+        # The progress of the run (e.g. watermarks) is only committed once all the messages 
+        # are deliverred
+        progress = Progress(job_name)
+        try:
+            # Get messages
+            results = self._fetch_all(job_config, self._min_level(targets), progress)
+            delivery = self._get_delivery(job_name, targets, results)
 
+            # Send messages (to all destinations concurrently), or spool them to the outbox
+            if self.drainer is not None:
+                self._spool(delivery)
             else:
-                raise ValueError(f"The destination `{msg_grp_nm}` is not found, should either be a destination or a message group")
+                self._emit_all(delivery)
+        except Exception as e:
+            # the emits still in flight after a timeout may be deliverred, their messages 
+            # are not fetched again
+            self._end_run(progress, sources, commit=_maybe_deliverred(e))
+            raise
+        self._end_run(progress, sources, commit=True)
+
+    @staticmethod
+    def _end_run(progress: Progress, sources: List[BaseSource], commit: bool) -> None:
+        """
+        Commit (or roll back) the progress of a job run and its sources.
+
+        Args:
+            progress (Progress): The progress of the job run
+            sources (list): The sources of the job
+            commit (bool): Whether to commit the progress
+
+        Returns:
+            None
+        """
+        if commit:
+            progress.commit()
+            for _data_service in sources:
+                _data_service.commit()
+        else:
+            progress.rollback()
+            for _data_service in sources:
+                _data_service.rollback()
+
+    def flush(self) -> None:
+        """
+        Send the digests buffered by the destinations (in digest mode), and wait (up to its 
+        `drain_timeout`) for the outbox to be drained if any (the emits left are logged, 
+        they are sent later).
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if self.drainer is not None and not self.drainer.wait_idle(self.config.outbox.drain_timeout):
+            self._log_undrained()
+        errors = []
+        for dest in self.config.destinations.values():
+            try:
+                dest.flush()
+            except Exception as e:
+                errors.append((dest.name, e))
+        if errors:
+            raise DeliveryError(errors) from errors[0][1]
+
+    def _log_undrained(self) -> None:
+        """
+        Log the emits left in the outbox once the drain timeout is over.
+
+        Args:
+            None
 
-    def run_all(self, jobs: Optional[List]=None) -> None:
+        Returns:
+            None
+        """
+        stats = self.config.outbox.stats()
+        _logger.warning(
+            f"The outbox is not drained after {self.config.outbox.drain_timeout}s: "
+            f"{stats['due']} emit(s) due, {stats['pending']} pending, {stats['dead']} dead"
+        )
+
+    def close(self) -> None:
+        """
+        Stop the outbox drainer (the emits not sent yet are kept in the outbox), and the emit 
+        threads once the emits in flight are done.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if self.drainer is not None:
+            self.drainer.stop()
+        with self._dest_slots_lock:
+            executors, self._dest_executors = list(self._dest_executors.values()), {}
+        for executor in [self._emit_executor, *executors]:
+            executor.shutdown(wait=True)
+
+    def __enter__(self) -> "Runner":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def run_all(self, jobs: Optional[List]=None, flush: bool=True) -> None:
         """
         Run a list of jobs.
 
         Args:
             jobs (list): A list of job names to be run, if None, will run all jobs
+            flush (bool): Whether to send the buffered digests (and wait for the outbox) once 
+                the jobs are done, True by default (False to keep the digests buffered until 
+                their windows are over, e.g. in a long-running scheduler)
 
         Returns:
             None
         """
-        if jobs is None:
-            for job_name in self.config.jobs:
+        try:
+            for job_name in (self.config.jobs if jobs is None else jobs):
                 self.run_single_job(job_name)
-        else:            
-            for job_name in jobs:
-                self.run_single_job(job_name)
-                
\ No newline at end of file
+        finally:
+            if flush:
+                self.flush()
+
+
+
+class AsyncRunner(Runner):
+    """
+    A runner class to orchestrate the whole process on an event loop, so the I/O of many 
+    jobs (e.g. database queries & SMTP calls) can overlap, see `run_all_async`.
+    (The synchronous `run_single_job` & `run_all` of the Runner still work.)
+    """
+    def __init__(self, config: Config, max_jobs: int=32, **kwargs) -> None:
+        """
+        Initialize the runner with a config object.
+
+        Args:
+            config (Config): The config of the runner
+            max_jobs (int): The maximum number of jobs run concurrently, 32 by default
+            kwargs: The other settings of the Runner
+
+        Returns:
+            None
+        """
+        super().__init__(config, **kwargs)
+        self.max_jobs = max_jobs
+        # the threads waiting for the fetch slots (shared with the threads iterating 
+        # streaming sources), so they don't hold the threads of the default executor
+        self._slot_waiters = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="dnt-fetch-wait")
+        # the semaphores are bound to the event loop they are used on
+        self._async_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_dest_slots: Dict[int, asyncio.Semaphore] = {}
+        # the emits the jobs stopped waiting for (see `_emit_all_async`)
+        self._late_emits: set = set()
+
+    async def _acquire_fetch_slot(self) -> None:
+        """
+        Wait for a global fetch slot without blocking the event loop. (The slots are shared 
+        with the threads iterating streaming sources, so they are waited for on a thread.)
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if self._fetch_slots.acquire(blocking=False):
+            return
+        loop = asyncio.get_running_loop()
+        acquired = loop.run_in_executor(self._slot_waiters, self._fetch_slots.acquire)
+        try:
+            await asyncio.shield(acquired)
+        except asyncio.CancelledError:
+            # the slot is given back once the waiting thread gets it
+            acquired.add_done_callback(
+                lambda f: self._fetch_slots.release() if not f.cancelled() and f.exception() is None else None
+            )
+            raise
+
+    def close(self) -> None:
+        """
+        Stop the outbox drainer and the threads of the runner (see `Runner.close`).
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        super().close()
+        self._slot_waiters.shutdown(wait=True)
+
+    async def _fetch_async(self, source: BaseSource, params: Dict) -> Messages:
+        """
+        Get the messages from a source without blocking the event loop, within the global 
+        concurrency limit (see `_fetch_limited`).
+
+        Args:
+            source (BaseSource): The source to get messages from
+            params (dict): The parameters of `get_messages`
+
+        Returns:
+            The messages
+        """
+        if self.config.result_cache is not None and self._cacheable(source, params):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._fetch_limited, source, params)
+        await self._acquire_fetch_slot()
+        try:
+            result = await source.get_messages_async(**params)
+        finally:
+            self._fetch_slots.release()
+        return self._hold_slot(result)
+
+    async def _fetch_all_async(
+        self, 
+        job_config: Dict, 
+        min_level: Union[float, int]=NOTSET, 
+        progress: Optional[Progress]=None
+    ) -> List[Messages]:
+        """
+        Get the messages from all the sources of a job concurrently (up to `max_workers` of 
+        the job at a time), in the order of the sources in the config.
+
+        Args:
+            job_config (dict): The config of the job
+            min_level (float/int): The minimum level to push down to the sources supporting it
+            progress (Progress, optional): The progress of the job run
+
+        Returns:
+            A list of messages, one per source
+        """
+        calls = self._source_calls(job_config, min_level, progress)
+        job_slots = asyncio.Semaphore(max(1, job_config.get("max_workers", self.job_fetch_workers)))
+
+        async def _fetch_in_job(source: BaseSource, params: Dict) -> Messages:
+            async with job_slots:
+                return await self._fetch_async(source, params)
+
+        results = await asyncio.gather(
+            *[_fetch_in_job(source, params) for (source, params) in calls],
+            return_exceptions=True
+        )
+        errors = [
+            (source.name, res) for (source, _), res in zip(calls, results) 
+            if isinstance(res, BaseException)
+        ]
+        if len(calls) == 1 and errors:
+            raise errors[0][1]
+        if errors:
+            raise FetchError(errors) from errors[0][1]
+        return results
+
+    def _dest_slot_async(self, dest: BaseDestination) -> asyncio.Semaphore:
+        """
+        Get the semaphore limiting the concurrent emits to a destination (across jobs) on the 
+        running event loop.
+
+        Args:
+            dest (BaseDestination): The destination
+
+        Returns:
+            The semaphore of the destination
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_slots_loop is not loop:
+            self._async_slots_loop, self._async_dest_slots = loop, {}
+        if id(dest) not in self._async_dest_slots:
+            self._async_dest_slots[id(dest)] = asyncio.Semaphore(max(1, dest.max_concurrency))
+        return self._async_dest_slots[id(dest)]
+
+    async def _emit_all_async(self, delivery: List[Tuple[BaseDestination, Dict]]) -> None:
+        """
+        Send the messages to all destinations concurrently (see `_emit_all`). The emits to a 
+        destination start in order, up to its `max_concurrency` at a time, and the job stops 
+        waiting for them after its `emit_timeout` (they go on in the background, and are 
+        waited for by `flush_async`).
+
+        Args:
+            delivery (list): A list of (destination, parameters of `send_messages`) to be emitted
+
+        Returns:
+            None
+        """
+        by_dest: Dict[int, Tuple[BaseDestination, deque]] = {}
+        for (_dest_service, params) in delivery:
+            by_dest.setdefault(id(_dest_service), (_dest_service, deque()))[1].append(params)
+
+        async def _emit_lane(dest: BaseDestination, queue: deque) -> None:
+            slot = self._dest_slot_async(dest)
+            while queue:
+                params = queue.popleft()
+                async with slot:
+                    await dest.emit_prepared_async(params)
+
+        async def _emit_dest(dest: BaseDestination, queue: deque) -> List[BaseException]:
+            n_lanes = min(max(1, dest.max_concurrency), len(queue))
+            lanes = [asyncio.ensure_future(_emit_lane(dest, queue)) for _ in range(n_lanes)]
+            done, pending = await asyncio.wait(lanes, timeout=dest.emit_timeout)
+            errors = [lane.exception() for lane in lanes if lane in done and lane.exception() is not None]
+            if pending:
+                errors.append(EmitTimeoutError(dest.emit_timeout))
+                for lane in pending:
+                    self._late_emits.add(lane)
+                    lane.add_done_callback(self._late_emits.discard)
+                    lane.add_done_callback(functools.partial(_log_late_error, dest.name))
+            return errors
+
+        dest_ls = list(by_dest.values())
+        results = await asyncio.gather(*[_emit_dest(dest, queue) for (dest, queue) in dest_ls])
+        errors = [(dest.name, exc) for (dest, _), excs in zip(dest_ls, results) for exc in excs]
+
+        if len(dest_ls) == 1 and len(errors) == 1:
+            raise errors[0][1]
+        if errors:
+            raise DeliveryError(errors) from errors[0][1]
+
+    async def run_single_job_async(self, job_name: str) -> None:
+        """
+        Run a specific job according to the given name, on the running event loop.
+
+        Args:
+            job_name (str): The name of the job to be run
+
+        Returns:
+            None
+        """
+        job_config, targets, sources = self._load_job(job_name)
+        loop = asyncio.get_running_loop()
+        progress = Progress(job_name)
+        try:
+            results = await self._fetch_all_async(job_config, self._min_level(targets), progress)
+            # streaming sources fetch their rows while being dispatched
+            delivery = await loop.run_in_executor(
+                None, self._get_delivery, job_name, targets, results
+            )
+            if self.drainer is not None:
+                await loop.run_in_executor(None, self._spool, delivery)
+            else:
+                await self._emit_all_async(delivery)
+        except Exception as e:
+            self._end_run(progress, sources, commit=_maybe_deliverred(e))
+            raise
+        self._end_run(progress, sources, commit=True)
+
+    async def flush_async(self) -> None:
+        """
+        Send the digests buffered by the destinations (in digest mode), and wait for the emits 
+        still in flight after their timeout & for the outbox to be drained if any, without 
+        blocking the event loop.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if self._late_emits:
+            # the lanes would be cancelled with the event loop
+            await asyncio.wait(list(self._late_emits))
+        if self.drainer is not None:
+            loop = asyncio.get_running_loop()
+            if not await loop.run_in_executor(None, self.drainer.wait_idle, self.config.outbox.drain_timeout):
+                self._log_undrained()
+        dest_ls = list(self.config.destinations.values())
+        results = await asyncio.gather(*[dest.flush_async() for dest in dest_ls], return_exceptions=True)
+        errors = [(dest.name, res) for dest, res in zip(dest_ls, results) if isinstance(res, BaseException)]
+        if errors:
+            raise DeliveryError(errors) from errors[0][1]
+
+    async def run_all_async(self, jobs: Optional[List]=None, flush: bool=True) -> None:
+        """
+        Run a list of jobs concurrently. If any job fails, the first error is raised once
+        all the jobs are done.
+
+        Args:
+            jobs (list): A list of job names to be run, if None, will run all jobs
+            flush (bool): Whether to send the buffered digests (and wait for the outbox) once 
+                the jobs are done, True by default
+
+        Returns:
+            None
+        """
+        job_ls = list(self.config.jobs) if jobs is None else jobs
+        slots = asyncio.Semaphore(self.max_jobs)
+
+        async def _run(job_name):
+            async with slots:
+                await self.run_single_job_async(job_name)
+
+        results = await asyncio.gather(*[_run(job_name) for job_name in job_ls], return_exceptions=True)
+        if flush:
+            await self.flush_async()
+        for res in results:
+            if isinstance(res, BaseException):
+                raise res
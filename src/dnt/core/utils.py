@@ -1,4 +1,6 @@
-from typing import Dict, List, Union, Generator
+from typing import Dict, List, Sequence, Union, Generator
+import numpy as np
+import pandas as pd
 
 
 # Notification level defination
@@ -47,6 +49,36 @@ def lvl_to_num(level: Union[float, int, str]) -> Union[float, int]:
         except KeyError:
             raise ValueError(f"Unknown level: {level}")
 
+def level_names_below(level: Union[float, int, str]) -> List[str]:
+    """
+    Get the names of the notification levels below a level.
+
+    Args:
+        level (float/int/str): level of the notification
+
+    Returns:
+        A list of level names
+    """
+    level = lvl_to_num(level)
+    return [name for name, lvl in _name_to_lvl.items() if lvl < level]
+
+def lvl_to_num_array(levels: Sequence) -> np.ndarray:
+    """
+    Convert a column of notification levels to numbers in one go.
+    (Each distinct level is converted once, the result is int8 unless there are non-integer levels)
+
+    Args:
+        levels (sequence): levels of the notifications
+
+    Returns:
+        The notification levels as a numpy array
+    """
+    codes, uniques = pd.factorize(pd.Series(levels, dtype=object), use_na_sentinel=False)
+    lvl_nos = np.array([lvl_to_num(lvl) for lvl in uniques], dtype=float)
+    if np.all(np.mod(lvl_nos, 1) == 0) and np.all(np.abs(lvl_nos) <= np.iinfo(np.int8).max):
+        lvl_nos = lvl_nos.astype(np.int8)
+    return lvl_nos[codes]
+
 def dict_drop_key(dic: Dict, key: str) -> Dict:
     """
     Generate a dictionary without a specific key.
@@ -1,8 +1,69 @@
+import asyncio
+import base64
+import csv
+import functools
+import gzip
+import io
+import json
+import re
 import smtplib
+import socket
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from email.mime.application import MIMEApplication
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from dnt.core.base import BaseDestination, Message
-from typing import List, Dict, Optional, Callable
+from dnt.core.base import BaseDestination, Message, MessageBatch
+from typing import Iterable, Iterator, List, Dict, Optional, Callable, Tuple
+
+
+def _iter_records(msg_ls: Iterable) -> Iterator[Dict]:
+    """
+    Iterate over the messages as dicts, the dicts (records) are kept as they are and the items 
+    other than Message objects (e.g. formatted) as text.
+
+    Args:
+        msg_ls (list): A list of messages or records, or a MessageBatch
+
+    Returns:
+        A generator of dicts
+    """
+    for msg in msg_ls:
+        if isinstance(msg, dict):
+            yield msg
+        else:
+            yield msg.message if isinstance(msg, Message) else {"message": str(msg)}
+
+def build_attachment(msg_ls: Iterable, fmt: str="csv") -> bytes:
+    """
+    Write the messages into a gzip-compressed CSV or JSONL file, in a single stream.
+
+    Args:
+        msg_ls (list): A list of messages or records, or a MessageBatch
+        fmt (str): The file format, 'csv' (by default) or 'jsonl'
+
+    Returns:
+        The content of the compressed file
+    """
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unknown attachment format: {fmt}")
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as gz, \
+            io.TextIOWrapper(gz, encoding="utf-8", newline="") as f:
+        if fmt == "jsonl":
+            for rec in _iter_records(msg_ls):
+                f.write(json.dumps(rec, default=str))
+                f.write("\n")
+        else:
+            records = list(_iter_records(msg_ls))
+            fieldnames = list(dict.fromkeys(k for rec in records for k in rec))
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(records)
+    return buffer.getvalue()
+
 
 
 class ClsService(BaseDestination):
@@ -26,11 +87,140 @@ class ClsService(BaseDestination):
             print(msg)
         print("\n")
 
+class SMTPPool:
+    """
+    A pool of authenticated SMTP connections, reused across sends as long as they are healthy 
+    and not idle for too long.
+    """
+    def __init__(self, connect: Callable[[], smtplib.SMTP], max_size: int=2, idle_timeout: float=60) -> None:
+        """
+        Initialize the pool with a function opening new connections.
+
+        Args:
+            connect (callable): The function to open (and authenticate) a new connection
+            max_size (int): The maximum number of idle connections kept, 2 by default
+            idle_timeout (float): The time (in seconds) an idle connection is kept, 60 by default
+
+        Returns:
+            None
+        """
+        self.connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.opened = 0
+        self.reused = 0
+        self._idle: List[Tuple[float, smtplib.SMTP]] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _close(conn: smtplib.SMTP) -> None:
+        # quit politely, the connection may be broken already
+        try:
+            conn.quit()
+        except (smtplib.SMTPException, OSError):
+            conn.close()
+
+    @staticmethod
+    def _healthy(conn: smtplib.SMTP) -> bool:
+        try:
+            return conn.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def acquire(self) -> smtplib.SMTP:
+        """
+        Get a healthy connection from the pool, or open a new one.
+
+        Args:
+            None
+
+        Returns:
+            The SMTP connection
+        """
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                last_used, conn = self._idle.pop()
+            if time.monotonic() - last_used <= self.idle_timeout and self._healthy(conn):
+                self.reused += 1
+                return conn
+            self._close(conn)
+        conn = self.connect()
+        self.opened += 1
+        return conn
+
+    def release(self, conn: smtplib.SMTP, broken: bool=False) -> None:
+        """
+        Put a connection back into the pool, close it if broken or the pool is full.
+
+        Args:
+            conn (smtplib.SMTP): The connection
+            broken (bool): Whether the connection failed
+
+        Returns:
+            None
+        """
+        if not broken:
+            with self._lock:
+                if len(self._idle) < self.max_size:
+                    self._idle.append((time.monotonic(), conn))
+                    return
+        self._close(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        """
+        Borrow a connection, closed if anything fails while in use.
+
+        Args:
+            None
+
+        Returns:
+            A context manager of the connection
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, broken=True)
+            raise
+        self.release(conn)
+
+    def close(self) -> None:
+        """
+        Close all the idle connections.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, conn in idle:
+            self._close(conn)
+
+
 class SMTPService(BaseDestination):
     """
     A class for Email destination (SMTP).
     """
-    def __init__(self, name: str, host: str, port: int, username: str, password: str) -> None:
+    def __init__(
+        self, 
+        name: str, 
+        host: str, 
+        port: int, 
+        username: str, 
+        password: str,
+        attach_threshold: Optional[int]=None,
+        attach_format: str="csv",
+        starttls: bool=True,
+        pool_size: int=2,
+        idle_timeout: float=60,
+        **kwargs: Dict
+    ) -> None:
         """
         Initialize an SMTP service with name and configs.
 
@@ -40,43 +230,703 @@ class SMTPService(BaseDestination):
             port (int): The port of the SMTP server
             username (str): The username to login to the SMTP server
             password (str): The password to login to the SMTP server
+            attach_threshold (int, optional): If set, only the first messages (up to this number) 
+                are listed in the body when there are more, all of them are attached as a 
+                gzip-compressed file, None by default (never attached)
+            attach_format (str): The format of the attached file, 'csv' (by default) or 'jsonl'
+            starttls (bool): Whether to upgrade the connection with STARTTLS, True by default 
+                (the login is skipped if the password is None)
+            pool_size (int): The maximum number of idle connections kept for reuse, 2 by default
+            idle_timeout (float): The time (in seconds) an idle connection is kept, 60 by default
+            kwargs: The other settings of the destination (e.g. level, max_concurrency)
 
         Returns:
             None
         """
-        super().__init__(name)
+        super().__init__(name, **kwargs)
+        if attach_format not in ("csv", "jsonl"):
+            raise ValueError(f"Unknown attachment format: {attach_format}")
         self.host = host
         self.port = port
         self.username = username
         self.password = password
+        self.attach_threshold = attach_threshold
+        self.attach_format = attach_format
+        # the messages are rendered before `send_messages`, their records are attached
+        self.keeps_records = attach_threshold is not None
+        self.starttls = starttls
+        self.pool = SMTPPool(self._connect, max_size=pool_size, idle_timeout=idle_timeout)
+
+    def _connect(self) -> smtplib.SMTP:
+        """
+        Open & authenticate a new connection to the SMTP server.
+
+        Args:
+            None
+
+        Returns:
+            The SMTP connection
+        """
+        server = smtplib.SMTP(self.host, self.port)
+        try:
+            server.ehlo()
+            if self.starttls:
+                server.starttls()
+                server.ehlo()
+            if self.password is not None:
+                server.login(self.username, self.password)
+        except BaseException:
+            server.close()
+            raise
+        return server
+
+    def close(self) -> None:
+        """
+        Close the pooled connections to the SMTP server.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.pool.close()
+
+    def _build_body(self, send_ls: List, n_total: int) -> str:
+        """
+        Write the body of the email into a single buffer (one line per message).
+
+        Args:
+            send_ls (list): A list of formatted messages to list in the body
+            n_total (int): The total number of messages
+
+        Returns:
+            The body of the email
+        """
+        buffer = io.StringIO()
+        for msg in send_ls:
+            buffer.write("- ")
+            buffer.write(str(msg))
+            buffer.write("\n")
+        if n_total > len(send_ls):
+            buffer.write(f"... and {n_total - len(send_ls)} more messages, see the attachment.\n")
+        return buffer.getvalue()
     
-    def send_messages(self, msg_ls: List, receivers: List, subject: Optional[str]=None, **kwargs) -> None:
+    def is_transient(self, error: Exception) -> bool:
         """
-        Send messages via Email to receivers.
+        Check whether an error is transient, i.e. connection errors and 4xx replies (the 
+        rejected addresses, failed logins & other 5xx replies are not retried).
+
+        Args:
+            error (Exception): The error
+
+        Returns:
+            True if the error is transient
+        """
+        if isinstance(error, smtplib.SMTPResponseException):
+            return 400 <= error.smtp_code < 500
+        if isinstance(error, smtplib.SMTPServerDisconnected):
+            return True
+        if isinstance(error, smtplib.SMTPException):
+            return False
+        return isinstance(error, (OSError, asyncio.TimeoutError))
+
+    def _build_email(
+        self, 
+        msg_ls: List, 
+        receivers: List, 
+        subject: Optional[str]=None, 
+        records: Optional[List[Dict]]=None
+    ) -> MIMEMultipart:
+        """
+        Build the email of the messages.
+        (Above `attach_threshold` messages, the full list is attached as a compressed file.)
 
         Args:
             msg_ls (list): A list of messages to be sent
             receivers (list): A list of receivers' email addresses
             subject (str, optional): The subject of the message. None by default
+            records (list, optional): The messages as dicts, attached instead of the messages 
+                (e.g. already rendered as text), None by default
 
         Returns:
-            None
+            The email
         """
         email_msg: MIMEMultipart = MIMEMultipart()
         email_msg["From"] = self.username
         email_msg["To"] = ", ".join(receivers)
         email_msg["Subject"] = subject
-        body: str = ""
 
-        send_ls = self._filter_msg(msg_ls)
-        send_ls = self._format_msg(send_ls)
-        for msg in send_ls:
-            body += f"- {msg}\n"
+        filtered_ls = self._filter_msg(msg_ls)
+        n_total = len(filtered_ls)
+        attach = self.attach_threshold is not None and n_total > self.attach_threshold
+        listed_ls = filtered_ls
+        if attach:
+            if isinstance(filtered_ls, MessageBatch):
+                listed_ls = filtered_ls.select(list(range(self.attach_threshold)))
+            else:
+                listed_ls = filtered_ls[:self.attach_threshold]
+        body = self._build_body(self._format_msg(listed_ls), n_total)
 
         email_msg.attach(MIMEText(body, "plain"))
+        if attach:
+            filename = f"messages.{self.attach_format}.gz"
+            attached_ls = filtered_ls if records is None else records
+            part = MIMEApplication(build_attachment(attached_ls, self.attach_format), Name=filename)
+            part["Content-Disposition"] = f'attachment; filename="{filename}"'
+            email_msg.attach(part)
+        return email_msg
 
-        server = smtplib.SMTP(self.host, self.port)
-        server.ehlo()
-        server.starttls()
-        server.login(self.username, self.password)
-        server.send_message(email_msg)
+    def send_messages(
+        self, 
+        msg_ls: List, 
+        receivers: List, 
+        subject: Optional[str]=None, 
+        records: Optional[List[Dict]]=None, 
+        **kwargs
+    ) -> None:
+        """
+        Send messages via Email to receivers.
+        (Above `attach_threshold` messages, the full list is attached as a compressed file.)
+
+        Args:
+            msg_ls (list): A list of messages to be sent
+            receivers (list): A list of receivers' email addresses
+            subject (str, optional): The subject of the message. None by default
+            records (list, optional): The messages as dicts, attached instead of the messages, 
+                None by default
+
+        Returns:
+            None
+        """
+        email_msg = self._build_email(msg_ls, receivers, subject, records)
+
+        # a pooled connection may have been dropped by the server, retry once on a new one
+        for attempt in range(2):
+            try:
+                with self.pool.connection() as server:
+                    server.send_message(email_msg)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                if attempt == 1:
+                    raise
+
+
+class AsyncSMTPSession:
+    """
+    A minimal asyncio SMTP client session, sending many emails over one connection with the
+    commands pipelined (RFC 2920) when the server supports it.
+    """
+    def __init__(self, host: str, port: int, timeout: float=30) -> None:
+        """
+        Initialize a session to an SMTP server, not connected yet.
+
+        Args:
+            host (str): The host of the SMTP server
+            port (int): The port of the SMTP server
+            timeout (float): The time (in seconds) to wait for each reply, 30 by default
+
+        Returns:
+            None
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.extensions: Dict[str, str] = {}
+        self.round_trips = 0
+        self.last_used = time.monotonic()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    @property
+    def connected(self) -> bool:
+        """
+        Whether the session is connected.
+        """
+        return self._writer is not None and not self._writer.is_closing()
+
+    @property
+    def pipelining(self) -> bool:
+        """
+        Whether the server supports command pipelining.
+        """
+        return "pipelining" in self.extensions
+
+    async def connect(self, starttls: bool=True, username: Optional[str]=None, password: Optional[str]=None) -> None:
+        """
+        Open the connection, upgrade it with STARTTLS and login if needed.
+
+        Args:
+            starttls (bool): Whether to upgrade the connection with STARTTLS, True by default
+            username (str, optional): The username to login to the SMTP server
+            password (str, optional): The password to login to the SMTP server, the login is 
+                skipped if None
+
+        Returns:
+            None
+        """
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        try:
+            code, msg = await self._read_reply()
+            if code != 220:
+                raise smtplib.SMTPConnectError(code, msg)
+            await self.ehlo()
+            if starttls:
+                if "starttls" not in self.extensions:
+                    raise smtplib.SMTPNotSupportedError("STARTTLS extension not supported by server.")
+                await self.command("STARTTLS", (220,))
+                await self._writer.start_tls(ssl.create_default_context(), server_hostname=self.host)
+                await self.ehlo()
+            if password is not None:
+                await self.login(username, password)
+        except BaseException:
+            self.close()
+            raise
+
+    async def _read_reply(self) -> Tuple[int, str]:
+        """
+        Read a (possibly multiline) reply of the server.
+
+        Args:
+            None
+
+        Returns:
+            The code & the text of the reply
+        """
+        lines = []
+        while True:
+            line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+            if not line:
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            line = line.decode("utf-8", "replace").rstrip("\r\n")
+            lines.append(line[4:])
+            if line[3:4] != "-":
+                break
+        try:
+            return int(line[:3]), "\n".join(lines)
+        except ValueError:
+            raise smtplib.SMTPResponseException(-1, line)
+
+    async def exchange(self, commands: List[bytes]) -> List[Tuple[int, str]]:
+        """
+        Send commands and read their replies, in a single round trip if the server supports 
+        pipelining, one by one otherwise.
+
+        Args:
+            commands (list): The encoded commands (ending with CRLF)
+
+        Returns:
+            The list of replies, as (code, text) tuples
+        """
+        if not self.connected:
+            raise smtplib.SMTPServerDisconnected("Not connected")
+        groups = [commands] if self.pipelining else [[cmd] for cmd in commands]
+        replies = []
+        for group in groups:
+            self._writer.write(b"".join(group))
+            await self._writer.drain()
+            self.round_trips += 1
+            for _ in group:
+                replies.append(await self._read_reply())
+        self.last_used = time.monotonic()
+        return replies
+
+    async def command(self, line: str, expected: Tuple[int, ...]=(250,)) -> Tuple[int, str]:
+        """
+        Send a single command, raise SMTPResponseException if the reply is not expected.
+
+        Args:
+            line (str): The command, e.g. "NOOP"
+            expected (tuple): The expected reply codes, (250,) by default
+
+        Returns:
+            The code & the text of the reply
+        """
+        code, msg = (await self.exchange([f"{line}\r\n".encode()]))[0]
+        if code not in expected:
+            raise smtplib.SMTPResponseException(code, msg)
+        return code, msg
+
+    async def ehlo(self) -> None:
+        """
+        Greet the server and keep the extensions it supports (e.g. PIPELINING, AUTH).
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        _, msg = await self.command(f"EHLO {socket.getfqdn()}")
+        self.extensions = {}
+        for line in msg.split("\n")[1:]:
+            keyword, _, params = line.partition(" ")
+            self.extensions[keyword.lower()] = params
+
+    async def login(self, username: str, password: str) -> None:
+        """
+        Login with AUTH PLAIN (or AUTH LOGIN).
+
+        Args:
+            username (str): The username
+            password (str): The password
+
+        Returns:
+            None
+        """
+        methods = self.extensions.get("auth", "").upper().split()
+        try:
+            if "PLAIN" in methods:
+                token = base64.b64encode(f"\0{username}\0{password}".encode()).decode()
+                await self.command(f"AUTH PLAIN {token}", (235,))
+            elif "LOGIN" in methods:
+                await self.command("AUTH LOGIN", (334,))
+                await self.command(base64.b64encode(username.encode()).decode(), (334,))
+                await self.command(base64.b64encode(password.encode()).decode(), (235,))
+            else:
+                raise smtplib.SMTPNotSupportedError("No suitable authentication method found.")
+        except smtplib.SMTPResponseException as e:
+            raise smtplib.SMTPAuthenticationError(e.smtp_code, e.smtp_error)
+
+    @staticmethod
+    def encode(email_msg: MIMEMultipart) -> bytes:
+        """
+        Encode an email as the content of the DATA command (CRLF line endings, dot-stuffed and 
+        terminated).
+
+        Args:
+            email_msg (MIMEMultipart): The email
+
+        Returns:
+            The encoded content
+        """
+        data = email_msg.as_bytes(policy=email_msg.policy.clone(linesep="\r\n"))
+        data = re.sub(rb"(?m)^\.", b"..", data)
+        if not data.endswith(b"\r\n"):
+            data += b"\r\n"
+        return data + b".\r\n"
+
+    @staticmethod
+    def _check_envelope(replies: List[Tuple[int, str]], sender: str, receivers: List[str]) -> Optional[Exception]:
+        """
+        Check the replies to MAIL, RCPT & DATA of an email.
+        (Like `smtplib`, the email is sent if at least one receiver is accepted.)
+
+        Args:
+            replies (list): The replies to the envelope
+            sender (str): The sender's email address
+            receivers (list): The receivers' email addresses
+
+        Returns:
+            The error, None if the content can be sent
+        """
+        (mail_code, mail_msg), *rcpt_replies, (data_code, data_msg) = replies
+        if mail_code != 250:
+            return smtplib.SMTPSenderRefused(mail_code, mail_msg, sender)
+        refused = {rcpt: reply for rcpt, reply in zip(receivers, rcpt_replies) if reply[0] not in (250, 251)}
+        if len(refused) == len(receivers):
+            return smtplib.SMTPRecipientsRefused(refused)
+        if data_code != 354:
+            return smtplib.SMTPDataError(data_code, data_msg)
+        return None
+
+    async def send_bulk(
+        self, 
+        emails: List[Tuple[str, List[str], bytes]], 
+        on_result: Callable[[int, Optional[Exception]], None]
+    ) -> None:
+        """
+        Send many emails over the session. With pipelining, the content of an email is sent in 
+        the same round trip as the envelope (MAIL, RCPT & DATA) of the next one, so it takes 
+        about one round trip per email.
+
+        Args:
+            emails (list): A list of (sender, receivers, content) tuples, the content being 
+                encoded with `encode`
+            on_result (callable): Called with the index of each email and its error (None if sent)
+                as soon as it is known
+
+        Returns:
+            None
+        """
+        pending: List[bytes] = [] # sent ahead of the next envelope
+        owner: Optional[int] = None # the email whose result is the first reply to `pending`
+        for i, (sender, receivers, content) in enumerate(emails):
+            envelope = [f"MAIL FROM:<{sender}>\r\n".encode()]
+            envelope.extend(f"RCPT TO:<{rcpt}>\r\n".encode() for rcpt in receivers)
+            envelope.append(b"DATA\r\n")
+            replies = await self.exchange(pending + envelope)
+            if owner is not None:
+                code, msg = replies[0]
+                on_result(owner, None if code == 250 else smtplib.SMTPDataError(code, msg))
+            error = self._check_envelope(replies[len(pending):], sender, receivers)
+            if error is None:
+                pending, owner = [content], i
+                continue
+            on_result(i, error)
+            # the transaction is reset, after an empty content if DATA was accepted anyway
+            pending = [b".\r\n", b"RSET\r\n"] if replies[-1][0] == 354 else [b"RSET\r\n"]
+            owner = None
+        if pending:
+            replies = await self.exchange(pending)
+            if owner is not None:
+                code, msg = replies[0]
+                on_result(owner, None if code == 250 else smtplib.SMTPDataError(code, msg))
+
+    async def quit(self) -> None:
+        """
+        Quit politely and close the connection.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if self.connected:
+            try:
+                await self.command("QUIT", (221,))
+            except (smtplib.SMTPException, OSError, asyncio.TimeoutError):
+                pass
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the connection.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except RuntimeError: # the event loop is closed already
+                pass
+        self._reader = self._writer = None
+
+
+class AsyncSMTPService(SMTPService):
+    """
+    A class for Email destination (SMTP) with a native asyncio client: the emails sent 
+    concurrently (e.g. by the jobs of an AsyncRunner, or with `send_bulk`) are queued and sent 
+    in bulk over one session, with the commands pipelined if the server supports it.
+    (`send_messages` is inherited, i.e. sent with the pooled blocking connections.)
+    """
+    def __init__(
+        self, 
+        name: str, 
+        host: str, 
+        port: int, 
+        username: str, 
+        password: str,
+        max_bulk: int=100,
+        timeout: float=30,
+        **kwargs: Dict
+    ) -> None:
+        """
+        Initialize an async SMTP service with name and configs.
+
+        Args:
+            name (str): The name of the service
+            host (str): The host of the SMTP server
+            port (int): The port of the SMTP server
+            username (str): The username to login to the SMTP server
+            password (str): The password to login to the SMTP server
+            max_bulk (int): The maximum number of queued emails sent in one go, 100 by default
+            timeout (float): The time (in seconds) to wait for each reply, 30 by default
+            kwargs: The other settings of SMTPService (e.g. starttls, idle_timeout, level)
+
+        Returns:
+            None
+        """
+        super().__init__(name, host, port, username, password, **kwargs)
+        self.max_bulk = max_bulk
+        self.timeout = timeout
+        self.sessions_opened = 0
+        self._session: Optional[AsyncSMTPSession] = None
+        self._queue: List[Tuple[List, bytes, asyncio.Future]] = []
+        self._sender: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _drop_session(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    async def _get_session(self) -> AsyncSMTPSession:
+        """
+        Get the open session, or open a new one if closed or idle for too long.
+
+        Args:
+            None
+
+        Returns:
+            The session
+        """
+        session = self._session
+        if session is not None:
+            if session.connected and time.monotonic() - session.last_used <= self.pool.idle_timeout:
+                return session
+            await session.quit()
+        session = AsyncSMTPSession(self.host, self.port, self.timeout)
+        await session.connect(self.starttls, self.username, self.password)
+        self._session = session
+        self.sessions_opened += 1
+        return session
+
+    @staticmethod
+    def _set_result(bulk: List[Tuple[List, bytes, asyncio.Future]], index: int, error: Optional[Exception]) -> None:
+        fut = bulk[index][2]
+        if fut.done(): # cancelled by the caller
+            return
+        if error is None:
+            fut.set_result(None)
+        else:
+            fut.set_exception(error)
+
+    async def _send_bulk(self, bulk: List[Tuple[List, bytes, asyncio.Future]]) -> None:
+        """
+        Send queued emails over the session.
+
+        Args:
+            bulk (list): A list of (receivers, content, future) tuples
+
+        Returns:
+            None
+        """
+        # the session may have been dropped by the server, retry the unsent emails once on a new one
+        for attempt in range(2):
+            todo = [item for item in bulk if not item[2].done()]
+            if not todo:
+                return
+            try:
+                session = await self._get_session()
+                await session.send_bulk(
+                    [(self.username, receivers, content) for receivers, content, _ in todo],
+                    functools.partial(self._set_result, todo)
+                )
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self._drop_session()
+                if attempt == 1:
+                    raise
+
+    async def _drain(self) -> None:
+        """
+        Send the queued emails until the queue is empty.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        while self._queue:
+            bulk, self._queue = self._queue[:self.max_bulk], self._queue[self.max_bulk:]
+            try:
+                await self._send_bulk(bulk)
+            except Exception as e:
+                self._drop_session()
+                for _, _, fut in bulk:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    async def send_messages_async(
+        self, 
+        msg_ls: List, 
+        receivers: List, 
+        subject: Optional[str]=None, 
+        records: Optional[List[Dict]]=None, 
+        **kwargs
+    ) -> None:
+        """
+        Queue an email of the messages, sent in bulk with the other queued emails over one session.
+
+        Args:
+            msg_ls (list): A list of messages to be sent
+            receivers (list): A list of receivers' email addresses
+            subject (str, optional): The subject of the message. None by default
+            records (list, optional): The messages as dicts, attached instead of the messages, 
+                None by default
+
+        Returns:
+            None
+        """
+        content = AsyncSMTPSession.encode(self._build_email(msg_ls, receivers, subject, records))
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # the session & the queue are bound to the event loop they were created in
+            self._drop_session()
+            self._loop, self._queue, self._sender = loop, [], None
+        fut = loop.create_future()
+        self._queue.append((receivers, content, fut))
+        if self._sender is None or self._sender.done():
+            self._sender = loop.create_task(self._drain())
+        await fut
+
+    async def send_bulk_async(self, sends: Iterable[Dict]) -> None:
+        """
+        Send many emails (e.g. one per team) over one session, raise the first error once all 
+        of them are sent.
+
+        Args:
+            sends (iterable): The parameters of each email (msg_ls, receivers & subject)
+
+        Returns:
+            None
+        """
+        results = await asyncio.gather(
+            *(self.send_messages_async(**params) for params in sends), return_exceptions=True
+        )
+        errors = [res for res in results if isinstance(res, BaseException)]
+        if errors:
+            raise errors[0]
+
+    def send_bulk(self, sends: Iterable[Dict]) -> None:
+        """
+        Send many emails (e.g. one per team) over one session from blocking code.
+
+        Args:
+            sends (iterable): The parameters of each email (msg_ls, receivers & subject)
+
+        Returns:
+            None
+        """
+        async def run() -> None:
+            try:
+                await self.send_bulk_async(sends)
+            finally:
+                await self.close_async()
+        asyncio.run(run())
+
+    async def close_async(self) -> None:
+        """
+        Quit the session politely.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if self._session is not None:
+            await self._session.quit()
+            self._session = None
+
+    def close(self) -> None:
+        """
+        Close the session and the pooled connections to the SMTP server.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        super().close()
+        self._drop_session()
@@ -0,0 +1,189 @@
+import functools
+import operator
+import string
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from dnt.core.base import BaseFormatter, Message, MessageBatch
+
+
+# A parsed template: a tuple of (literal text, field name, format spec, conversion)
+Template = Tuple[Tuple[str, Optional[str], Optional[str], Optional[str]], ...]
+
+_CONVERSIONS = {"r": repr, "s": str, "a": ascii}
+
+_FORMATTER = string.Formatter()
+
+
+@functools.lru_cache(maxsize=256)
+def compile_template(template: str) -> Template:
+    """
+    Parse & validate a template (in `str.format` syntax) once, the parsed templates are cached.
+
+    Args:
+        template (str): The template, e.g. "{check_status} on {table_name} at {check_time:%H:%M}"
+
+    Returns:
+        The parsed template
+    """
+    try:
+        parts = tuple(string.Formatter().parse(template))
+    except ValueError as e:
+        raise ValueError(f"Invalid template {template!r}: {e}")
+    for _, field, _, conversion in parts:
+        if field is not None and (field == "" or field.isdigit()):
+            raise ValueError(f"Invalid template {template!r}: fields should be named")
+        if conversion is not None and conversion not in _CONVERSIONS:
+            raise ValueError(f"Invalid template {template!r}: unknown conversion !{conversion}")
+    return parts
+
+def _field_renderer(field: str, spec: str, conversion: Optional[str]) -> Callable[[Dict], str]:
+    """
+    Build a function rendering one field of a template, as `str.format` would.
+
+    Args:
+        field (str): The field name, e.g. "table_name" or "tags[0]"
+        spec (str): The format spec, e.g. "%Y-%m-%d" or ".2f" (with nested fields, e.g. ">{width}")
+        conversion (str, optional): The conversion ('r', 's' or 'a')
+
+    Returns:
+        A function of the fields of a message
+    """
+    if field.isidentifier():
+        get_value = operator.itemgetter(field)
+    else:
+        get_value = lambda fields: _FORMATTER.get_field(field, (), fields)[0]
+    convert = _CONVERSIONS.get(conversion)
+    nested = "{" in spec
+
+    def render_field(fields: Dict) -> str:
+        value = get_value(fields)
+        if convert is not None:
+            value = convert(value)
+        return format(value, spec.format_map(fields) if nested else spec)
+    return render_field
+
+@functools.lru_cache(maxsize=256)
+def compile_renderer(template: str) -> Callable[[Dict], str]:
+    """
+    Compile a template (in `str.format` syntax) once into a function rendering the fields of 
+    a message, so the template is not parsed again for each message. The functions are cached.
+
+    Args:
+        template (str): The template, e.g. "{check_status} on {table_name} at {check_time:%H:%M}"
+
+    Returns:
+        A function of the fields of a message, returning the rendered text
+    """
+    pieces: List[Callable[[Dict], str]] = []
+    for literal, field, spec, conversion in compile_template(template):
+        if literal:
+            pieces.append(lambda fields, text=literal: text)
+        if field is not None:
+            pieces.append(_field_renderer(field, spec or "", conversion))
+    return lambda fields: "".join([piece(fields) for piece in pieces])
+
+def _format_column(values: pd.Series, spec: str, conversion: Optional[str]) -> np.ndarray:
+    """
+    Render a column of values with a format spec, datetime columns are formatted at once.
+
+    Args:
+        values (pd.Series): The values of the column
+        spec (str): The format spec, e.g. "%Y-%m-%d" or ".2f"
+        conversion (str, optional): The conversion ('r', 's' or 'a')
+
+    Returns:
+        The rendered values as an array of str
+    """
+    if conversion is not None:
+        values = values.map(_CONVERSIONS[conversion])
+    elif spec and pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.strftime(spec).fillna("NaT").to_numpy(dtype=object)
+    if not spec:
+        return values.map(str).to_numpy(dtype=object)
+    return values.map(lambda v: format(v, spec)).to_numpy(dtype=object)
+
+
+class TemplateFormatter(BaseFormatter):
+    """
+    A formatter rendering the messages with a template (in `str.format` syntax) defined in the
+    config, e.g.:
+
+        formatters:
+          status_line:
+            class_name: TemplateFormatter
+            template: "{check_status} on {table_name} at {check_time:%Y-%m-%d %H:%M:%S}"
+    """
+    def __init__(self, template: str) -> None:
+        """
+        Initialize the formatter with a template, compiled by `setup`.
+
+        Args:
+            template (str): The template, the fields are the keys of the messages
+
+        Returns:
+            None
+        """
+        self.template = template
+        self._render: Optional[Callable[[Dict], str]] = None
+
+    def setup(self) -> None:
+        """
+        Compile the template (cached) into a render function, called once when the config is 
+        loaded (or on the first render).
+
+        Args:
+            None
+
+        Return:
+            None
+        """
+        self._parts = compile_template(self.template)
+        # nested fields (e.g. "{a[0]}") & specs (e.g. "{a:{width}}") are rendered one by one
+        self._vectorized = all(
+            field is None or (field.isidentifier() and "{" not in (spec or ""))
+            for _, field, spec, _ in self._parts
+        )
+        self._render = compile_renderer(self.template)
+
+    def format(self, msg: Message) -> str:
+        """
+        Render a Message object with the template.
+
+        Args:
+            msg (Message): A Message object to be renderred
+
+        Return:
+            The rendered message
+        """
+        if self._render is None:
+            self.setup()
+        return self._render(msg.message)
+
+    def format_batch(self, batch: MessageBatch) -> List[str]:
+        """
+        Render a whole batch with the template, column by column.
+
+        Args:
+            batch (MessageBatch): A MessageBatch object to be renderred
+
+        Return:
+            The list of rendered messages
+        """
+        if self._render is None:
+            self.setup()
+        if not self._vectorized:
+            return super().format_batch(batch)
+        n_msg = len(batch)
+        res = np.full(n_msg, "", dtype=object)
+        columns = {}
+        for literal, field, spec, conversion in self._parts:
+            if literal:
+                res = res + literal
+            if field is None:
+                continue
+            key = (field, spec, conversion)
+            if key not in columns:
+                columns[key] = _format_column(pd.Series(batch.column(field)), spec, conversion)
+            res = res + columns[key]
+        return res.tolist()
@@ -1,44 +1,849 @@
-from dnt.core.base import BaseSource, Message
-from typing import List, Dict, Optional, Callable
-from sqlalchemy import create_engine
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import mmap
+import os
+import re
+from abc import abstractmethod
+from dnt.core.base import BaseSource, Message, MessageBatch, Messages
+from dnt.core.checkpoint import CheckpointStore, Progress
+from dnt.core.engines import EngineRegistry
+from dnt.core.utils import NOTSET, level_names_below, lvl_to_num
+from typing import Any, Iterator, List, Dict, Optional, Callable, Tuple, Union
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
 import pandas as pd
 
 
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_SELECT = re.compile(r"^\s*select\b", re.IGNORECASE)
+
+# The errors raised when a (wrapped) query fails to run
+_QUERY_ERRORS = (DBAPIError, pd.errors.DatabaseError)
+
+_FETCH_MODES = ("pandas", "arrow")
+
+
 class SQLSource(BaseSource):
     """
     A class to get message from SQL database.
     """
-    def __init__(self, name: str, **kwargs: Dict) -> None:
+    supports_level_pushdown = True
+    tracks_progress = True
+
+    def __init__(
+        self, 
+        name: str, 
+        chunksize: Optional[int]=None, 
+        columnar: bool=False, 
+        fetch: str="pandas",
+        arrow_batch_size: int=10000,
+        **kwargs: Dict
+    ) -> None:
         """
         Initialize the SQLSource with a name and connection configs.
 
         Args:
             name (str): The name of the source
+            chunksize (int, optional): If set, stream every query in batches of this many rows,
+                None by default (load the whole result at once)
+            columnar (bool): Whether to return the messages as MessageBatch objects instead of
+                lists of Message objects, False by default
+            fetch (str): How to fetch the results, either 'pandas' (by default) or 'arrow' 
+                (the rows are read into Arrow record batches, and only converted to Python 
+                objects column by column when accessed; requires `pyarrow`)
+            arrow_batch_size (int): The number of rows per record batch in 'arrow' mode 
+                (if no chunksize), 10000 by default
 
         Returns:
             None
         """
         super().__init__(name)
-        self.connection = create_engine(**kwargs)
+        if fetch not in _FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode: {fetch}")
+        self.chunksize = chunksize
+        self.columnar = columnar
+        self.fetch = fetch
+        self.arrow_batch_size = arrow_batch_size
+        self.engine_config = kwargs
+        self.engine_registry = EngineRegistry()
+        self.checkpoints = CheckpointStore()
+        # the progress of the calls made outside of a Runner (without a `progress`)
+        self._progress = Progress()
 
-    def get_messages(self, query: str) -> List[Message]:
+    def attach(self, config: Any) -> None:
         """
-        Extract messages from the SQL database using a query.
-        (Note: The query must return a column named 'level')
+        Share the engine registry & checkpoint store of the config, so sources pointing at 
+        the same database share one connection pool.
 
         Args:
-            query (str): The query to extract messages
+            config (Config): The config the source is loaded by
+
+        Returns:
+            None
+        """
+        self.engine_registry = config.engines
+        self.checkpoints = config.checkpoints
+
+    def commit(self) -> None:
+        """
+        Persist the watermarks of the queries run since the last commit (without a 
+        `progress`, the Runner commits the progress of each job run instead).
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._progress.commit()
+
+    def rollback(self) -> None:
+        """
+        Discard the watermarks of the queries run since the last commit.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._progress.rollback()
+
+    def _watermark_key(self, query: str, watermark: str, job: Optional[str]=None) -> str:
+        """
+        Generate the checkpoint key of a watermark query.
+
+        Args:
+            query (str): The query
+            watermark (str): The watermark column
+            job (str, optional): The name of the job, so jobs running the same query keep 
+                their own watermarks
+
+        Returns:
+            The key of the checkpoint
+        """
+        normalized = " ".join(query.split()).rstrip(";")
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+        if job is None:
+            return f"sql:{self.name}:{watermark}:{digest}"
+        return f"sql:{self.name}:{job}:{watermark}:{digest}"
+
+    def _watermark_query(self, inner: str, watermark: str, key: str, legacy_key: Optional[str]=None) -> Tuple[str, Dict]:
+        """
+        Wrap a query to only return the rows past the last committed watermark.
+
+        Args:
+            inner (str): The query (with colons escaped)
+            watermark (str): The watermark column
+            key (str): The checkpoint key of the watermark
+            legacy_key (str, optional): The key the watermark was kept under before it was 
+                scoped to the job, read if there is no checkpoint under `key` yet
+
+        Returns:
+            The wrapped query and its parameters
+        """
+        if not _IDENTIFIER.match(watermark):
+            raise ValueError(f"Invalid watermark column: {watermark}")
+        last_value = self.checkpoints.get(key)
+        if last_value is None and legacy_key is not None:
+            last_value = self.checkpoints.get(legacy_key)
+        if last_value is None:
+            return f"SELECT * FROM ({inner}) AS _dnt_wm ORDER BY {watermark}", {}
+        return (
+            f"SELECT * FROM ({inner}) AS _dnt_wm WHERE {watermark} > :_dnt_watermark ORDER BY {watermark}",
+            {"_dnt_watermark": last_value}
+        )
+
+    @staticmethod
+    def _level_query(inner: str, min_level: Union[float, int, str]) -> Optional[Tuple[str, Dict]]:
+        """
+        Wrap a query to drop the rows below a notification level in the database.
+        (Only rows with a known level name below the threshold are dropped, other rows are 
+        kept to be filtered as usual. None is returned if the query can't be wrapped safely.)
+
+        Args:
+            inner (str): The query (with colons escaped)
+            min_level (float/int/str): The minimum notification level
+
+        Returns:
+            The wrapped query and its parameters, or None
+        """
+        names = level_names_below(min_level)
+        if len(names) == 0 or not _SELECT.match(inner) or ";" in inner:
+            return None
+        params = {f"_dnt_lvl_{n}": name for n, name in enumerate(names)}
+        placeholders = ", ".join(f":{k}" for k in params)
+        return (
+            f"SELECT * FROM ({inner}) AS _dnt_lvl WHERE level IS NULL OR UPPER(level) NOT IN ({placeholders})",
+            params
+        )
+
+    def _plan_queries(
+        self, 
+        query: str, 
+        watermark: Optional[str], 
+        key: Optional[str], 
+        min_level: Optional[Union[float, int, str]],
+        legacy_key: Optional[str]=None
+    ) -> List[Tuple[Any, Dict]]:
+        """
+        Build the queries to run, the first one that succeeds is used (e.g. the query with 
+        the level pushed down, then the original one).
+
+        Args:
+            query (str): The query
+            watermark (str, optional): The watermark column
+            key (str, optional): The checkpoint key of the watermark
+            min_level (float/int/str, optional): The minimum notification level to push down
+            legacy_key (str, optional): The unscoped checkpoint key of the watermark
+
+        Returns:
+            A list of (query, parameters)
+        """
+        # colons are escaped so literals (e.g. '10:00') are not taken as bind parameters
+        inner = query.strip().rstrip(";").replace(":", "\\:")
+        candidates: List[Tuple[Optional[str], Dict]] = []
+        if min_level is not None and lvl_to_num(min_level) > NOTSET:
+            wrapped = self._level_query(inner, min_level)
+            if wrapped is not None:
+                candidates.append(wrapped)
+        candidates.append((None, {}))
+
+        plans = []
+        for sql, params in candidates:
+            if watermark is not None:
+                sql, wm_params = self._watermark_query(sql or inner, watermark, key, legacy_key)
+                params = {**params, **wm_params}
+            plans.append((query, {}) if sql is None else (text(sql), params))
+        return plans
+
+    def _track_watermark(
+        self, 
+        frame: Any, 
+        watermark: Optional[str], 
+        key: Optional[str], 
+        progress: Progress
+    ) -> None:
+        """
+        Keep the highest watermark of the fetched rows, to be persisted on commit.
+
+        Args:
+            frame (pd.DataFrame/ArrowMessageBatch): The fetched rows
+            watermark (str, optional): The watermark column
+            key (str, optional): The checkpoint key of the watermark
+            progress (Progress): The progress of the job run
+
+        Returns:
+            None
+        """
+        if watermark is None or len(frame) == 0:
+            return
+        columns = frame.columns if isinstance(frame, pd.DataFrame) else frame.table.column_names
+        if watermark not in columns:
+            raise AttributeError(f"No '{watermark}' column in table.")
+        if isinstance(frame, pd.DataFrame):
+            value = frame[watermark].max()
+        elif watermark in frame.objects:
+            value = max(v for v in frame.objects[watermark] if v is not None)
+        else:
+            import pyarrow.compute as pc
+            value = pc.max(frame.table.column(watermark)).as_py()
+        pending = progress.get(self.checkpoints, key)
+        if pending is None or value > pending:
+            progress.set(self.checkpoints, key, value)
+
+    @property
+    def connection(self) -> Engine:
+        """
+        The (shared) engine of the source.
+        """
+        return self.engine_registry.get_engine(**self.engine_config)
+
+    @staticmethod
+    def _to_messages(df: Any, columnar: bool=False) -> Union[List[Message], MessageBatch]:
+        """
+        Convert a DataFrame of query results into Message objects.
+        (The results fetched in 'arrow' mode are always kept columnar as an ArrowMessageBatch.)
+
+        Args:
+            df (pd.DataFrame/ArrowMessageBatch): The query results
+            columnar (bool): Whether to keep the results columnar as a MessageBatch
 
         Returns:
-            msg_ls (list): A list of messages (in Message objects)
+            msg_ls (list): A list of messages (in Message objects), or a MessageBatch
         """
-        df: pd.DataFrame = pd.read_sql_query(query, con=self.connection)
+        columns = df.columns if isinstance(df, pd.DataFrame) else df.table.column_names
         try:
-            assert "level" in df.columns
+            assert "level" in columns
         except AssertionError:
             raise AttributeError("No 'level' column in table.")
 
+        if not isinstance(df, pd.DataFrame):
+            return df
+        if columnar:
+            return MessageBatch(df)
         res_ls = df.to_dict("records")
         msg_ls = [Message(msg) for msg in res_ls]
         return msg_ls
-        
\ No newline at end of file
+
+    def _iter_arrow(self, conn: Any, query: Any, params: Dict, chunksize: Optional[int]) -> Iterator:
+        """
+        Run a query and read the rows into Arrow tables, without building a DataFrame.
+        (The values still go through the DB-API driver, but are only converted back to Python 
+        objects column by column when accessed.)
+
+        Args:
+            conn (Connection): The connection to run the query with
+            query (str): The query to run
+            params (dict): The parameters of the query
+            chunksize (int, optional): If set, yield a batch per chunk of this many rows, 
+                otherwise yield a single batch
+
+        Returns:
+            A generator of ArrowMessageBatch objects
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("The 'arrow' fetch mode requires `pyarrow`, try `pip install pyarrow`")
+
+        from dnt.core.arrow import ArrowMessageBatch
+
+        def _to_batch(rows):
+            arrays, objects = [], {}
+            for name, col in zip(names, zip(*rows)):
+                try:
+                    arrays.append(pa.array(col))
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    # mixed types, stored as text & kept as Python objects
+                    objects[name] = list(col)
+                    arrays.append(pa.array([None if v is None else str(v) for v in col], type=pa.string()))
+            return ArrowMessageBatch(pa.Table.from_arrays(arrays, names=names), objects=objects)
+
+        if isinstance(query, str):
+            result = conn.exec_driver_sql(query)
+        else:
+            result = conn.execute(query, params)
+        names = list(result.keys())
+        batches = []
+        while True:
+            rows = result.fetchmany(chunksize or self.arrow_batch_size)
+            if not rows:
+                break
+            if chunksize:
+                yield _to_batch(rows)
+            else:
+                batches.append(_to_batch(rows))
+        if not chunksize:
+            if len(batches) == 0:
+                yield ArrowMessageBatch(pa.table({n: pa.array([], type=pa.null()) for n in names}))
+            else:
+                yield ArrowMessageBatch.concat(batches)
+
+    def _iter_frames(self, conn: Any, query: Any, params: Dict, chunksize: Optional[int], fetch: str) -> Iterator:
+        """
+        Run a query and read the rows into DataFrames (or ArrowMessageBatch objects in 'arrow' mode).
+
+        Args:
+            conn (Connection): The connection to run the query with
+            query (str): The query to run
+            params (dict): The parameters of the query
+            chunksize (int, optional): If set, yield a frame per chunk of this many rows, 
+                otherwise yield a single frame
+            fetch (str): The fetch mode, 'pandas' or 'arrow'
+
+        Returns:
+            A generator of DataFrames or ArrowMessageBatch objects
+        """
+        if fetch == "arrow":
+            for batch in self._iter_arrow(conn, query, params, chunksize):
+                yield batch
+        elif chunksize:
+            for df in pd.read_sql_query(query, con=conn, params=params, chunksize=chunksize):
+                yield df
+        else:
+            yield pd.read_sql_query(query, con=conn, params=params)
+
+    def _read(self, plans: List[Tuple[Any, Dict]], fetch: str="pandas") -> Any:
+        """
+        Run the first query that succeeds.
+
+        Args:
+            plans (list): A list of (query, parameters)
+            fetch (str): The fetch mode, 'pandas' or 'arrow'
+
+        Returns:
+            The query results as a DataFrame (or an ArrowMessageBatch in 'arrow' mode)
+        """
+        for n, (query, params) in enumerate(plans):
+            try:
+                with self.connection.connect() as conn:
+                    return next(self._iter_frames(conn, query, params, None, fetch))
+            except _QUERY_ERRORS:
+                if n == len(plans) - 1:
+                    raise
+
+    def _stream_messages(
+        self, 
+        plans: List[Tuple[Any, Dict]], 
+        chunksize: int, 
+        columnar: bool,
+        watermark: Optional[str]=None,
+        key: Optional[str]=None,
+        fetch: str="pandas",
+        progress: Optional[Progress]=None
+    ) -> Iterator:
+        """
+        Stream messages from the SQL database with a server-side cursor, chunk by chunk.
+        (The next query is tried if a query fails before returning any rows.)
+
+        Args:
+            plans (list): A list of (query, parameters), the first one that succeeds is used
+            chunksize (int): The number of rows to fetch per batch
+            columnar (bool): Whether to yield MessageBatch objects
+            watermark (str, optional): The watermark column to track
+            key (str, optional): The checkpoint key of the watermark
+            fetch (str): The fetch mode, 'pandas' or 'arrow'
+            progress (Progress, optional): The progress of the job run
+
+        Returns:
+            A generator of message batches
+        """
+        for n, (query, params) in enumerate(plans):
+            started = False
+            try:
+                with self.connection.connect() as conn:
+                    conn = conn.execution_options(stream_results=True)
+                    for df in self._iter_frames(conn, query, params, chunksize, fetch):
+                        started = True
+                        self._track_watermark(df, watermark, key, progress)
+                        yield self._to_messages(df, columnar)
+                return
+            except _QUERY_ERRORS:
+                if started or n == len(plans) - 1:
+                    raise
+
+    def get_messages(
+        self, 
+        query: str, 
+        chunksize: Optional[int]=None, 
+        columnar: Optional[bool]=None,
+        watermark: Optional[str]=None,
+        min_level: Optional[Union[float, int, str]]=None,
+        fetch: Optional[str]=None,
+        progress: Optional[Progress]=None
+    ) -> Messages:
+        """
+        Extract messages from the SQL database using a query.
+        (Note: The query must return a column named 'level')
+
+        Args:
+            query (str): The query to extract messages
+            chunksize (int, optional): If set, stream the results in batches of this many rows,
+                fall back to the source's chunksize if None
+            columnar (bool, optional): Whether to return MessageBatch objects, fall back to the
+                source's setting if None
+            watermark (str, optional): A monotonically increasing column (e.g. a timestamp or 
+                an autoincrement id), if set, only the rows past the last committed watermark 
+                are returned, and the watermark advances when the progress is committed
+            min_level (float/int/str, optional): If set, the rows with a lower level are dropped in
+                the database when the query can be wrapped (set by the Runner from the levels 
+                of all the receivers of a job)
+            fetch (str, optional): The fetch mode ('pandas' or 'arrow'), fall back to the
+                source's setting if None
+            progress (Progress, optional): The progress of the job run the watermark is 
+                recorded in & scoped to (set by the Runner), the source's own progress 
+                (persisted by `commit`) if None
+
+        Returns:
+            msg_ls (list): A list of messages (in Message objects) or a MessageBatch, or a 
+                generator of message batches in streaming mode
+        """
+        chunksize = self.chunksize if chunksize is None else chunksize
+        columnar = self.columnar if columnar is None else columnar
+        fetch = self.fetch if fetch is None else fetch
+        if fetch not in _FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode: {fetch}")
+        progress = self._progress if progress is None else progress
+        key, legacy_key = None, None
+        if watermark is not None:
+            key = self._watermark_key(query, watermark, progress.job)
+            if progress.job is not None:
+                legacy_key = self._watermark_key(query, watermark)
+        plans = self._plan_queries(query, watermark, key, min_level, legacy_key)
+        if chunksize:
+            return self._stream_messages(plans, chunksize, columnar, watermark, key, fetch, progress)
+
+        df = self._read(plans, fetch)
+        self._track_watermark(df, watermark, key, progress)
+        return self._to_messages(df, columnar)
+
+
+class FileSource(BaseSource):
+    """
+    A base class to get messages from a file, keeping track of the progress in a checkpoint
+    which is only persisted once the messages are deliverred.
+    """
+    cacheable = False
+    tracks_progress = True
+
+    def __init__(self, name: str, path: str, columnar: bool=False) -> None:
+        """
+        Initialize the source with a name and the path of the file.
+
+        Args:
+            name (str): The name of the source
+            path (str): The path of the file
+            columnar (bool): Whether to return the messages as a MessageBatch, False by default
+
+        Returns:
+            None
+        """
+        super().__init__(name)
+        self.path = path
+        self.columnar = columnar
+        self.checkpoints = CheckpointStore()
+        # the progress of the calls made outside of a Runner (without a `progress`)
+        self._progress = Progress()
+
+    def _key(self, job: Optional[str]=None) -> str:
+        if job is None:
+            return f"file:{self.name}:{os.path.abspath(self.path)}"
+        return f"file:{self.name}:{job}:{os.path.abspath(self.path)}"
+
+    def _checkpoint(self, progress: Progress) -> Tuple[str, Optional[Dict]]:
+        """
+        Get the last committed checkpoint of the file for a job run (the checkpoint kept 
+        before it was scoped to the job is used if the job has none yet).
+
+        Args:
+            progress (Progress): The progress of the job run
+
+        Returns:
+            The key and the value of the checkpoint
+        """
+        key = self._key(progress.job)
+        checkpoint = self.checkpoints.get(key)
+        if checkpoint is None and progress.job is not None:
+            checkpoint = self.checkpoints.get(self._key())
+        return key, checkpoint
+
+    def attach(self, config: Any) -> None:
+        """
+        Share the checkpoint store of the config.
+
+        Args:
+            config (Config): The config the source is loaded by
+
+        Returns:
+            None
+        """
+        self.checkpoints = config.checkpoints
+
+    def commit(self) -> None:
+        """
+        Persist the progress made since the last commit (without a `progress`, the Runner 
+        commits the progress of each job run instead).
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._progress.commit()
+
+    def rollback(self) -> None:
+        """
+        Discard the progress made since the last commit.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._progress.rollback()
+
+    @staticmethod
+    def _to_messages(records: List[Dict], columnar: bool) -> Union[List[Message], MessageBatch]:
+        """
+        Wrap records into Message objects or a MessageBatch.
+
+        Args:
+            records (list): A list of dicts
+            columnar (bool): Whether to return a MessageBatch
+
+        Returns:
+            A list of Message objects, or a MessageBatch
+        """
+        if columnar:
+            return MessageBatch(pd.DataFrame(records))
+        return [Message(rec) for rec in records]
+
+
+class TailingFileSource(FileSource):
+    """
+    A base class to get messages from a file that grows continuously (e.g. logs). Only the 
+    bytes appended since the last committed offset are read (via a memory map), rotation 
+    & truncation of the file restart the reading from the beginning.
+    (A file rewritten in place, i.e. same inode & not shorter, is detected by a hash of its 
+    first `head_size` bytes kept in the checkpoint, along with the state of the subclasses, 
+    see `_file_state`.)
+    """
+    head_size = 256
+    def __init__(self, name: str, path: str, columnar: bool=False, start_at_end: bool=False) -> None:
+        """
+        Initialize the source with a name and the path of the file.
+
+        Args:
+            name (str): The name of the source
+            path (str): The path of the file
+            columnar (bool): Whether to return the messages as a MessageBatch, False by default
+            start_at_end (bool): Whether to skip the existing content of the file when it is 
+                read the first time, False by default
+
+        Returns:
+            None
+        """
+        super().__init__(name, path, columnar)
+        self.start_at_end = start_at_end
+
+    def _head_hash(self, content: Union[mmap.mmap, bytes], offset: int) -> str:
+        """
+        Hash the head of the file, i.e. the first bytes read (up to `head_size`).
+
+        Args:
+            content (mmap or bytes): The content of the file
+            offset (int): The offset read up to
+
+        Returns:
+            The SHA-1 hex digest
+        """
+        return hashlib.sha1(content[:min(offset, self.head_size)]).hexdigest()
+
+    def _file_state(self, content: Union[mmap.mmap, bytes], size: int, checkpoint: Optional[Dict]) -> Dict:
+        """
+        Get the state kept in the checkpoint until the file is rotated (e.g. a header), none 
+        by default.
+
+        Args:
+            content (mmap or bytes): The content of the file
+            size (int): The size of the file
+            checkpoint (dict, optional): The checkpoint the reading goes on from, None if the 
+                file is read from the beginning (or the first time)
+
+        Returns:
+            A dict of the fields to keep in the checkpoint
+        """
+        return {}
+
+    def _read_new_bytes(self, progress: Progress) -> Tuple[bytes, int, Dict]:
+        """
+        Read the complete lines appended since the last committed offset.
+
+        Args:
+            progress (Progress): The progress of the job run
+
+        Returns:
+            The bytes read, the offset they start at and the new checkpoint
+        """
+        stat = os.stat(self.path)
+        key, checkpoint = self._checkpoint(progress)
+        # an empty file can't be memory mapped
+        with open(self.path, "rb") as f, (
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size > 0 else contextlib.nullcontext(b"")
+        ) as mm:
+            previous = None
+            if checkpoint is None:
+                offset = stat.st_size if self.start_at_end else 0
+            elif checkpoint["inode"] != stat.st_ino or checkpoint["offset"] > stat.st_size:
+                # rotated or truncated
+                offset = 0
+            elif "head" in checkpoint and checkpoint["head"] != self._head_hash(mm, checkpoint["offset"]):
+                # rewritten in place (the checkpoints saved before the head hash are trusted)
+                offset = 0
+            else:
+                offset = checkpoint["offset"]
+                previous = checkpoint
+
+            data = b""
+            if stat.st_size > offset:
+                end = mm.rfind(b"\n", offset, stat.st_size) + 1
+                if end > offset:
+                    data = mm[offset:end]
+            offset_end = offset + len(data)
+            state = {
+                "inode": stat.st_ino,
+                "offset": offset_end,
+                "head": self._head_hash(mm, offset_end),
+                **self._file_state(mm, stat.st_size, previous),
+            }
+        progress.set(self.checkpoints, key, state)
+        return data, offset, state
+
+    @abstractmethod
+    def _parse(self, data: bytes, offset: int, state: Dict) -> List[Dict]:
+        """
+        Parse the bytes read into records.
+
+        Args:
+            data (bytes): The complete lines read
+            offset (int): The offset the bytes start at
+            state (dict): The checkpoint of the file, see `_file_state`
+
+        Returns:
+            A list of dicts
+        """
+        raise NotImplementedError()
+
+    def get_messages(
+        self, 
+        columnar: Optional[bool]=None, 
+        progress: Optional[Progress]=None
+    ) -> Union[List[Message], MessageBatch]:
+        """
+        Extract messages from the lines appended to the file since the last commit.
+
+        Args:
+            columnar (bool, optional): Whether to return a MessageBatch, fall back to the 
+                source's setting if None
+            progress (Progress, optional): The progress of the job run the offset is recorded 
+                in & scoped to (set by the Runner), the source's own progress if None
+
+        Returns:
+            A list of messages (in Message objects), or a MessageBatch
+        """
+        columnar = self.columnar if columnar is None else columnar
+        data, offset, state = self._read_new_bytes(self._progress if progress is None else progress)
+        return self._to_messages(self._parse(data, offset, state) if data else [], columnar)
+
+
+class JSONLSource(TailingFileSource):
+    """
+    A class to get messages from a JSON Lines file (one JSON object per line).
+    """
+    def _parse(self, data: bytes, offset: int, state: Dict) -> List[Dict]:
+        """
+        Parse JSON lines into records, blank lines are skipped.
+
+        Args:
+            data (bytes): The complete lines read
+            offset (int): The offset the bytes start at
+            state (dict): The checkpoint of the file
+
+        Returns:
+            A list of dicts
+        """
+        return [json.loads(line) for line in data.splitlines() if line.strip()]
+
+
+class CSVSource(TailingFileSource):
+    """
+    A class to get messages from a CSV file with a header line.
+    (Note: Fields spanning multiple lines are not supported)
+    """
+    def __init__(self, name: str, path: str, delimiter: str=",", **kwargs) -> None:
+        """
+        Initialize the source with a name and the path of the file.
+
+        Args:
+            name (str): The name of the source
+            path (str): The path of the file
+            delimiter (str): The delimiter of the fields, ',' by default
+
+        Returns:
+            None
+        """
+        super().__init__(name, path, **kwargs)
+        self.delimiter = delimiter
+
+    def _file_state(self, content: Union[mmap.mmap, bytes], size: int, checkpoint: Optional[Dict]) -> Dict:
+        """
+        Get the header line of the file, read once per rotation (or rewrite) of the file.
+
+        Args:
+            content (mmap or bytes): The content of the file
+            size (int): The size of the file
+            checkpoint (dict, optional): The checkpoint the reading goes on from, None if the 
+                file is read from the beginning (or the first time)
+
+        Returns:
+            A dict of the column names & the size of the header line (in bytes), empty if 
+            the header line is not complete yet
+        """
+        if checkpoint is not None and "header" in checkpoint:
+            return {"header": checkpoint["header"], "header_size": checkpoint["header_size"]}
+        end = content.find(b"\n", 0, size) + 1
+        if end == 0:
+            return {}
+        header = next(csv.reader([content[:end].decode("utf-8")], delimiter=self.delimiter))
+        return {"header": header, "header_size": end}
+
+    def _parse(self, data: bytes, offset: int, state: Dict) -> List[Dict]:
+        """
+        Parse CSV lines into records, the header line is skipped.
+
+        Args:
+            data (bytes): The complete lines read
+            offset (int): The offset the bytes start at
+            state (dict): The checkpoint of the file, with the header
+
+        Returns:
+            A list of dicts
+        """
+        header, header_size = state["header"], state["header_size"]
+        if offset < header_size:
+            data = data[header_size - offset:]
+        if not data.strip():
+            return []
+        df = pd.read_csv(io.BytesIO(data), names=header, sep=self.delimiter, header=None)
+        return df.to_dict("records")
+
+
+class ParquetSource(FileSource):
+    """
+    A class to get messages from a Parquet file, the file is only read again when it changes
+    and only the rows past the last committed row count are returned.
+    (Note: Requires `pyarrow` or `fastparquet`)
+    """
+    def get_messages(
+        self, 
+        columnar: Optional[bool]=None, 
+        progress: Optional[Progress]=None
+    ) -> Union[List[Message], MessageBatch]:
+        """
+        Extract messages from the rows added to the file since the last commit.
+
+        Args:
+            columnar (bool, optional): Whether to return a MessageBatch, fall back to the 
+                source's setting if None
+            progress (Progress, optional): The progress of the job run the row count is 
+                recorded in & scoped to (set by the Runner), the source's own progress if None
+
+        Returns:
+            A list of messages (in Message objects), or a MessageBatch
+        """
+        columnar = self.columnar if columnar is None else columnar
+        progress = self._progress if progress is None else progress
+        stat = os.stat(self.path)
+        key, checkpoint = self._checkpoint(progress)
+        checkpoint = checkpoint or {}
+        if checkpoint.get("mtime") == stat.st_mtime_ns and checkpoint.get("size") == stat.st_size:
+            df = pd.DataFrame()
+            n_rows = checkpoint["rows"]
+        else:
+            df = pd.read_parquet(self.path)
+            n_rows = len(df)
+            # a rewritten file with fewer rows is read from the beginning
+            if checkpoint.get("rows", 0) <= n_rows:
+                df = df.iloc[checkpoint.get("rows", 0):]
+        progress.set(self.checkpoints, key, {"mtime": stat.st_mtime_ns, "size": stat.st_size, "rows": n_rows})
+
+        if columnar:
+            return MessageBatch(df)
+        return self._to_messages(df.to_dict("records"), columnar)
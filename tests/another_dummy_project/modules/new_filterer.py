@@ -1,5 +1,6 @@
+import numpy as np
 from dnt.core.messages import Message
-from dnt.core.base import BaseFilterer
+from dnt.core.base import BaseFilterer, MessageBatch
 
 
 class SqlServerFilterer(BaseFilterer):
@@ -10,6 +11,10 @@ class SqlServerFilterer(BaseFilterer):
             res = True
         return res
 
+    @staticmethod
+    def filter_batch(batch: MessageBatch) -> np.ndarray:
+        return batch.column("db") == "sqlserver"
+
 class DevFilterer(BaseFilterer):
     @staticmethod
     def filter(msg: Message) -> bool:
@@ -17,3 +22,7 @@ class DevFilterer(BaseFilterer):
         if "dev" in msg.message["table_name"]:
             res = True
         return res
+
+    @staticmethod
+    def filter_batch(batch: MessageBatch) -> np.ndarray:
+        return batch.df["table_name"].str.contains("dev", regex=False, na=False).to_numpy(dtype=bool)
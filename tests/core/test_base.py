@@ -1,5 +1,7 @@
 import pytest
-from dnt.core.base import Message, BaseFormatter
+import numpy as np
+import pandas as pd
+from dnt.core.base import Message, MessageBatch, BaseFilterer, BaseFormatter, LevelIndex, concat_messages, filter_mask
 from dnt.core.utils import INFO
 
 
@@ -28,3 +30,143 @@ def test_base_formatter():
     bf = BaseFormatter()
     msg = Message({"a": 1})
     assert bf.format(msg) == "{'a': 1}"
+
+def test_message_batch():
+    """
+    Test the MessageBatch class.
+    """
+    df = pd.DataFrame({"a": [1, 2, 3], "level": ["INFO", "ERROR", "DEBUG"]})
+    batch = MessageBatch(df)
+
+    assert len(batch) == 3
+    assert batch.lvl_no.dtype == np.int8
+    assert batch[1] == Message({"a": 2, "level": "ERROR"})
+    assert list(batch) == [Message(rec) for rec in df.to_dict("records")]
+    assert batch == MessageBatch.from_messages(list(batch))
+
+    selected = batch.at_level("INFO")
+    assert isinstance(selected, MessageBatch)
+    assert selected.column("a").tolist() == [1, 2]
+    assert batch.select([2, 0]).column("a").tolist() == [3, 1]
+
+    merged = concat_messages([batch, selected])
+    assert isinstance(merged, MessageBatch)
+    assert merged.column("a").tolist() == [1, 2, 3, 1, 2]
+    assert concat_messages([[Message({"a": 0})], selected])[0] == Message({"a": 0})
+
+def test_message_batch_no_level():
+    """
+    Test the MessageBatch class without a level column.
+    """
+    batch = MessageBatch(pd.DataFrame({"a": [1, 2]}))
+    assert batch.lvl_no.tolist() == [0, 0]
+    assert len(batch.at_level("DEBUG")) == 0
+
+
+class LegacyFilterer(BaseFilterer):
+    def __init__(self):
+        self.n_calls = 0
+
+    def filter(self, msg: Message) -> bool:
+        self.n_calls += 1
+        return msg.message["a"] < 5
+
+
+class ColumnFilterer(BaseFilterer):
+    @staticmethod
+    def filter(msg: Message) -> bool:
+        return msg.message["b"] != "nope"
+
+    @staticmethod
+    def filter_batch(batch: MessageBatch) -> np.ndarray:
+        return batch.column("b") != "nope"
+
+
+def test_filter_mask():
+    """
+    Test combining the batch filterers with the per-message (legacy) ones.
+    """
+    msg_ls = [
+        Message({"a": 1, "b": "test", "level": "INFO"}),
+        Message({"a": 2, "b": "nope", "level": "INFO"}),
+        Message({"a": 10, "b": "test", "level": "ERROR"}),
+    ]
+    batch = MessageBatch.from_messages(msg_ls)
+    legacy = LegacyFilterer()
+
+    # the legacy filterers fall back to `filter` on each message
+    assert legacy.filter_batch(batch).tolist() == [True, True, False]
+    assert legacy.n_calls == 3
+    assert ColumnFilterer().filter_batch(batch).tolist() == [True, False, True]
+
+    for msgs in (msg_ls, batch):
+        assert filter_mask(msgs, [legacy, ColumnFilterer()]).tolist() == [True, False, False]
+    assert filter_mask([], [legacy, ColumnFilterer()]).tolist() == []
+
+
+class TypeFilterer(BaseFilterer):
+    @staticmethod
+    def filter(msg: Message) -> bool:
+        return isinstance(msg.message["a"], int) and "c" not in msg.message
+
+
+def test_filter_mask_legacy_messages():
+    """
+    Test the legacy filterers get the original messages after a batch filterer.
+    """
+    msg_ls = [
+        Message({"a": 1, "b": "test", "level": "INFO"}),
+        Message({"a": 2, "b": "test", "c": None, "level": "INFO"}),
+    ]
+    assert filter_mask(msg_ls, [TypeFilterer()]).tolist() == [True, False]
+    assert filter_mask(msg_ls, [ColumnFilterer(), TypeFilterer()], adaptive=False).tolist() == [True, False]
+
+
+class DropAllFilterer(BaseFilterer):
+    @staticmethod
+    def filter(msg: Message) -> bool:
+        return False
+
+
+def test_filter_mask_short_circuit():
+    """
+    Test the short-circuit & adaptive ordering of the filterers.
+    """
+    msg_ls = [Message({"a": a, "b": "test", "level": "INFO"}) for a in (1, 2, 10, 20)]
+    legacy, drop_all = LegacyFilterer(), DropAllFilterer()
+
+    # the filterers not evaluated yet keep the config order
+    assert filter_mask(msg_ls, [legacy, drop_all]).tolist() == [False] * 4
+    assert legacy.n_calls == 4
+    assert legacy.stats.as_dict()["pass_rate"] == 0.5
+    # only the messages kept by the previous filterer are evaluated
+    assert drop_all.stats.seen == 2
+    assert drop_all.stats.pass_rate == 0
+
+    # the most selective filterer now runs first, nothing is left for the other one
+    assert filter_mask(msg_ls, [legacy, drop_all]).tolist() == [False] * 4
+    assert legacy.n_calls == 4
+    assert drop_all.stats.calls == 2
+
+    # unless the order is fixed
+    filter_mask(msg_ls, [legacy, drop_all], adaptive=False)
+    assert legacy.n_calls == 8
+
+
+def test_level_index():
+    """
+    Test the index of messages by notification level.
+    """
+    index = LevelIndex(np.array([20, 40, 10, 40, 30], dtype=np.int8))
+    assert index.buckets() == {10: 1, 20: 1, 30: 1, 40: 2}
+    assert index.at_level("ERROR").tolist() == [1, 3]
+    assert index.at_level(25).tolist() == [1, 3, 4]
+    assert index.at_level("NOTSET").tolist() == [0, 1, 2, 3, 4]
+    assert index.at_level(50).tolist() == []
+    # computed once per threshold
+    assert index.at_level("ERROR") is index.at_level(40)
+
+    batch = MessageBatch(pd.DataFrame({"a": [1, 2, 3], "level": ["INFO", "ERROR", "DEBUG"]}))
+    assert batch.at_level("DEBUG") is batch
+    assert batch.at_level("INFO").column("a").tolist() == [1, 2]
+    assert batch.level_index is batch.level_index
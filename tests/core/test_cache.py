@@ -0,0 +1,123 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import pandas as pd
+from dnt.core.base import Message, MessageBatch
+from dnt.core.cache import ResultCache
+from dnt.services.source import SQLSource
+
+
+def test_result_cache():
+    """
+    Test the ResultCache class.
+    """
+    cache = ResultCache(ttl=60)
+    ss = SQLSource(url="sqlite:///:memory:", name="cache_test")
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return [Message({"a": 1, "level": "INFO"})]
+
+    res_a = cache.get_or_fetch(ss, {"query": "SELECT 1;"}, fetch)
+    res_b = cache.get_or_fetch(ss, {"query": "  SELECT\n  1 "}, fetch)
+    assert res_a == res_b
+    assert res_a is not res_b
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    cache.get_or_fetch(ss, {"query": "SELECT 1", "chunksize": 10}, fetch)
+    assert len(calls) == 2
+    assert cache.stats()["entries"] == 2
+
+def test_result_cache_level():
+    """
+    Test the results fetched with a level pushed down are shared with higher levels.
+    """
+    cache = ResultCache(ttl=60)
+    ss = SQLSource(url="sqlite:///:memory:", name="cache_test")
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return []
+
+    cache.get_or_fetch(ss, {"query": "q", "min_level": "INFO"}, fetch)
+    cache.get_or_fetch(ss, {"query": "q", "min_level": "ERROR"}, fetch)
+    assert len(calls) == 1
+    # the lower level needs the rows dropped from the cached result
+    cache.get_or_fetch(ss, {"query": "q"}, fetch)
+    cache.get_or_fetch(ss, {"query": "q", "min_level": "INFO"}, fetch)
+    assert len(calls) == 2
+    assert cache.stats()["entries"] == 1
+
+def test_result_cache_single_flight():
+    """
+    Test the concurrent misses of the same key share one fetch.
+    """
+    cache = ResultCache(ttl=60)
+    ss = SQLSource(url="sqlite:///:memory:", name="cache_test")
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return [Message({"a": 1, "level": "INFO"})]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: cache.get_or_fetch(ss, {"query": "q"}, fetch), range(4)))
+    assert len(calls) == 1
+    assert all(res == results[0] for res in results)
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["coalesced"] == 3
+
+    # the error of the fetch is raised to all the callers
+    def fail():
+        time.sleep(0.1)
+        raise RuntimeError("down")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(cache.get_or_fetch, ss, {"query": "bad"}, fail) for _ in range(2)]
+    assert all(isinstance(f.exception(), RuntimeError) for f in futures)
+    assert cache.stats()["coalesced"] == 4
+
+def test_result_cache_ttl():
+    """
+    Test the expiry of the ResultCache class.
+    """
+    cache = ResultCache(ttl=0)
+    ss = SQLSource(url="sqlite:///:memory:", name="cache_test")
+    cache.get_or_fetch(ss, {"query": "SELECT 1"}, lambda: [])
+    cache.get_or_fetch(ss, {"query": "SELECT 1"}, lambda: [])
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["misses"] == 2
+
+def test_result_cache_lru():
+    """
+    Test the memory-bounded LRU eviction of the ResultCache class.
+    """
+    batch = MessageBatch(pd.DataFrame({"a": range(100), "level": "INFO"}))
+    cache = ResultCache(ttl=60, max_bytes=int(batch.df.memory_usage(index=False, deep=True).sum()) * 2 + 300)
+    ss = SQLSource(url="sqlite:///:memory:", name="cache_test")
+
+    for q in ["q1", "q2", "q1", "q3"]:
+        cache.get_or_fetch(ss, {"query": q}, lambda: batch)
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+    assert stats["size"] <= cache.max_bytes
+
+    # q1 was used more recently than q2
+    cache.get_or_fetch(ss, {"query": "q1"}, lambda: batch)
+    assert cache.stats()["hits"] == 2
+
+def test_result_cache_streaming():
+    """
+    Test streamed results are not cached.
+    """
+    cache = ResultCache(ttl=60)
+    ss = SQLSource(url="sqlite:///:memory:", name="cache_test")
+    res = cache.get_or_fetch(ss, {"query": "q"}, lambda: iter([[]]))
+    assert not isinstance(res, list)
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,32 @@
+import datetime
+import pytest
+from dnt.core.checkpoint import CheckpointStore
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        15,
+        10.5,
+        "2023-01-01 10:00:00",
+        datetime.datetime(2023, 1, 1, 10, 0, 0),
+    ]
+)
+def test_checkpoint_store(value, tmp_path):
+    """
+    Test the CheckpointStore class.
+    """
+    path = str(tmp_path / "checkpoints.db")
+    store = CheckpointStore(path)
+    assert store.get("key") is None
+    assert store.get("key", 0) == 0
+
+    store.set("key", value)
+    assert store.get("key") == value
+    store.close()
+
+    # persisted across restarts
+    store = CheckpointStore(path)
+    assert store.get("key") == value
+    store.delete("key")
+    assert store.get("key") is None
@@ -23,8 +23,48 @@ def test_set_up_services():
     assert "console" in config.destinations
     assert "new_formatter.TimeStringFormatter" in config.formatters
     assert "new_filterer.DevFilterer" in config.filterers
+    assert "(db == 'sqlserver') and ('dev' in table_name)" in config.filterers
+    assert config.filter_stats()["new_filterer.DevFilterer"]["seen"] == 0
 
 def test_validate():
     fpath = os.path.join(os.path.dirname(__file__), "..", "test_config.yml")
     config = Config(fpath)
     assert config.validate() is True
+
+def test_state_path(tmp_path):
+    fpath = os.path.join(os.path.dirname(__file__), "..", "test_config.yml")
+    config = Config(fpath)
+    config._filename = str(tmp_path / "conf" / "config.yml")
+    # resolved relative to the config file, the directory is created
+    assert config._state_path("../var/checkpoints.db") == str(tmp_path / "var" / "checkpoints.db")
+    assert os.path.isdir(tmp_path / "var")
+
+def test_invalid_filter_expression(tmp_path):
+    fpath = os.path.join(os.path.dirname(__file__), "..", "test_config.yml")
+    with open(fpath) as f:
+        content = f.read()
+    bad_fpath = tmp_path / "bad_config.yml"
+    bad_fpath.write_text(content.replace("\"db == 'sqlserver'\"", "\"__import__('os')\""))
+    with pytest.raises(ValueError):
+        Config(str(bad_fpath))
+
+def test_resolve_once(test_config):
+    """
+    Test the formatters, filterers & receivers are resolved once per config.
+    """
+    grp = test_config.groups["dummy_error_group"]
+    assert grp.receivers[0].filterer == [
+        test_config.filterers["new_filterer.DevFilterer"],
+        test_config.filterers["new_filterer.SqlServerFilterer"],
+    ]
+    assert test_config.groups["dummy_template_group"].receivers[0].formatter is test_config.formatters["status_line"]
+
+    class FakeConfig:
+        formatters = {"status_line": test_config.formatters["status_line"]}
+        filterers = {"new_filterer.DevFilterer": test_config.filterers["new_filterer.DevFilterer"]}
+
+    dest = test_config.destinations["console"]
+    dest.formatter, dest.filterer = "status_line", "new_filterer.DevFilterer"
+    dest.attach(FakeConfig)
+    assert dest.formatter is FakeConfig.formatters["status_line"]
+    assert dest.filterer == [FakeConfig.filterers["new_filterer.DevFilterer"]]
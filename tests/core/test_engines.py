@@ -0,0 +1,46 @@
+import os
+import pytest
+from dnt.core.config import Config
+from dnt.core.engines import EngineRegistry
+from dnt.services.source import SQLSource
+
+
+def test_engine_registry(tmp_path):
+    """
+    Test the EngineRegistry class.
+    """
+    registry = EngineRegistry(pool_size=2, max_overflow=1)
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+
+    engine = registry.get_engine(url)
+    assert registry.get_engine(url) is engine
+    assert registry.get_engine(url, echo=True) is not engine
+    assert f"{url} echo=True" in registry.metrics()
+    assert engine.pool.size() == 2
+
+    with engine.connect():
+        metrics = registry.metrics()[url]
+        assert metrics["checked_out"] == 1
+        assert metrics["checkouts"] == 1
+        assert metrics["connects"] == 1
+
+    registry.dispose()
+    assert registry.engines == {}
+
+def test_engine_registry_memory():
+    """
+    Test the EngineRegistry class with a pool without queue settings (SQLite in memory).
+    """
+    registry = EngineRegistry(pool_size=2, max_overflow=1, pool_timeout=5)
+    registry.get_engine("sqlite:///:memory:")
+    assert "SingletonThreadPool" in list(registry.metrics().values())[0]["status"]
+
+def test_shared_engine_across_sources(test_config_fn):
+    """
+    Test sources pointing at the same database share one engine.
+    """
+    config = Config(test_config_fn)
+    config.sources["another_sqlite"] = SQLSource(name="another_sqlite", url="sqlite:///test.db")
+    config.sources["another_sqlite"].attach(config)
+    assert config.sources["sqlite"].connection is config.sources["another_sqlite"].connection
+    assert len(config.engines.engines) == 1
@@ -0,0 +1,124 @@
+import pytest
+import pandas as pd
+from dnt.core.base import Message, MessageBatch
+from dnt.core.expressions import ExpressionFilterer, fuse_expressions, parse_expression
+from dnt.core.messages import MsgRcv
+
+
+@pytest.fixture
+def batch():
+    return MessageBatch(pd.DataFrame({
+        "db": ["sqlserver", "mysql", "sqlserver", None],
+        "table_name": ["dev_a", "dev_b", "prod_c", "dev_d"],
+        "n": [1, 5, 10, None],
+        "level": ["INFO", "ERROR", "ERROR", "WARNING"],
+    }))
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("db == 'sqlserver'", [True, False, True, False]),
+        ("'dev' in table_name", [True, True, False, True]),
+        ("'dev' not in table_name", [False, False, True, False]),
+        ("db in ['mysql', 'oracle']", [False, True, False, False]),
+        ("db is None", [False, False, False, True]),
+        ("1 < n <= 5", [False, True, False, False]),
+        ("n > -1 and not level == 'ERROR'", [True, False, False, False]),
+        ("db == 'mysql' or n >= 10", [False, True, True, False]),
+        ("True", [True, True, True, True]),
+    ]
+)
+def test_expression_filterer(batch, expression, expected):
+    """
+    Test the vectorized & per-message evaluation of filter expressions.
+    """
+    flt = ExpressionFilterer(expression)
+    assert flt.vectorized
+    assert flt.filter_batch(batch).tolist() == expected
+    # the per-message closure agrees, on missing values too
+    assert [flt.filter(msg) for msg in batch] == expected
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("'dev' in db", [False, False, False]),
+        ("'dev' not in db", [True, True, True]),
+        ("db == 'dev'", [False, False, False]),
+        ("db != 'dev'", [True, True, True]),
+        ("db < 'z'", [False, True, False]),
+        ("db in ['a', 'b']", [False, True, False]),
+        ("db is None", [True, False, True]),
+        ("db", [False, True, False]),
+    ]
+)
+def test_expression_filterer_missing(expression, expected):
+    """
+    Test the missing values (not set, None or NaN) are handled the same way on both paths.
+    """
+    msg_ls = [Message({"n": 1}), Message({"n": 2, "db": "a"}), Message({"n": 3, "db": None})]
+    flt = ExpressionFilterer(expression)
+    assert [flt.filter(msg) for msg in msg_ls] == expected
+    assert flt.filter_batch(MessageBatch.from_messages(msg_ls)).tolist() == expected
+    # a missing column
+    batch = MessageBatch(pd.DataFrame({"n": [1, 2]}))
+    assert flt.filter_batch(batch).tolist() == [flt.filter(Message({"n": 1}))] * 2
+
+def test_expression_filterer_fallback():
+    """
+    Test the expressions evaluated message by message.
+    """
+    # can't be vectorized
+    flt = ExpressionFilterer("table_name in db")
+    assert not flt.vectorized
+    batch = MessageBatch(pd.DataFrame({"table_name": ["a", "b"], "db": ["abc", "xyz"]}))
+    assert flt.filter_batch(batch).tolist() == [True, False]
+
+    # mixed types can't be compared on the whole column
+    flt = ExpressionFilterer("n < 5")
+    batch = MessageBatch(pd.DataFrame({"n": [1, "x"]}))
+    with pytest.raises(TypeError):
+        flt.filter_batch(batch)
+    with pytest.raises(TypeError):
+        flt.filter(Message({"n": "x"}))
+    assert flt.filter(Message({"n": 1}))
+
+    # text operations on a column of numbers
+    flt = ExpressionFilterer("'1' in n")
+    batch = MessageBatch(pd.DataFrame({"n": [1, 10]}))
+    assert flt.filter_batch(batch).tolist() == [False, False]
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "db ==", "__import__('os')", "len(db) > 1", "db.upper() == 'A'", "__class__ == 1", "x[0] == 1",
+        "db == None", "db in ['a', None]", "db is 'a'", "None is db", "db in [x, 'a']",
+    ]
+)
+def test_parse_expression_error(expression):
+    """
+    Test the validation of filter expressions.
+    """
+    with pytest.raises(ValueError):
+        parse_expression(expression)
+
+def test_fuse_expressions():
+    """
+    Test fusing several filter expressions into one.
+    """
+    assert fuse_expressions("a == 1") == "a == 1"
+    assert fuse_expressions(["a == 1"]) == "a == 1"
+    assert fuse_expressions(["a == 1", "b or c"]) == "(a == 1) and (b or c)"
+
+def test_msg_rcv_filter_expression():
+    """
+    Test the filter expressions of a message receiver.
+    """
+    rcv = MsgRcv({"dest": "console", "filter": ["a < 5", "b != 'nope'"]}, {}, {})
+    msg_ls = [
+        Message({"a": 1, "b": "test", "level": "INFO"}),
+        Message({"a": 2, "b": "nope", "level": "INFO"}),
+        Message({"a": 10, "b": "test", "level": "ERROR"}),
+    ]
+    assert rcv.collect_msg(msg_ls) == [msg_ls[0]]
+    assert list(rcv.collect_msg(MessageBatch.from_messages(msg_ls))) == [msg_ls[0]]
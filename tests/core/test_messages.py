@@ -1,6 +1,7 @@
 import pytest
-from dnt.core.messages import MsgRcv, MsgGrp
-from dnt.core.base import BaseFormatter, BaseFilterer, Message
+import pandas as pd
+from dnt.core.messages import MessageMemo, MsgRcv, MsgGrp
+from dnt.core.base import BaseFormatter, BaseFilterer, Message, MessageBatch
 
 
 # helper func/class
@@ -146,3 +147,77 @@ def test_msg_grp(name, config, formatter_dic, filterer_dic, expected_n_msg):
         assert isinstance(i[1], dict) # delivered_msg
         assert isinstance(i[1]["msg_ls"], list)
         assert len(i[1]["msg_ls"]) == expected_n_msg[n]
+
+
+def test_msg_grp_message_batch():
+    """
+    Test the MsgGrp class with a MessageBatch.
+    """
+    config = [
+        {"dest": "console", "level": "ERROR"},
+        {"dest": "console", "level": "DEBUG", "filterer": ["some_filterter"]},
+        {"dest": "console", "level": "DEBUG", "formatter": "base_formatter"},
+    ]
+    msg_grp = MsgGrp("test_msg_grp", config, {"base_formatter": BaseFormatter()}, {"some_filterter": SomeFilterer()})
+    batch = MessageBatch(pd.DataFrame({"a": [1, 10], "b": ["test", "nope"], "level": ["INFO", "ERROR"]}))
+
+    delivered_msg = msg_grp.deliver_msg(batch, subject="test_test")
+    assert isinstance(delivered_msg[0][1]["msg_ls"], MessageBatch)
+    assert list(delivered_msg[0][1]["msg_ls"]) == [Message({"a": 10, "b": "nope", "level": "ERROR"})]
+    assert list(delivered_msg[1][1]["msg_ls"]) == [Message({"a": 1, "b": "test", "level": "INFO"})]
+    assert delivered_msg[2][1]["msg_ls"] == [
+        "{'a': 1, 'b': 'test', 'level': 'INFO'}", 
+        "{'a': 10, 'b': 'nope', 'level': 'ERROR'}"
+    ]
+
+
+class CountingFilterer(SomeFilterer):
+    def __init__(self):
+        self.n_calls = 0
+
+    def filter(self, msg: Message) -> bool:
+        self.n_calls += 1
+        return super().filter(msg)
+
+
+class CountingFormatter(BaseFormatter):
+    def __init__(self):
+        self.n_calls = 0
+
+    def format(self, msg: Message) -> str:
+        self.n_calls += 1
+        return super().format(msg)
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_msg_grp_memo(columnar):
+    """
+    Test sharing the filterer & formatter results across receivers & groups.
+    """
+    config = [
+        {"dest": "console", "level": "DEBUG", "filterer": ["counting"], "formatter": "counting"},
+        {"dest": "console", "level": "ERROR", "filterer": ["counting"], "formatter": "counting"},
+        {"dest": "console", "level": "DEBUG", "filterer": ["counting"]},
+    ]
+    filterer, formatter = CountingFilterer(), CountingFormatter()
+    msg_grp = MsgGrp("test_msg_grp", config, {"counting": formatter}, {"counting": filterer})
+    msg_ls = [
+        Message({"a": 1, "b": "test", "level": "INFO"}),
+        Message({"a": 2, "b": "test", "level": "ERROR"}),
+        Message({"a": 10, "b": "nope", "level": "ERROR"}),
+    ]
+    batch = MessageBatch.from_messages(msg_ls) if columnar else msg_ls
+
+    memo = MessageMemo(batch)
+    delivered_msg = msg_grp.deliver_msg(batch, subject="test_test", memo=memo)
+    delivered_msg += msg_grp.deliver_msg(batch, subject="test_test", memo=memo)
+    assert [len(kwargs["msg_ls"]) for _, kwargs in delivered_msg] == [2, 1, 2] * 2
+    assert delivered_msg[1][1]["msg_ls"] == ["{'a': 2, 'b': 'test', 'level': 'ERROR'}"]
+    assert list(delivered_msg[2][1]["msg_ls"]) == msg_ls[:2]
+    # each message is filtered & formatted once
+    assert filterer.n_calls == 3
+    assert formatter.n_calls == 2
+
+    # the same as without memo
+    rcv = MsgRcv(config[0], {"counting": formatter}, {"counting": filterer})
+    assert rcv.collect_msg(batch) == delivered_msg[0][1]["msg_ls"]
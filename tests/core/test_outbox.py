@@ -0,0 +1,109 @@
+import sqlite3
+import time
+import pytest
+from dnt.core.outbox import Outbox, OutboxDrainer
+from dnt.core.base import BaseDestination
+
+
+class FlakyDestination(BaseDestination):
+    def __init__(self, name, n_failures: int=0, **kwargs):
+        super().__init__(name, **kwargs)
+        self.n_failures = n_failures
+        self.sent = []
+
+    def send_messages(self, msg_ls, subject=None, **kwargs):
+        if self.n_failures > 0:
+            self.n_failures -= 1
+            raise ConnectionError(f"{self.name} is down")
+        self.sent.append((subject, msg_ls))
+
+
+def test_outbox(tmp_path):
+    """
+    Test the Outbox class.
+    """
+    path = str(tmp_path / "outbox.db")
+    outbox = Outbox(path, max_attempts=2, retry_interval=0.05)
+    assert sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    ids = outbox.put_many([
+        ("console", {"msg_ls": ["a"], "subject": "Job 1"}),
+        ("email", {"msg_ls": ["b"], "subject": "Job 1", "receivers": ["x@example.com"]}),
+        ("console", {"msg_ls": ["c"], "subject": "Job 2"}),
+    ])
+    assert outbox.destinations() == {"console", "email"}
+    assert outbox.due("console") == [
+        (ids[0], {"msg_ls": ["a"], "subject": "Job 1"}),
+        (ids[2], {"msg_ls": ["c"], "subject": "Job 2"}),
+    ]
+    outbox.ack(ids[0])
+
+    # retried after a backoff, then kept as a dead letter
+    assert outbox.fail(ids[2], "ConnectionError()")
+    assert outbox.due("console") == []
+    assert outbox.stats() == {"pending": 2, "due": 1, "dead": 0}
+    time.sleep(0.06)
+    assert [entry_id for entry_id, _ in outbox.due("console")] == [ids[2]]
+    assert not outbox.fail(ids[2], "ConnectionError()")
+    assert outbox.stats() == {"pending": 1, "due": 1, "dead": 1}
+    assert outbox.requeue("console", dead=True) == 1
+    assert outbox.stats() == {"pending": 2, "due": 2, "dead": 0}
+
+    # the errors which are not transient are not retried
+    assert not outbox.fail(ids[2], "ValueError()", transient=False)
+    assert outbox.stats() == {"pending": 1, "due": 1, "dead": 1}
+    assert outbox.bury("email", "Unknown destination") == 1
+    assert outbox.stats() == {"pending": 0, "due": 0, "dead": 2}
+    outbox.requeue(dead=True)
+    outbox.close()
+
+    # persisted across restarts
+    outbox = Outbox(path)
+    assert outbox.due("email") == [(ids[1], {"msg_ls": ["b"], "subject": "Job 1", "receivers": ["x@example.com"]})]
+    outbox.close()
+
+    with pytest.raises(ValueError):
+        Outbox(synchronous="OFF")
+
+def test_outbox_drainer():
+    """
+    Test sending the emits of an outbox in the background with the OutboxDrainer class.
+    """
+    outbox = Outbox(retry_interval=0.01, poll_interval=0.01)
+    destinations = {"flaky": FlakyDestination("flaky", n_failures=2), "ok": FlakyDestination("ok")}
+    outbox.put_many([("flaky", {"msg_ls": ["a"], "subject": "Job 1"})])
+
+    drainer = OutboxDrainer(outbox, destinations)
+    drainer.start()
+    outbox.put_many([("ok", {"msg_ls": ["b"], "subject": "Job 1"})])
+    drainer.notify(["ok"])
+    assert drainer.wait_idle(timeout=5)
+    time.sleep(0.1)
+    assert drainer.wait_idle(timeout=5)
+    assert destinations["ok"].sent == [("Job 1", ["b"])]
+    assert destinations["flaky"].sent == [("Job 1", ["a"])]
+    assert outbox.stats() == {"pending": 0, "due": 0, "dead": 0}
+    drainer.stop()
+
+    # a stopped drainer is never idle with emits due
+    outbox.put_many([("ok", {"msg_ls": ["c"], "subject": "Job 2"})])
+    assert not drainer.wait_idle()
+
+def test_outbox_drainer_dead_letters():
+    """
+    Test the emits which can't be sent are kept as dead letters right away.
+    """
+    class RejectedDestination(FlakyDestination):
+        def is_transient(self, error):
+            return not isinstance(error, ValueError)
+
+        def send_messages(self, msg_ls, subject=None, **kwargs):
+            raise ValueError("rejected address")
+
+    outbox = Outbox(max_attempts=5, retry_interval=0.01, poll_interval=0.01)
+    outbox.put_many([("rejected", {"msg_ls": ["a"], "subject": "Job 1"}), ("removed", {"msg_ls": ["b"], "subject": "Job 1"})])
+    drainer = OutboxDrainer(outbox, {"rejected": RejectedDestination("rejected")})
+    drainer.start()
+    assert drainer.wait_idle(timeout=5)
+    assert outbox.stats() == {"pending": 0, "due": 0, "dead": 2}
+    drainer.stop()
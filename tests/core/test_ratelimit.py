@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+import pytest
+from dnt.core.ratelimit import RateLimiter, RateLimitExceeded, TokenBucket
+
+
+def test_token_bucket():
+    """
+    Test the TokenBucket class.
+    """
+    bucket = TokenBucket(rate=10, burst=2)
+    now = bucket.updated
+    assert bucket.reserve(1, now) == 0
+    assert bucket.reserve(1, now) == 0
+    # reserved in advance, in order
+    assert bucket.reserve(1, now) == pytest.approx(0.1)
+    assert bucket.reserve(1, now) == pytest.approx(0.2)
+    # refilled over time, up to the burst
+    assert bucket.reserve(1, now + 10) == 0
+    assert bucket.tokens == pytest.approx(1)
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, burst=1)
+
+def test_rate_limiter():
+    """
+    Test the RateLimiter class.
+    """
+    limiter = RateLimiter(messages_per_sec=20, burst=2)
+    start = time.monotonic()
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.monotonic() - start >= 0.18
+    stats = limiter.stats()
+    assert stats["acquired"] == 6
+    assert stats["waits"] == 4
+    assert stats["queued"] == 0
+    assert stats["max_queued"] == 4
+    assert stats["max_wait"] == pytest.approx(0.2, abs=0.02)
+
+    # limited by the size, the burst is 1 second by default
+    limiter = RateLimiter(bytes_per_sec=1000)
+    assert limiter.acquire(800) == 0
+    assert limiter.acquire(300) == pytest.approx(0.1, abs=0.02)
+
+    # the queue is bounded
+    limiter = RateLimiter(messages_per_sec=1, burst=1, max_queue=1)
+
+    async def run():
+        await limiter.acquire_async()
+        waiting = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0)
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire_async()
+        waiting.cancel()
+
+    asyncio.run(run())
+    assert limiter.stats()["rejected"] == 1
+    assert limiter.stats()["queued"] == 0
+
+    # no queue, only the sends over the limit are rejected
+    limiter = RateLimiter(messages_per_sec=10, burst=2, max_queue=0)
+    assert limiter.acquire() == 0
+    assert limiter.acquire() == 0
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire()
+    # the tokens of the rejected send are given back
+    time.sleep(0.1)
+    assert limiter.acquire() == 0
+
+    with pytest.raises(ValueError):
+        RateLimiter(burst=10)
@@ -0,0 +1,55 @@
+import time
+import pytest
+from dnt.core.resilience import CircuitBreaker, RetryPolicy
+
+
+def test_retry_policy():
+    """
+    Test the RetryPolicy class.
+    """
+    policy = RetryPolicy(retries=3, backoff=1, max_backoff=3, jitter=False)
+    assert [policy.delay(n) for n in range(1, 5)] == [1, 2, 3, 3]
+
+    policy = RetryPolicy(retries=3, backoff=1, max_backoff=3)
+    delays = [policy.delay(2) for _ in range(100)]
+    assert all(0 <= d <= 2 for d in delays)
+    assert len(set(delays)) > 1
+
+    with pytest.raises(ValueError):
+        RetryPolicy(retries=-1)
+
+def test_circuit_breaker():
+    """
+    Test the CircuitBreaker class.
+    """
+    breaker = CircuitBreaker(threshold=2, reset_timeout=0.05)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.as_dict()["retry_in"] > 0
+
+    # a single probe once half-open, reopened if it fails
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 2
+
+    # closed if the probe succeeds
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.as_dict() == {"state": "closed", "failures": 0, "trips": 2, "retry_in": None}
+
+    # a call let through without a result gives the probe back
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
@@ -1,10 +1,23 @@
-import os
+import asyncio
+import gzip
+import re
+import threading
+import time
 import pandas as pd
 import sqlite3
 from sqlalchemy import create_engine
 import pytest
+from unittest.mock import patch
 from dnt.core.config import Config
-from dnt.core.runner import Runner
+from dnt.core.base import BaseDestination, BaseSource, Message
+from dnt.core.runner import AsyncRunner, DeliveryError, EmitTimeoutError, Runner, FetchError
+from dnt.core.cache import ResultCache
+from dnt.core.messages import MsgGrp
+from dnt.core.outbox import Outbox
+from dnt.core.ratelimit import RateLimiter, RateLimitExceeded
+from dnt.core.resilience import CircuitOpenError
+from dnt.core.utils import DEBUG, ERROR, NOTSET
+from dnt.services.destination import SMTPService
 
 
 def prep_data():
@@ -43,6 +56,35 @@ def prep_data():
     df.to_sql(name="system_status", con=conn, if_exists="replace", index=False)
 
 
+@pytest.fixture
+def config(test_config_fn):
+    """
+    The test config with a slow source.
+    """
+    config = Config(test_config_fn)
+    config.sources["slow"] = SlowSource("slow")
+    return config
+
+
+class InFlight:
+    """
+    A counter of the calls in flight, to check the concurrency of the runners.
+    """
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.current -= 1
+
+
 @pytest.mark.parametrize(
     "job_name, raise_error, expected_output",
     [
@@ -58,6 +100,18 @@ def prep_data():
                 "\n\n"
             )
         ),
+        (
+            "status_summary",
+            False,
+            (
+                "Message from cls service:\nSubject: status_summary\n"
+                "SUCCESS on deparment_revenue (mysql): All done\n"
+                "FAILED on department_info (mysql): Syntax error\n"
+                "SUCCESS on department_info_dev (sqlserver): All done\n"
+                "SUCCESS on new_plan_2023 (sqlserver): All done\n"
+                "\n\n"
+            )
+        ),
         (
             "blahblah", 
             True,
@@ -79,14 +133,12 @@ def prep_data():
         )
     ]
 )
-def test_runner_run_single_job(job_name, raise_error, expected_output, capfd):
+def test_runner_run_single_job(config, job_name, raise_error, expected_output, capfd):
     """
     Test Runner class
     """
     prep_data()
 
-    fpath = os.path.join(os.path.dirname(__file__), "..", "test_config.yml")
-    config = Config(fpath)
     runner = Runner(config)
     assert runner.config == config
 
@@ -98,14 +150,589 @@ def test_runner_run_single_job(job_name, raise_error, expected_output, capfd):
         out, err = capfd.readouterr()
         assert out == expected_output
 
-def test_runner_run_all(capfd):
+def test_runner_run_all(config, capfd):
     prep_data()
 
-    fpath = os.path.join(os.path.dirname(__file__), "..", "test_config.yml")
-    config = Config(fpath)
     runner = Runner(config)
 
     runner.run_all()
     out, err = capfd.readouterr()
     assert "system_status_alert" in out
     assert "test_single_dest" in out
+    assert "FAILED on department_info (mysql): Syntax error" in out
+
+def test_runner_email_attachment(config):
+    """
+    Test the attachment of an email keeps the columns of the messages sent by a job.
+    """
+    prep_data()
+    config.destinations["mail"] = SMTPService(
+        "mail", "127.0.0.1", 25, "abc@example.com", None, attach_threshold=1, starttls=False
+    )
+    config.message_groups["mail_group"] = [{"dest": "mail", "level": "INFO", "receivers": ["def@example.com"]}]
+    config.groups["mail_group"] = MsgGrp("mail_group", config.message_groups["mail_group"], config.formatters, config.filterers)
+    config.jobs["system_status_alert"]["send_messages"] = ["mail_group"]
+
+    with patch("smtplib.SMTP") as mock_smtp:
+        Runner(config).run_single_job("system_status_alert")
+        email_msg = mock_smtp.return_value.send_message.call_args[0][0]
+    body, attachment = email_msg.get_payload()
+    assert "deparment_revenue" in body.as_string()
+    assert "3 more messages" in body.as_string()
+    lines = gzip.decompress(attachment.get_payload(decode=True)).decode().splitlines()
+    assert lines[0] == "table_name,details,db,check_status,level"
+    assert lines[2] == "department_info,Syntax error,mysql,FAILED,ERROR"
+    assert len(lines) == 5
+
+def test_runner_streaming_source(config, capfd):
+    prep_data()
+
+    config.sources["sqlite"].chunksize = 1
+    runner = Runner(config)
+
+    runner.run_single_job("system_status_alert")
+    out, err = capfd.readouterr()
+    assert out.count("Subject: system_status_alert") == 2
+    assert out.count("'level': 'INFO'") == 3
+    assert out.count("'level': 'ERROR'") == 1
+
+    # only the rendered messages are kept until the emits
+    job_config, targets, _ = runner._load_job("test_single_dest")
+    delivery = runner._get_delivery("test_single_dest", targets, runner._fetch_all(job_config))
+    assert [len(params["msg_ls"]) for _, params in delivery] == [4]
+    assert all(isinstance(msg, str) for _, params in delivery for msg in params["msg_ls"])
+
+def test_runner_columnar_source(config, capfd):
+    prep_data()
+
+    runner = Runner(config)
+    runner.run_single_job("test_single_dest")
+    expected, _ = capfd.readouterr()
+
+    config.sources["sqlite"].columnar = True
+    config.sources["sqlite"].chunksize = 3
+    runner.run_single_job("test_single_dest")
+    out, err = capfd.readouterr()
+    assert out == expected
+
+def test_runner_commit_watermark_after_delivery(config, capfd):
+    prep_data()
+
+    config.jobs = {
+        "new_rows": {
+            "get_messages": [
+                {
+                    "service": "sqlite",
+                    "watermark": "row_id",
+                    "query": "SELECT rowid AS row_id, table_name, 'ERROR' AS level FROM system_status",
+                }
+            ],
+            "send_messages": ["console"],
+        }
+    }
+    runner = Runner(config)
+
+    console = config.destinations["console"]
+    send_messages = console.send_messages
+    console.send_messages = lambda **kwargs: 1 / 0
+    with pytest.raises(ZeroDivisionError):
+        runner.run_single_job("new_rows")
+
+    console.send_messages = send_messages
+    runner.run_single_job("new_rows")
+    out, err = capfd.readouterr()
+    assert out.count("'level': 'ERROR'") == 4
+
+    runner.run_single_job("new_rows")
+    out, err = capfd.readouterr()
+    assert "'level': 'ERROR'" not in out
+
+def test_runner_watermark_per_job(config):
+    prep_data()
+
+    config.destinations["ok"] = SlowDestination("ok", delay=0)
+    config.destinations["down"] = SlowDestination("down", delay=0.1, fail=True)
+    query = "SELECT rowid AS row_id, table_name, 'ERROR' AS level FROM system_status"
+    config.jobs = {
+        job_name: {
+            "get_messages": [{"service": "sqlite", "watermark": "row_id", "query": query}],
+            "send_messages": [dest_name],
+        }
+        for job_name, dest_name in [("job_a", "ok"), ("job_b", "down")]
+    }
+    runner = AsyncRunner(config)
+
+    # the failed job doesn't commit (nor discard) the watermark of the other one
+    with pytest.raises(RuntimeError):
+        asyncio.run(runner.run_all_async())
+    checkpoints = config.checkpoints
+    assert checkpoints.get(config.sources["sqlite"]._watermark_key(query, "row_id", "job_a")) == 4
+    assert checkpoints.get(config.sources["sqlite"]._watermark_key(query, "row_id", "job_b")) is None
+
+    config.destinations["down"].fail = False
+    asyncio.run(runner.run_all_async())
+    assert config.destinations["ok"].sent == ["job_a"] * 2
+    assert config.destinations["down"].sent == ["job_b"]
+    assert checkpoints.get(config.sources["sqlite"]._watermark_key(query, "row_id", "job_b")) == 4
+
+def test_runner_result_cache(config, capfd):
+    prep_data()
+
+    config.result_cache = ResultCache(ttl=60)
+    config.jobs = {
+        "test_single_dest": config.jobs["test_single_dest"],
+        "another_single_dest": config.jobs["test_single_dest"],
+        # a higher level pushed down, served by the same result
+        "system_status_alert": config.jobs["system_status_alert"],
+    }
+    runner = Runner(config)
+
+    runner.run_all()
+    out, err = capfd.readouterr()
+    assert config.result_cache.stats()["misses"] == 1
+    assert config.result_cache.stats()["hits"] == 2
+    assert out.count("'table_name': 'department_info'") == 3
+
+class SlowSource(BaseSource):
+    def __init__(self, name):
+        super().__init__(name)
+        self.calls = InFlight()
+
+    def get_messages(self, delay: float, value: int, fail: bool=False):
+        with self.calls:
+            time.sleep(delay)
+        if fail:
+            raise RuntimeError(f"{self.name} is down")
+        return [Message({"value": value, "level": "INFO"})]
+
+
+def test_runner_parallel_fetch(config, capfd):
+    config.jobs = {
+        "fan_in": {
+            "get_messages": [
+                {"service": "slow", "delay": 0.3, "value": n} for n in range(4)
+            ],
+            "send_messages": ["console"],
+        }
+    }
+    runner = Runner(config, max_fetch_workers=4)
+
+    runner.run_single_job("fan_in")
+    assert config.sources["slow"].calls.peak == 4
+    out, err = capfd.readouterr()
+    assert [int(i) for i in re.findall(r"'value': (\d)", out)] == [0, 1, 2, 3]
+
+    config.jobs["fan_in"]["get_messages"][1]["fail"] = True
+    config.jobs["fan_in"]["get_messages"][3]["fail"] = True
+    with pytest.raises(FetchError) as exc_info:
+        runner.run_single_job("fan_in")
+    assert len(exc_info.value.errors) == 2
+    assert isinstance(exc_info.value.errors[0][1], RuntimeError)
+
+class StreamingSource(BaseSource):
+    def get_messages(self, n_batches: int):
+        for n in range(n_batches):
+            yield [Message({"value": n, "level": "INFO"})]
+
+
+def test_runner_fetch_slots(config):
+    config.sources["stream"] = StreamingSource("stream")
+    runner = AsyncRunner(config, max_fetch_workers=1)
+
+    # a streaming source holds its slot while its batches are iterated
+    batches = runner._fetch_limited(config.sources["stream"], {"n_batches": 2})
+    assert runner._fetch_slots.acquire(blocking=False)
+    runner._fetch_slots.release()
+    next(batches)
+    assert not runner._fetch_slots.acquire(blocking=False)
+    assert len(list(batches)) == 1
+    assert runner._fetch_slots.acquire(blocking=False)
+    runner._fetch_slots.release()
+
+    # the global & per-job limits apply to the async fetches
+    config.jobs = {
+        "fan_in": {
+            "get_messages": [{"service": "slow", "delay": 0.1, "value": n} for n in range(3)],
+            "send_messages": ["console"],
+        }
+    }
+    asyncio.run(runner.run_all_async())
+    assert config.sources["slow"].calls.peak == 1
+
+    runner = AsyncRunner(config, max_fetch_workers=8)
+    config.jobs["fan_in"]["max_workers"] = 1
+    asyncio.run(runner.run_all_async())
+    assert config.sources["slow"].calls.peak == 1
+    config.jobs["fan_in"]["max_workers"] = 3
+    asyncio.run(runner.run_all_async())
+    assert config.sources["slow"].calls.peak == 3
+
+    # a cancelled wait for a slot doesn't leak it
+    async def cancel_wait():
+        runner._fetch_slots.acquire()
+        waiter = asyncio.ensure_future(runner._acquire_fetch_slot())
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        runner._fetch_slots.release()
+
+    runner = AsyncRunner(config, max_fetch_workers=1)
+    asyncio.run(cancel_wait())
+    assert runner._fetch_slots.acquire(timeout=1)
+    runner._fetch_slots.release()
+    runner.close()
+    assert all(not t.is_alive() for t in runner._slot_waiters._threads)
+
+def test_async_runner_run_all(config, capfd):
+    prep_data()
+
+    runner = AsyncRunner(config)
+
+    asyncio.run(runner.run_all_async())
+    out, err = capfd.readouterr()
+    assert "system_status_alert" in out
+    assert "test_single_dest" in out
+
+    with pytest.raises(ValueError):
+        asyncio.run(runner.run_all_async(["blahblah"]))
+
+    # the synchronous methods of the Runner still work
+    runner.run_all(["test_single_dest"])
+    out, err = capfd.readouterr()
+    assert "test_single_dest" in out
+
+def test_async_runner_overlap(config, capfd):
+    config.jobs = {
+        f"job_{n}": {
+            "get_messages": [{"service": "slow", "delay": 0.3, "value": n}],
+            "send_messages": ["console"],
+        }
+        for n in range(5)
+    }
+    runner = AsyncRunner(config)
+
+    asyncio.run(runner.run_all_async())
+    assert config.sources["slow"].calls.peak == 5
+    out, err = capfd.readouterr()
+    assert sorted(int(i) for i in re.findall(r"'value': (\d)", out)) == [0, 1, 2, 3, 4]
+
+def test_runner_min_level(config):
+    runner = Runner(config)
+
+    _, targets, _ = runner._load_job("system_status_alert")
+    assert runner._min_level(targets) == DEBUG
+    _, targets, _ = runner._load_job("test_single_dest")
+    assert runner._min_level(targets) == NOTSET
+
+    config.destinations["console"].level = "ERROR"
+    _, targets, _ = runner._load_job("test_single_dest")
+    assert runner._min_level(targets) == ERROR
+    # the messages formatted by a receiver are not filtered by the destination level
+    _, targets, _ = runner._load_job("system_status_alert")
+    assert runner._min_level(targets) == DEBUG
+    calls = runner._source_calls(config.jobs["system_status_alert"], ERROR)
+    assert calls[0][1]["min_level"] == ERROR
+
+class SlowDestination(BaseDestination):
+    def __init__(self, name, delay: float, fail: bool=False, calls: InFlight=None, gate: threading.Event=None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+        # the calls may be counted across destinations
+        self.calls = calls or InFlight()
+        self.gate = gate
+
+    def send_messages(self, msg_ls, subject=None, **kwargs):
+        with self.calls:
+            if self.gate is not None:
+                assert self.gate.wait(5)
+            time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        self.sent.append(subject)
+
+
+def test_runner_concurrent_emit(config):
+    calls = InFlight()
+    for n in range(3):
+        config.destinations[f"slow_{n}"] = SlowDestination(f"slow_{n}", delay=0.3, calls=calls)
+    config.jobs = {
+        "fan_out": {
+            "get_messages": [{"service": "slow", "delay": 0, "value": 1}],
+            "send_messages": ["slow_0", "slow_1", "slow_2"],
+        }
+    }
+    runner = Runner(config)
+
+    runner.run_single_job("fan_out")
+    assert calls.peak == 3
+    assert [config.destinations[f"slow_{n}"].sent for n in range(3)] == [["fan_out"]] * 3
+
+    # the failures are collected, the slow destinations are not waited for
+    config.destinations["slow_1"].fail = True
+    config.destinations["slow_2"].emit_timeout = 0.1
+    with pytest.raises(DeliveryError) as exc_info:
+        runner.run_single_job("fan_out")
+    assert [name for name, _ in exc_info.value.errors] == ["slow_1", "slow_2"]
+    assert isinstance(exc_info.value.errors[0][1], RuntimeError)
+    assert isinstance(exc_info.value.errors[1][1], EmitTimeoutError)
+
+    # the errors of all the emits to a destination are collected
+    config.destinations["slow_1"].max_concurrency = 2
+    config.jobs["fan_out"]["send_messages"] = ["slow_1", "slow_1"]
+    with pytest.raises(DeliveryError) as exc_info:
+        runner.run_single_job("fan_out")
+    assert [name for name, _ in exc_info.value.errors] == ["slow_1", "slow_1"]
+
+def test_runner_emit_timeout_commits(config):
+    prep_data()
+
+    config.destinations["stuck"] = SlowDestination("stuck", delay=0.3, emit_timeout=0.05)
+    query = "SELECT rowid AS row_id, table_name, 'ERROR' AS level FROM system_status"
+    config.jobs = {
+        "new_rows": {
+            "get_messages": [{"service": "sqlite", "watermark": "row_id", "query": query}],
+            "send_messages": ["stuck"],
+        }
+    }
+    watermark_key = config.sources["sqlite"]._watermark_key(query, "row_id", "new_rows")
+
+    # the timed-out emit goes on, so its messages are not fetched (nor sent) again
+    runner = Runner(config)
+    with pytest.raises(EmitTimeoutError):
+        runner.run_single_job("new_rows")
+    assert config.checkpoints.get(watermark_key) == 4
+    runner.close()
+    assert config.destinations["stuck"].sent == ["new_rows"]
+
+    config.checkpoints.delete(watermark_key)
+    runner = AsyncRunner(config)
+    with pytest.raises(EmitTimeoutError):
+        asyncio.run(runner.run_all_async())
+    assert config.checkpoints.get(watermark_key) == 4
+    assert config.destinations["stuck"].sent == ["new_rows"] * 2
+
+def test_async_runner_concurrent_emit(config):
+    config.destinations["serial"] = SlowDestination("serial", delay=0.1)
+    config.destinations["down"] = SlowDestination("down", delay=0, fail=True)
+    config.destinations["stuck"] = SlowDestination("stuck", delay=0.5, emit_timeout=0.1)
+    config.jobs = {
+        f"job_{n}": {
+            "get_messages": [{"service": "slow", "delay": 0, "value": n}],
+            "send_messages": ["serial"],
+        }
+        for n in range(3)
+    }
+    config.jobs["fan_out"] = {
+        "get_messages": [{"service": "slow", "delay": 0, "value": 1}],
+        "send_messages": ["serial", "down", "stuck"],
+    }
+    runner = AsyncRunner(config)
+
+    # one emit at a time to the destination, across jobs
+    asyncio.run(runner.run_all_async([f"job_{n}" for n in range(3)]))
+    assert config.destinations["serial"].calls.peak == 1
+    assert sorted(config.destinations["serial"].sent) == [f"job_{n}" for n in range(3)]
+
+    # the failures are collected, the stuck destination is not waited for
+    async def run_fan_out():
+        with pytest.raises(DeliveryError) as exc_info:
+            await runner.run_all_async(["fan_out"], flush=False)
+        sent = list(config.destinations["stuck"].sent)
+        # the emit still in flight is waited for before the event loop is closed
+        await runner.flush_async()
+        return sent, exc_info
+
+    sent, exc_info = asyncio.run(run_fan_out())
+    assert sent == []
+    assert config.destinations["stuck"].sent == ["fan_out"]
+    assert [name for name, _ in exc_info.value.errors] == ["down", "stuck"]
+    assert isinstance(exc_info.value.errors[1][1], EmitTimeoutError)
+
+def test_runner_digest(config):
+    config.destinations["digest"] = SlowDestination("digest", delay=0, digest_window=60)
+    config.jobs = {
+        f"job_{n}": {
+            "get_messages": [{"service": "slow", "delay": 0, "value": n}],
+            "send_messages": ["digest"],
+        }
+        for n in range(3)
+    }
+    runner = Runner(config)
+
+    # the emits of all jobs are sent as one digest
+    runner.run_all(flush=False)
+    assert config.destinations["digest"].sent == []
+    runner.flush()
+    assert config.destinations["digest"].sent == ["Digest of 3 notifications: job_0, job_1, job_2"]
+
+    asyncio.run(AsyncRunner(config).run_all_async())
+    assert len(config.destinations["digest"].sent) == 2
+
+    # the progress of checkpointed sources can't wait for the digests
+    config.jobs["job_0"]["get_messages"] = [
+        {"service": "sqlite", "watermark": "row_id", "query": "SELECT rowid AS row_id, 'ERROR' AS level FROM system_status"}
+    ]
+    with pytest.raises(ValueError):
+        runner.run_single_job("job_0")
+
+def test_runner_outbox(config, tmp_path):
+    path = str(tmp_path / "outbox.db")
+    config.destinations["slow"] = SlowDestination("slow", delay=0, gate=threading.Event())
+    config.destinations["down"] = SlowDestination("down", delay=0, fail=True)
+    config.jobs = {
+        f"job_{n}": {
+            "get_messages": [{"service": "slow", "delay": 0, "value": n}],
+            "send_messages": ["slow", "down"],
+        }
+        for n in range(2)
+    }
+    config.outbox = Outbox(path, retry_interval=60, poll_interval=0.01)
+    runner = Runner(config)
+
+    # the jobs don't wait for the destinations, nor fail with them
+    runner.run_all(flush=False)
+    assert config.destinations["slow"].sent == []
+    config.destinations["slow"].gate.set()
+    runner.flush()
+    assert config.destinations["slow"].sent == ["job_0", "job_1"]
+    assert config.outbox.stats() == {"pending": 2, "due": 0, "dead": 0}
+    runner.close()
+    config.outbox.close()
+
+    # the emits left are sent after a restart
+    config.outbox = Outbox(path, retry_interval=60, poll_interval=0.01)
+    assert config.outbox.requeue("down") == 2
+    config.destinations["down"].fail = False
+    runner = Runner(config)
+    runner.flush()
+    assert config.destinations["down"].sent == ["job_0", "job_1"]
+    assert config.outbox.stats()["pending"] == 0
+    runner.close()
+
+def test_runner_outbox_checks(config, caplog):
+    config.destinations["stuck"] = SlowDestination("stuck", delay=0.5)
+    config.jobs = {
+        "job": {"get_messages": [{"service": "slow", "delay": 0, "value": 1}], "send_messages": ["stuck"]},
+    }
+    config.outbox = Outbox(drain_timeout=0.05, poll_interval=0.01)
+
+    # the emits not sent in time are reported
+    runner = Runner(config)
+    runner.run_all()
+    assert "The outbox is not drained after 0.05s" in caplog.text
+    runner.close()
+
+    # the spooled emits would bypass the digests
+    config.destinations["stuck"].digest_window = 60
+    with pytest.raises(ValueError):
+        Runner(config)
+
+class FlakyDestination(SlowDestination):
+    def __init__(self, name, n_failures: int, **kwargs):
+        super().__init__(name, delay=0, **kwargs)
+        self.n_failures = n_failures
+        self.attempts = 0
+
+    def send_messages(self, msg_ls, subject=None, **kwargs):
+        self.attempts += 1
+        if self.attempts <= self.n_failures:
+            raise ConnectionError(f"{self.name} is flaky")
+        self.sent.append(subject)
+
+
+def test_runner_retry_and_breaker(config):
+    config.destinations["flaky"] = FlakyDestination("flaky", n_failures=2, retries=2, retry_backoff=0.01)
+    config.destinations["down"] = FlakyDestination("down", n_failures=100, retries=5, breaker_threshold=2, breaker_reset=60)
+    config.destinations["ok"] = SlowDestination("ok", delay=0)
+    config.jobs = {
+        "flaky_job": {"get_messages": [{"service": "slow", "delay": 0, "value": 1}], "send_messages": ["flaky"]},
+        "fan_out": {"get_messages": [{"service": "slow", "delay": 0, "value": 1}], "send_messages": ["ok", "down"]},
+    }
+    runner = Runner(config)
+
+    # the transient errors are retried
+    runner.run_single_job("flaky_job")
+    assert config.destinations["flaky"].sent == ["flaky_job"]
+    assert config.destination_health()["flaky"]["retries"] == 2
+
+    # the retries stop once the circuit is open, then the destination is fast-failed
+    with pytest.raises(DeliveryError):
+        runner.run_single_job("fan_out")
+    assert config.destinations["down"].attempts == 2
+    n_retries = config.destination_health()["down"]["retries"]
+    with pytest.raises(DeliveryError) as exc_info:
+        runner.run_single_job("fan_out")
+    assert config.destination_health()["down"]["retries"] == n_retries
+    assert isinstance(exc_info.value.errors[0][1], CircuitOpenError)
+    assert config.destinations["down"].attempts == 2
+    assert config.destinations["ok"].sent == ["fan_out", "fan_out"]
+    assert config.destination_health()["down"]["state"] == "open"
+
+def test_breaker_probe_released():
+    dest = SlowDestination("probe", delay=0.2, fail=True, breaker_threshold=1, breaker_reset=0.05)
+    params = {"msg_ls": [], "subject": "probe"}
+    with pytest.raises(RuntimeError):
+        dest.deliver(params)
+    time.sleep(0.06)
+
+    # the probe is not taken by a send rejected by the rate limit
+    dest.rate_limiter = RateLimiter(messages_per_sec=1, burst=1, max_queue=0)
+    dest.rate_limiter.acquire()
+    with pytest.raises(RateLimitExceeded):
+        dest.deliver(params)
+    assert dest.breaker.state == "half_open"
+
+    # nor kept by a cancelled send
+    dest.rate_limiter = None
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(dest.deliver_async(params), 0.05))
+    assert dest.breaker.allow()
+
+def test_runner_rate_limit_lanes(config):
+    config.destinations["limited"] = SlowDestination("limited", delay=0, rate_limit={"messages_per_sec": 5, "burst": 1})
+    config.destinations["ok"] = SlowDestination("ok", delay=0, emit_timeout=0.1)
+    config.jobs = {
+        "fan_out": {
+            "get_messages": [{"service": "slow", "delay": 0, "value": 1}],
+            "send_messages": ["limited", "ok"],
+        }
+    }
+    runner = Runner(config, max_emit_workers=1)
+
+    # the emit waiting for its turn doesn't hold the shared thread
+    config.destinations["limited"].rate_limiter.acquire()
+    runner.run_single_job("fan_out")
+    assert config.destinations["ok"].sent == ["fan_out"]
+    assert config.destinations["limited"].sent == ["fan_out"]
+    assert config.destination_health()["limited"]["rate_limit"]["waits"] == 1
+
+    # the emit threads are stopped on close
+    executors = [runner._emit_executor, *runner._dest_executors.values()]
+    runner.close()
+    assert not [t for executor in executors for t in executor._threads if t.is_alive()]
+    with Runner(config) as runner:
+        runner.run_single_job("fan_out")
+        executors = [runner._emit_executor, *runner._dest_executors.values()]
+    assert not [t for executor in executors for t in executor._threads if t.is_alive()]
+
+def test_async_runner_rate_limit(config):
+    config.destinations["limited"] = SlowDestination(
+        "limited", delay=0, rate_limit={"messages_per_sec": 20, "burst": 2}
+    )
+    config.jobs = {
+        f"job_{n}": {
+            "get_messages": [{"service": "slow", "delay": 0, "value": n}],
+            "send_messages": ["limited"],
+        }
+        for n in range(6)
+    }
+    runner = AsyncRunner(config)
+
+    # the jobs run in parallel, the sends over the limit are queued
+    asyncio.run(runner.run_all_async())
+    assert sorted(config.destinations["limited"].sent) == [f"job_{n}" for n in range(6)]
+    stats = config.destination_health()["limited"]["rate_limit"]
+    assert (stats["acquired"], stats["waits"], stats["queued"]) == (6, 4, 0)
@@ -9,3 +9,4 @@ def test_load_config():
     assert isinstance(config._config, EnvYAML)
     assert isinstance(config.formatters, dict)
     assert config.formatters.get("new_formatter.TimeStringFormatter") is not None
+    assert config.formatters.get("status_line").template.startswith("{check_status}")
@@ -1,10 +1,111 @@
+import asyncio
+import gzip
+import json
 from typing import List
 import pytest
 import smtplib
+import socket
+import socketserver
+import threading
+import time
 from email.mime.multipart import MIMEMultipart
 from unittest.mock import patch
 from dnt.core.base import Message
-from dnt.services.destination import ClsService, SMTPService
+from dnt.services.destination import AsyncSMTPService, ClsService, SMTPService
+
+
+# helper func/class
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """
+    A minimal SMTP server (no TLS, no auth) keeping the received emails.
+    """
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        self.server.n_connections += 1
+        self.reply("220 localhost")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            cmd = line.split(" ")[0].upper()
+            if cmd in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif cmd == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while (row := self.rfile.readline().decode()) not in (".\r\n", ""):
+                    data.append(row)
+                self.server.emails.append("".join(data))
+                self.reply("250 OK")
+            elif cmd == "QUIT" or not line:
+                self.reply("221 Bye")
+                return
+            else: # MAIL, RCPT, NOOP, RSET
+                self.reply("250 OK")
+
+
+class FakeAsyncSMTPServer:
+    """
+    An aiosmtpd-style asyncio SMTP server (no TLS, no auth), optionally advertising PIPELINING 
+    and refusing the receivers starting with "refused".
+    """
+    def __init__(self, pipelining: bool=True) -> None:
+        self.pipelining = pipelining
+        self.emails, self.writers, self.n_connections = [], [], 0
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.n_connections += 1
+        self.writers.append(writer)
+        writer.write(b"220 localhost\r\n")
+        sender, rcpts = None, []
+        while True:
+            line = (await reader.readline()).decode().strip()
+            cmd = line.split(" ")[0].upper()
+            if cmd == "EHLO":
+                reply = "250-localhost\r\n250 PIPELINING" if self.pipelining else "250 localhost"
+            elif cmd == "MAIL":
+                sender, reply = line.split(":", 1)[1].strip("<>"), "250 OK"
+            elif cmd == "RCPT":
+                rcpt = line.split(":", 1)[1].strip("<>")
+                if rcpt.startswith("refused"):
+                    reply = "550 No such user"
+                else:
+                    rcpts.append(rcpt)
+                    reply = "250 OK"
+            elif cmd == "DATA" and not rcpts:
+                reply = "554 No valid recipients"
+            elif cmd == "DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                data = []
+                while (row := (await reader.readline()).decode()) not in (".\r\n", ""):
+                    data.append(row[1:] if row.startswith("..") else row)
+                self.emails.append((sender, rcpts, "".join(data)))
+                sender, rcpts, reply = None, [], "250 OK"
+            elif cmd == "RSET":
+                sender, rcpts, reply = None, [], "250 OK"
+            elif cmd == "QUIT" or not line:
+                writer.write(b"221 Bye\r\n")
+                writer.close()
+                return
+            else: # NOOP
+                reply = "250 OK"
+            writer.write(f"{reply}\r\n".encode())
+            await writer.drain()
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FakeSMTPHandler)
+    server.daemon_threads = True
+    server.emails, server.n_connections = [], 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
 
 
 @pytest.mark.parametrize(
@@ -50,6 +151,56 @@ def test_clsservice(
     out, err = capfd.readouterr()
     assert out == expected_out
 
+def test_clsservice_emit_batches(capfd):
+    """
+    Test emitting an iterable of message batches with the ClsService class.
+    """
+    cs = ClsService(name="cls_test", level="ERROR")
+    batches = iter([
+        [Message({"a": 1, "level": "ERROR"}), Message({"a": 2, "level": "INFO"})],
+        [Message({"a": 3, "level": "CRITICAL"})],
+    ])
+    cs.emit(batches, subject="Batches")
+    out, err = capfd.readouterr()
+    assert out == (
+        "Message from cls service:\nSubject: Batches\n"
+        "{'a': 1, 'level': 'ERROR'}\n{'a': 3, 'level': 'CRITICAL'}\n\n\n"
+    )
+
+def test_clsservice_digest(capfd):
+    """
+    Test buffering the emits into digests with the ClsService class.
+    """
+    cs = ClsService(name="cls_test", digest_size=3)
+    cs.emit(["a", "b"], subject="Job 1")
+    cs.emit([], subject="Job 1")
+    out, err = capfd.readouterr()
+    assert out == ""
+
+    # full digest sent right away
+    cs.emit(["c"], subject="Job 1")
+    out, err = capfd.readouterr()
+    assert out == "Message from cls service:\nSubject: Job 1\na\nb\nc\n\n\n"
+
+    # the digests are kept per receivers, the subjects are merged
+    cs.emit(["a"], subject="Job 1", receivers=["x"])
+    cs.emit(["b"], subject="Job 2", receivers=["x"])
+    cs.emit(["c"], subject="Job 3", receivers=["y"])
+    cs.flush()
+    out, err = capfd.readouterr()
+    assert "Subject: Digest of 2 notifications: Job 1, Job 2\n[Job 1] a\n[Job 2] b\n" in out
+    assert "Subject: Job 3\nc\n" in out
+    assert cs._digests == {}
+
+    # sent once the window is over
+    cs = ClsService(name="cls_test", digest_window=0.05)
+    cs.emit(["a"], subject="Job 1")
+    cs.emit(["b"], subject="Job 1")
+    assert capfd.readouterr()[0] == ""
+    time.sleep(0.3)
+    out, err = capfd.readouterr()
+    assert out == "Message from cls service:\nSubject: Job 1\na\nb\n\n\n"
+
 def test_smtpservice():
     """
     Test the SMTPService class.
@@ -89,3 +240,189 @@ def test_smtpservice():
         assert msg["Subject"] == "Test Message"
         assert len(msg.get_payload()) == 1
         assert "Hello World!" in msg.get_payload()[0].as_string()
+
+def test_smtpservice_is_transient():
+    """
+    Test classifying the errors of the SMTPService class.
+    """
+    ss = SMTPService("smtp_test", "smtp.gmail.com", 587, "abc@gmail.com", "123456")
+    assert ss.is_transient(smtplib.SMTPServerDisconnected())
+    assert ss.is_transient(ConnectionRefusedError())
+    assert ss.is_transient(smtplib.SMTPDataError(451, "Try again later"))
+    assert not ss.is_transient(smtplib.SMTPAuthenticationError(535, "Bad credentials"))
+    assert not ss.is_transient(smtplib.SMTPRecipientsRefused({"x@example.com": (550, "No such user")}))
+
+@pytest.mark.parametrize("attach_format", ["csv", "jsonl"])
+def test_smtpservice_attachment(attach_format):
+    """
+    Test attaching the messages above a threshold with the SMTPService class.
+    """
+    ss = SMTPService(
+        name="smtp_test",
+        host="smtp.gmail.com",
+        port=587,
+        username="abc@gmail.com",
+        password="123456",
+        attach_threshold=2,
+        attach_format=attach_format
+    )
+    msg_ls = [Message({"a": n, "b": f"msg {n}", "level": "ERROR"}) for n in range(3)]
+
+    with patch("smtplib.SMTP") as mock_smtp:
+        ss.send_messages(msg_ls=msg_ls, receivers=["def@gmail.com"], subject="Test Message")
+        msg = mock_smtp.return_value.send_message.call_args[0][0]
+        body, attachment = msg.get_payload()
+        assert "msg 1" in body.as_string()
+        assert "msg 2" not in body.as_string()
+        assert "1 more messages" in body.as_string()
+        assert attachment.get_filename() == f"messages.{attach_format}.gz"
+
+    lines = gzip.decompress(attachment.get_payload(decode=True)).decode().splitlines()
+    if attach_format == "csv":
+        assert lines == ["a,b,level", "0,msg 0,ERROR", "1,msg 1,ERROR", "2,msg 2,ERROR"]
+    else:
+        assert [json.loads(line)["a"] for line in lines] == [0, 1, 2]
+
+    # not attached under the threshold
+    with patch("smtplib.SMTP") as mock_smtp:
+        ss.send_messages(msg_ls=msg_ls[:2], receivers=["def@gmail.com"], subject="Test Message")
+        assert len(mock_smtp.return_value.send_message.call_args[0][0].get_payload()) == 1
+
+    with pytest.raises(ValueError):
+        SMTPService("smtp_test", "smtp.gmail.com", 587, "abc@gmail.com", "123456", attach_format="xml")
+
+def test_smtpservice_pool(smtp_server):
+    """
+    Test reusing the SMTP connections of the SMTPService class.
+    """
+    ss = SMTPService(
+        name="smtp_test",
+        host="127.0.0.1",
+        port=smtp_server.server_address[1],
+        username="abc@example.com",
+        password=None,
+        starttls=False
+    )
+    for n in range(3):
+        ss.send_messages([f"Hello {n}"], receivers=["def@example.com"], subject="Test Message")
+    assert len(smtp_server.emails) == 3
+    assert "Hello 2" in smtp_server.emails[-1]
+    assert smtp_server.n_connections == 1
+    assert (ss.pool.opened, ss.pool.reused) == (1, 2)
+
+    # an idle connection is closed after the timeout
+    ss.pool.idle_timeout = 0
+    ss.send_messages(["Hello again"], receivers=["def@example.com"])
+    assert ss.pool.opened == 2
+
+    # a connection dropped by the server is replaced
+    ss.pool.idle_timeout = 60
+    for _, conn in ss.pool._idle:
+        conn.sock.shutdown(socket.SHUT_RDWR)
+    ss.send_messages(["Hello once more"], receivers=["def@example.com"])
+    assert ss.pool.opened == 3
+    assert len(smtp_server.emails) == 5
+
+    ss.close()
+    assert ss.pool._idle == []
+
+@pytest.mark.parametrize("pipelining", [True, False])
+def test_asyncsmtpservice_bulk(pipelining):
+    """
+    Test sending many emails over one session with the AsyncSMTPService class.
+    """
+    server = FakeAsyncSMTPServer(pipelining=pipelining)
+    n_emails = 20
+
+    async def run():
+        port = await server.start()
+        ss = AsyncSMTPService(
+            name="smtp_test",
+            host="127.0.0.1",
+            port=port,
+            username="abc@example.com",
+            password=None,
+            starttls=False
+        )
+        sends = [
+            {
+                "msg_ls": [f"Hello team {n}", ".leading dot"],
+                "receivers": [f"team{n}@example.com", "all@example.com"],
+                "subject": f"Report {n}",
+            }
+            for n in range(n_emails)
+        ]
+        # emails queued from concurrent jobs share the session
+        await asyncio.gather(
+            ss.send_bulk_async(sends[:10]),
+            *(ss.send_messages_async(**params) for params in sends[10:])
+        )
+        round_trips = ss._session.round_trips
+        await ss.close_async()
+        server.server.close()
+        return ss, round_trips
+
+    ss, round_trips = asyncio.run(run())
+    assert server.n_connections == 1
+    assert ss.sessions_opened == 1
+    assert len(server.emails) == n_emails
+    sender, rcpts, data = next(email for email in server.emails if email[1][0] == "team7@example.com")
+    assert sender == "abc@example.com"
+    assert rcpts == ["team7@example.com", "all@example.com"]
+    assert "Subject: Report 7" in data
+    assert "Hello team 7" in data
+    assert "- .leading dot" in data
+    if pipelining:
+        # EHLO, then about one round trip per email
+        assert round_trips == 1 + n_emails + 1
+    else:
+        # EHLO, then MAIL, 2 RCPT, DATA & the content of each email
+        assert round_trips == 1 + 5 * n_emails
+
+def test_asyncsmtpservice_errors():
+    """
+    Test the errors of a bulk send with the AsyncSMTPService class.
+    """
+    server = FakeAsyncSMTPServer()
+
+    async def run():
+        port = await server.start()
+        ss = AsyncSMTPService("smtp_test", "127.0.0.1", port, "abc@example.com", None, starttls=False)
+        results = await asyncio.gather(
+            ss.send_messages_async(["Hello 0"], receivers=["def@example.com"]),
+            ss.send_messages_async(["Hello 1"], receivers=["refused@example.com"]),
+            ss.send_messages_async(["Hello 2"], receivers=["refused@example.com", "ghi@example.com"]),
+            ss.send_messages_async(["Hello 3"], receivers=["def@example.com"]),
+            return_exceptions=True
+        )
+        # a session dropped by the server is replaced
+        server.writers[-1].close()
+        await asyncio.sleep(0.05)
+        await ss.send_messages_async(["Hello 4"], receivers=["def@example.com"])
+        await ss.close_async()
+        server.server.close()
+        return ss, results
+
+    ss, results = asyncio.run(run())
+    assert results[0] is None and results[2] is None and results[3] is None
+    assert isinstance(results[1], smtplib.SMTPRecipientsRefused)
+    assert [rcpts for _, rcpts, _ in server.emails] == [
+        ["def@example.com"], ["ghi@example.com"], ["def@example.com"], ["def@example.com"]
+    ]
+    assert ss.sessions_opened == 2
+
+def test_asyncsmtpservice_send_bulk(smtp_server):
+    """
+    Test the blocking bulk send of the AsyncSMTPService class (without pipelining).
+    """
+    ss = AsyncSMTPService(
+        "smtp_test", "127.0.0.1", smtp_server.server_address[1], "abc@example.com", None, starttls=False
+    )
+    ss.send_bulk(
+        {"msg_ls": [f"Hello {n}"], "receivers": [f"team{n}@example.com"], "subject": f"Report {n}"}
+        for n in range(3)
+    )
+    assert len(smtp_server.emails) == 3
+    assert "Hello 2" in smtp_server.emails[-1]
+    assert smtp_server.n_connections == 1
+    assert ss._session is None
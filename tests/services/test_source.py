@@ -1,7 +1,10 @@
+import os
 from typing import List
+import pandas as pd
 import pytest
-from dnt.core.base import Message
-from dnt.services.source import SQLSource
+from dnt.core.base import Message, MessageBatch
+from dnt.core.checkpoint import Progress
+from dnt.services.source import CSVSource, JSONLSource, ParquetSource, SQLSource
 
 
 def test_sqlsource():
@@ -39,3 +42,235 @@ def test_sqlsource_nolevel_error():
                 'test message from SQLite in Memory' AS msg
             """
         )
+
+def test_sqlsource_streaming():
+    """
+    Test the streaming (chunked) mode of the SQLSource class.
+    """
+    ss = SQLSource(url="sqlite:///:memory:", name="stream", chunksize=2)
+    query = """
+        WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < 5)
+        SELECT n, 'INFO' AS level FROM seq
+    """
+    batches = ss.get_messages(query)
+    assert not isinstance(batches, list)
+    batches = list(batches)
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert [m.message["n"] for b in batches for m in b] == [1, 2, 3, 4, 5]
+
+    # the chunksize can be overriden per query
+    assert isinstance(ss.get_messages(query, chunksize=0), list)
+
+def test_sqlsource_columnar():
+    """
+    Test the columnar mode of the SQLSource class.
+    """
+    ss = SQLSource(url="sqlite:///:memory:", name="columnar", columnar=True)
+    batch = ss.get_messages("SELECT 'abc' AS msg, 'ERROR' AS level")
+    assert isinstance(batch, MessageBatch)
+    assert batch.lvl_no.tolist() == [40]
+    assert batch[0] == Message({"msg": "abc", "level": "ERROR"})
+
+def test_sqlsource_watermark(tmp_path):
+    """
+    Test the watermark option of the SQLSource class.
+    """
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    ss = SQLSource(url=url, name="watermark")
+    with ss.connection.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE events (id INTEGER, level TEXT)")
+        conn.exec_driver_sql("INSERT INTO events VALUES (1, 'INFO'), (2, 'ERROR')")
+
+    query = "SELECT * FROM events;"
+    assert [m.message["id"] for m in ss.get_messages(query, watermark="id")] == [1, 2]
+    # not committed yet (e.g. delivery failed)
+    ss.rollback()
+    assert [m.message["id"] for m in ss.get_messages(query, watermark="id")] == [1, 2]
+    ss.commit()
+    assert ss.get_messages(query, watermark="id") == []
+
+    with ss.connection.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO events VALUES (3, 'INFO')")
+    batches = list(ss.get_messages(query, watermark="id", chunksize=1))
+    assert [m.message["id"] for b in batches for m in b] == [3]
+    ss.commit()
+    assert ss.get_messages(query, watermark="id") == []
+
+    # the watermarks of a job start from the unscoped one, then advance on their own
+    progress = Progress("job")
+    assert ss.get_messages(query, watermark="id", progress=progress) == []
+    with ss.connection.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO events VALUES (4, 'INFO')")
+    assert [m.message["id"] for m in ss.get_messages(query, watermark="id", progress=progress)] == [4]
+    progress.commit()
+    assert ss.get_messages(query, watermark="id", progress=Progress("job")) == []
+    assert [m.message["id"] for m in ss.get_messages(query, watermark="id")] == [4]
+
+    with pytest.raises(ValueError):
+        ss.get_messages(query, watermark="id; DROP TABLE events")
+
+def test_sqlsource_level_pushdown():
+    """
+    Test pushing the level threshold down into the query of the SQLSource class.
+    """
+    ss = SQLSource(url="sqlite:///:memory:", name="pushdown")
+    query = """
+        SELECT '10:00' AS t, 'INFO' AS level
+        UNION ALL SELECT '11:00', 'error'
+        UNION ALL SELECT '12:00', 15
+    """
+    msg_ls = ss.get_messages(query, min_level="ERROR")
+    # numeric levels are kept to be filtered as usual
+    assert [m.message["t"] for m in msg_ls] == ["11:00", "12:00"]
+
+    batches = list(ss.get_messages(query, min_level=20, chunksize=1))
+    assert [m.message["t"] for b in batches for m in b] == ["10:00", "11:00", "12:00"]
+
+    # can't be wrapped safely, fall back to the original query
+    msg_ls = ss.get_messages("WITH t AS (SELECT 'INFO' AS level) SELECT * FROM t", min_level="ERROR")
+    assert len(msg_ls) == 1
+
+    # the wrapped query fails, fall back to the original query
+    with pytest.raises(AttributeError):
+        ss.get_messages("SELECT 'abc' AS msg", min_level="ERROR")
+
+def test_jsonlsource_tailing(tmp_path):
+    """
+    Test tailing a JSON Lines file with the JSONLSource class.
+    """
+    path = tmp_path / "app.jsonl"
+    path.write_text('{"a": 1, "level": "INFO"}\n{"a": 2, "level": "ERROR"}\n{"a": 3')
+    src = JSONLSource(name="jsonl", path=str(path))
+
+    # the incomplete line is left for the next run
+    assert [m.message["a"] for m in src.get_messages()] == [1, 2]
+    src.rollback()
+    assert [m.message["a"] for m in src.get_messages()] == [1, 2]
+    src.commit()
+    assert src.get_messages() == []
+    src.commit()
+
+    with open(path, "a") as f:
+        f.write(', "level": "DEBUG"}\n{"a": 4, "level": "INFO"}\n')
+    batch = src.get_messages(columnar=True)
+    assert isinstance(batch, MessageBatch)
+    assert batch.column("a").tolist() == [3, 4]
+    src.commit()
+
+    # truncated
+    path.write_text('{"a": 5, "level": "INFO"}\n')
+    assert [m.message["a"] for m in src.get_messages()] == [5]
+    src.commit()
+
+    # rotated
+    os.rename(path, tmp_path / "app.jsonl.1")
+    path.write_text('{"a": 6, "level": "INFO"}\n{"a": 7, "level": "INFO"}\n')
+    assert [m.message["a"] for m in src.get_messages()] == [6, 7]
+    src.commit()
+
+    # rewritten in place (same inode, not shorter)
+    path.write_text('{"a": 8, "level": "INFO"}\n{"a": 9, "level": "INFO"}\n{"a": 10, "level": "INFO"}\n')
+    assert [m.message["a"] for m in src.get_messages()] == [8, 9, 10]
+    src.commit()
+    assert src.get_messages() == []
+
+def test_csvsource_tailing(tmp_path):
+    """
+    Test tailing a CSV file with the CSVSource class.
+    """
+    path = tmp_path / "status.csv"
+    path.write_text("table_name,level\ndepartment_info,ERROR\n")
+    src = CSVSource(name="csv", path=str(path))
+    assert src.get_messages() == [Message({"table_name": "department_info", "level": "ERROR"})]
+    src.commit()
+
+    with open(path, "a") as f:
+        f.write("new_plan_2023,INFO\n")
+    assert src.get_messages() == [Message({"table_name": "new_plan_2023", "level": "INFO"})]
+    src.commit()
+    assert src.get_messages() == []
+
+    # the header is read once, then kept in the checkpoint
+    key, checkpoint = src._checkpoint(src._progress)
+    assert (checkpoint["header"], checkpoint["header_size"]) == (["table_name", "level"], 17)
+    src.checkpoints.set(key, {k: v for k, v in checkpoint.items() if k not in ("header", "header_size")})
+    with open(path, "a") as f:
+        f.write("new_plan_2024,INFO\n")
+    assert src.get_messages() == [Message({"table_name": "new_plan_2024", "level": "INFO"})]
+
+    src = CSVSource(name="csv_end", path=str(path), start_at_end=True)
+    assert src.get_messages() == []
+    src.commit()
+    with open(path, "a") as f:
+        f.write("new_plan_2025,INFO\n")
+    assert src.get_messages() == [Message({"table_name": "new_plan_2025", "level": "INFO"})]
+
+    # an empty file has nothing to read yet
+    path.write_text("")
+    src = CSVSource(name="csv_empty", path=str(path))
+    assert src.get_messages() == []
+
+def test_parquetsource(tmp_path):
+    """
+    Test the ParquetSource class.
+    """
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "status.parquet"
+    pd.DataFrame({"a": [1, 2], "level": ["INFO", "ERROR"]}).to_parquet(path)
+    src = ParquetSource(name="parquet", path=str(path))
+    assert [m.message["a"] for m in src.get_messages()] == [1, 2]
+    src.commit()
+    assert src.get_messages() == []
+    src.commit()
+
+    pd.DataFrame({"a": [1, 2, 3], "level": ["INFO", "ERROR", "INFO"]}).to_parquet(path)
+    assert src.get_messages(columnar=True).column("a").tolist() == [3]
+
+def test_sqlsource_arrow_fetch(monkeypatch):
+    """
+    Test the 'arrow' fetch mode of the SQLSource class.
+    """
+    pa = pytest.importorskip("pyarrow")
+    from dnt.core.arrow import ArrowMessageBatch
+
+    ss = SQLSource(url="sqlite:///:memory:", name="arrow", fetch="arrow")
+    query = """
+        SELECT '10:00' AS t, 'INFO' AS level
+        UNION ALL SELECT '11:00', 'error'
+        UNION ALL SELECT '12:00', 15
+    """
+    batch = ss.get_messages(query)
+    assert isinstance(batch, ArrowMessageBatch)
+    assert batch.lvl_no.tolist() == [20, 40, 15]
+    # the columns are only converted to Python objects when accessed
+    assert "t" not in batch._py_columns
+    assert batch[1] == Message({"t": "11:00", "level": "error"})
+    assert "t" in batch._py_columns
+    # mixed types are kept as Python objects, across record batches too
+    ss_small = SQLSource(url="sqlite:///:memory:", name="arrow_small", fetch="arrow", arrow_batch_size=2)
+    batch = ss_small.get_messages(query)
+    assert batch.lvl_no.tolist() == [20, 40, 15]
+    assert [m.message["level"] for m in batch] == ["INFO", "error", 15]
+    assert batch.df["level"].tolist() == ["INFO", "error", 15]
+
+    batches = list(ss.get_messages(query, chunksize=2, min_level="ERROR"))
+    assert [len(b) for b in batches] == [2]
+    assert [m.message["t"] for b in batches for m in b] == ["11:00", "12:00"]
+
+    # the fetch mode can be overriden per query
+    assert isinstance(ss.get_messages(query, fetch="pandas"), list)
+    with pytest.raises(ValueError):
+        ss.get_messages(query, fetch="numpy")
+    with pytest.raises(AttributeError):
+        ss.get_messages("SELECT 'abc' AS msg")
+
+    # pyarrow < 14 has no `promote_options`
+    concat_tables = pa.concat_tables
+    def legacy_concat_tables(tables, promote=False, **kwargs):
+        if kwargs:
+            raise TypeError("concat_tables() got an unexpected keyword argument")
+        assert promote
+        return concat_tables(tables, promote_options="default")
+    monkeypatch.setattr(pa, "concat_tables", legacy_concat_tables)
+    batch = ss_small.get_messages(query)
+    assert [m.message["level"] for m in batch] == ["INFO", "error", 15]
@@ -0,0 +1,62 @@
+import datetime
+import pytest
+import pandas as pd
+from dnt.core.base import Message, MessageBatch
+from dnt.services.formatter import TemplateFormatter, compile_renderer, compile_template
+
+
+@pytest.fixture
+def batch():
+    return MessageBatch(pd.DataFrame({
+        "check_status": ["FAIL", "SUCCESS"],
+        "table_name": ["dev_a", "prod_b"],
+        "check_time": pd.to_datetime(["2024-01-02 03:04:05", "2024-01-02 13:14:15"]),
+        "n": [1.5, 20.0],
+        "level": ["ERROR", "INFO"],
+    }))
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "{check_status} on {table_name} at {check_time:%Y-%m-%d %H:%M:%S}",
+        "{table_name!r}: {n:.2f} / {n}",
+        "[{level:>8}] {table_name[0]}",
+        "{{literal}} {n!s:>8}",
+        "no field",
+    ]
+)
+def test_template_formatter(batch, template):
+    """
+    Test rendering batches of messages with the TemplateFormatter class, the same as one by one.
+    """
+    fmt = TemplateFormatter(template)
+    assert fmt.format_batch(batch) == [fmt.format(msg) for msg in batch]
+
+def test_template_formatter_render(batch):
+    """
+    Test rendering messages with the compiled template, the same as `str.format`.
+    """
+    fmt = TemplateFormatter("{check_status} at {check_time:%H:%M}")
+    assert fmt.format_batch(batch) == ["FAIL at 03:04", "SUCCESS at 13:14"]
+    # missing datetimes are rendered as NaT
+    batch = MessageBatch(pd.DataFrame({"check_status": ["FAIL"], "check_time": pd.to_datetime([None])}))
+    assert fmt.format_batch(batch) == ["FAIL at NaT"]
+    msg = Message({"check_status": "FAIL", "check_time": datetime.datetime(2024, 1, 2, 3, 4), "level": "ERROR"})
+    assert fmt.format(msg) == "FAIL at 03:04"
+
+    template = "{a!r:>6} {{b}} {c[1]} {a:{width}}"
+    fields = {"a": "x", "c": "yz", "width": 3}
+    assert compile_renderer(template)(fields) == template.format_map(fields)
+    with pytest.raises(KeyError):
+        compile_renderer(template)({"a": "x"})
+
+def test_compile_template():
+    """
+    Test the validation & caching of templates.
+    """
+    assert compile_template("{a} and {b:>3}") is compile_template("{a} and {b:>3}")
+    assert compile_renderer("{a} and {b:>3}") is compile_renderer("{a} and {b:>3}")
+    for template in ["{a", "{}", "{0} {1}", "{a!x}"]:
+        with pytest.raises(ValueError):
+            TemplateFormatter(template).setup()